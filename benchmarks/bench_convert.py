@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+
+""" Throughput of PandocConverter on a synthetic Zettelkasten with different
+numbers of concurrent pandoc processes.
+
+    python3 benchmarks/bench_convert.py -n 200 -j 1 2 4 8
+"""
+
+# std
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+# ours
+from verzettler.zettelkasten import Zettelkasten
+from verzettler.note_converter import PandocConverter
+from verzettler.util.synthetic import generate_kasten
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", "--notes", type=int, default=200)
+    parser.add_argument("-j", "--workers", type=int, nargs="+", default=[1, 4])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        tmpdir = Path(tmpdir)
+        generate_kasten(tmpdir / "zk", n_notes=args.notes)
+        zk = Zettelkasten()
+        zk.add_notes_from_directory(tmpdir / "zk")
+        converter = PandocConverter(zk=zk, self_contained=False)
+        for workers in args.workers:
+            start = time.perf_counter()
+            zk.apply_converter(
+                converter, tmpdir / f"out_{workers}", max_workers=workers
+            )
+            duration = time.perf_counter() - start
+            print(
+                f"{workers:3} workers: {len(zk) / duration:8.1f} notes/s "
+                f"({duration:.2f}s for {len(zk)} notes)"
+            )
+
+
+if __name__ == "__main__":
+    main()
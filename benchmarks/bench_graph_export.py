@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+
+""" Time to export the graph of a synthetic Zettelkasten in every format of
+zk_web.
+
+    python3 benchmarks/bench_graph_export.py -n 20000 --links 25
+"""
+
+# std
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+# ours
+from verzettler.zettelkasten import Zettelkasten
+from verzettler.graph_export import export_graph, writers
+from verzettler.util.synthetic import generate_kasten
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", "--notes", type=int, default=20000)
+    parser.add_argument("--links", type=int, default=25)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        notes_dir = Path(tmpdir) / "notes"
+        generate_kasten(
+            notes_dir, n_notes=args.notes, n_links=args.links, n_paragraphs=1
+        )
+        zk = Zettelkasten()
+        zk.add_notes_from_directory(notes_dir)
+        n_links = sum(len(note.links) for note in zk.notes)
+        for suffix in writers:
+            path = Path(tmpdir) / f"graph{suffix}"
+            start = time.perf_counter()
+            export_graph(zk, path)
+            duration = time.perf_counter() - start
+            print(
+                f"{suffix:<9} {duration:7.3f} s "
+                f"({n_links / duration:,.0f} links/s, "
+                f"{path.stat().st_size / 1e6:.1f} MB)"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+
+""" Time spent in HtmlConverter.preproc_markdown per note for link heavy
+notes.
+
+    python3 benchmarks/bench_preproc.py -n 200 --links 200
+"""
+
+# std
+import argparse
+import random
+import tempfile
+import time
+from pathlib import Path
+
+# ours
+from verzettler.zettelkasten import Zettelkasten
+from verzettler.note_converter import PandocConverter
+from verzettler.util.synthetic import generate_kasten, synthetic_nid
+
+
+def add_link_heavy_lines(paths, n_notes: int, n_links: int, seed=0):
+    rng = random.Random(seed)
+    for path in paths:
+        lines = []
+        for i in range(n_links):
+            kind = i % 5
+            if kind == 0:
+                lines.append(f"See https://example.com/page/{i} for more.\n")
+            elif kind == 1:
+                lines.append(f"An [external link](https://example.org/{i}).\n")
+            elif kind == 2:
+                lines.append(f"![picture {i}](../assets/picture_{i % 7}.png)\n")
+            else:
+                target = synthetic_nid(rng.randrange(n_notes))
+                lines.append(
+                    f'* [[{target}]] [Old title](note_{target}.md "autogen")\n'
+                )
+        with path.open("a") as outf:
+            outf.write("\n" + "".join(lines))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", "--notes", type=int, default=200)
+    parser.add_argument("--links", type=int, default=200)
+    parser.add_argument("-r", "--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        paths = generate_kasten(Path(tmpdir), n_notes=args.notes)
+        add_link_heavy_lines(paths, n_notes=args.notes, n_links=args.links)
+        zk = Zettelkasten()
+        zk.add_notes_from_directory(tmpdir)
+        converter = PandocConverter(zk=zk, self_contained=False)
+        texts = [(note, note.path.read_text()) for note in zk.notes]
+        best = float("inf")
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            for note, text in texts:
+                converter.preproc_markdown(note, text)
+            best = min(best, time.perf_counter() - start)
+        print(
+            f"{1000 * best / len(texts):.3f} ms per note "
+            f"({args.links} extra link lines per note, {len(texts)} notes)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+
+""" Time to transform all notes of a synthetic Zettelkasten (as zk_transform
+does) with different numbers of worker processes.
+
+    python3 benchmarks/bench_transform.py -n 5000 -j 1 2 4 8
+"""
+
+# std
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+
+# ours
+from verzettler.zettelkasten import Zettelkasten
+from verzettler.note_transformer import DefaultTransformer
+from verzettler.util.synthetic import generate_kasten
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", "--notes", type=int, default=5000)
+    parser.add_argument("--links", type=int, default=20)
+    parser.add_argument(
+        "-j",
+        "--processes",
+        type=int,
+        nargs="+",
+        default=[1, 2, 4, os.cpu_count() or 1],
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        generate_kasten(Path(tmpdir), n_notes=args.notes, n_links=args.links)
+        zk = Zettelkasten()
+        zk.add_notes_from_directory(tmpdir)
+        transformer = DefaultTransformer(zk)
+        # The first run adds titles and backlinks, later runs do the same
+        # work, but don't write anything.
+        transformer.transform_write_many(zk.notes, processes=None)
+        serial = None
+        for processes in sorted(set(args.processes)):
+            start = time.perf_counter()
+            transformer.transform_write_many(zk.notes, processes=processes)
+            duration = time.perf_counter() - start
+            if serial is None:
+                serial = duration
+            print(
+                f"{processes:3} processes: {duration:7.3f} s "
+                f"(speedup {serial / duration:.2f}, {os.cpu_count()} CPUs)"
+            )
+
+
+if __name__ == "__main__":
+    main()
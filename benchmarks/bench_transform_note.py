@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+
+""" Time of DefaultTransformer.transform for single notes of growing length,
+to check that it is linear in the number of lines.
+
+    python3 benchmarks/bench_transform_note.py --lines 1000 4000 16000
+"""
+
+# std
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+# ours
+from verzettler.zettelkasten import Zettelkasten
+from verzettler.note_transformer import DefaultTransformer
+from verzettler.util.synthetic import generate_kasten, synthetic_nid
+
+
+def big_note(n_lines: int, n_notes: int) -> str:
+    """Note with many lines, links and (underlined) headers"""
+    lines = ["# Big note\n", "\n", "Tags: #a\n", "\n"]
+    for i in range(n_lines):
+        if i % 4 == 0:
+            lines.extend([f"Header {i}\n", "======\n" if i % 8 else "---\n"])
+        lines.append(
+            f"Line {i} [[{synthetic_nid(i % n_notes)}]] and "
+            f"[[{synthetic_nid((7 * i) % n_notes)}]]\n"
+        )
+    return "".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", "--notes", type=int, default=100)
+    parser.add_argument(
+        "--lines", type=int, nargs="+", default=[1000, 4000, 16000]
+    )
+    parser.add_argument("-r", "--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        generate_kasten(Path(tmpdir), n_notes=args.notes)
+        big_path = Path(tmpdir) / "99999999999999_big.md"
+        first = None
+        for n_lines in sorted(args.lines):
+            big_path.write_text(big_note(n_lines, args.notes))
+            zk = Zettelkasten()
+            zk.add_notes_from_directory(tmpdir)
+            transformer = DefaultTransformer(zk)
+            note = zk["99999999999999"]
+            best = float("inf")
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                transformer.transform(note)
+                best = min(best, time.perf_counter() - start)
+            if first is None:
+                first = (n_lines, best)
+            # About 1 if the time is linear in the number of lines
+            relative = (best / first[1]) / (n_lines / first[0])
+            print(
+                f"{n_lines:7} lines: {best:7.3f} s "
+                f"({1e6 * best / n_lines:.1f} us per line, "
+                f"{relative:.2f} x the time per line of {first[0]} lines)"
+            )
+
+
+if __name__ == "__main__":
+    main()
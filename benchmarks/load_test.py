@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+
+""" Load test for a running zk_server: Requests pages of random notes with a
+given number of concurrent clients and reports the latency distribution.
+
+    zk_server -i /tmp/kasten --render-cache-size 0 [--async]
+    python3 benchmarks/load_test.py --notes /tmp/kasten -c 1 8 32
+
+A synthetic Zettelkasten can be created with
+``verzettler.util.synthetic.generate_kasten``.
+"""
+
+# std
+import argparse
+import random
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Tuple
+
+# ours
+from verzettler.zettelkasten import Zettelkasten
+
+
+def fetch(url: str) -> Tuple[float, bool]:
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(url, timeout=120) as response:
+            response.read()
+            ok = response.status == 200
+    except (urllib.error.URLError, OSError):
+        ok = False
+    return time.perf_counter() - start, ok
+
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    index = min(
+        len(sorted_values) - 1, int(round(p / 100 * len(sorted_values)))
+    )
+    return sorted_values[index]
+
+
+def run(urls: List[str], concurrency: int) -> None:
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(fetch, urls))
+    duration = time.perf_counter() - start
+    latencies = sorted(latency for latency, _ in results)
+    n_failed = sum(1 for _, ok in results if not ok)
+    print(
+        f"concurrency {concurrency:3}: "
+        f"p50 {1000 * percentile(latencies, 50):8.1f} ms, "
+        f"p99 {1000 * percentile(latencies, 99):8.1f} ms, "
+        f"max {1000 * latencies[-1]:8.1f} ms, "
+        f"{len(urls) / duration:7.1f} requests/s, {n_failed} failed"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://127.0.0.1:5000")
+    parser.add_argument(
+        "--notes",
+        help="Directory of the Zettelkasten served, to pick random notes. "
+        "If not given, the root note is requested.",
+        default=None,
+    )
+    parser.add_argument(
+        "-c", "--concurrency", type=int, nargs="+", default=[1, 8, 32]
+    )
+    parser.add_argument(
+        "-n", "--requests", help="Requests per run", type=int, default=200
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.notes:
+        zk = Zettelkasten()
+        zk.add_notes_from_directory(args.notes)
+        nids = sorted(note.nid for note in zk.notes)
+    else:
+        nids = [""]
+    rng = random.Random(args.seed)
+    for concurrency in args.concurrency:
+        urls = [
+            f"{args.url}/open/{rng.choice(nids)}" for _ in range(args.requests)
+        ]
+        run(urls, concurrency)
+
+
+if __name__ == "__main__":
+    main()
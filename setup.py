@@ -48,6 +48,9 @@ setup(
         ':sys_platform == "linux2"': ["readline"],
         ':sys_platform == "linux"': ["readline"],
         ':sys_platform == "darwin"': ["readline"],
+        "markdown": ["markdown", "pygments"],
+        "async": ["uvicorn", "asgiref"],
+        "brotli": ["brotli"],
     },
     include_package_data=True,
     keywords=keywords,
@@ -64,6 +67,7 @@ setup(
             "zk_add_id = verzettler.bin.zk_add_id:cli",
             "zk_find_id = verzettler.bin.zk_find_id:cli",
             "zk_get_id = verzettler.bin.zk_get_id:cli",
+            "zk_grep = verzettler.bin.zk_grep:cli",
             "zk_list_tags = verzettler.bin.zk_list_tags:cli",
             "zk_modify_tags = verzettler.bin.zk_modify_tags:cli",
             "zk_open = verzettler.bin.zk_open:cli",
@@ -72,6 +76,7 @@ setup(
             "zk_transform = verzettler.bin.zk_transform:cli",
             "zk_web = verzettler.bin.zk_web:cli",
             "zk_convert = verzettler.bin.zk_convert:cli",
+            "zk_export = verzettler.bin.zk_export:cli",
             "zk_server = verzettler.bin.zk_server:main",
         ]
     },
@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+
+""" Asynchronous serving mode of zk_server (``zk_server --async``).
+
+Pages of notes are handled by an ASGI application: Pandoc runs as an
+asyncio subprocess (with a limit on the number of concurrent processes) and
+graph queries and template rendering run in a thread pool, so that many
+simultaneous page loads don't block each other. All other routes are
+passed on to the flask app of zk_server.
+
+Needs the optional dependencies uvicorn and asgiref.
+"""
+
+# std
+import asyncio
+import email.utils
+import html
+import os
+import time
+from typing import List, Optional, Tuple
+from urllib.parse import unquote
+
+# 3rd
+from flask import Flask
+from werkzeug.http import parse_etags
+
+try:
+    import uvicorn
+    from asgiref.wsgi import WsgiToAsgi
+except ImportError:
+    uvicorn = None
+    WsgiToAsgi = None
+
+# ours
+import verzettler.bin.zk_server as zk_server
+from verzettler.log import logger
+from verzettler.metrics import request_seconds
+from verzettler.note_converter import RenderError
+from verzettler.util.concurrency import SnapshotHolder
+from verzettler.compression import (
+    Compression,
+    add_etag_encoding,
+    negotiate_encoding,
+    strip_etag_encodings,
+)
+
+
+class AsyncNoteApp(object):
+    """ASGI application serving the pages of notes (``/``, ``/open/`` and
+    ``/open/<notespec>``) and passing all other requests on to the flask app
+    of zk_server.
+
+    Args:
+        app: Flask app of zk_server
+        state: State of zk_server
+        compression: Compression of the pages of notes (the flask app
+            handles compression of its responses itself).
+        max_renders: Maximal number of concurrent renders (e.g. pandoc
+            processes). Default: Number of CPUs.
+    """
+
+    def __init__(
+        self,
+        app: Flask,
+        state: SnapshotHolder,
+        compression: Optional[Compression] = None,
+        max_renders: Optional[int] = None,
+    ):
+        if uvicorn is None or WsgiToAsgi is None:
+            raise ImportError(
+                "The asynchronous server needs the 'uvicorn' and 'asgiref' "
+                "packages, e.g. 'pip3 install uvicorn asgiref'."
+            )
+        self.app = app
+        self.state = state
+        self.compression = compression
+        self.wsgi_app = WsgiToAsgi(app)
+        self.max_renders = max_renders or os.cpu_count() or 1
+        # Created in the event loop on first use
+        self._render_limit = None  # type: Optional[asyncio.Semaphore]
+
+    @staticmethod
+    def _match(path: str) -> Tuple[bool, Optional[str]]:
+        """Whether the path is handled here and the note spec (None for the
+        root note)"""
+        if path in ("/", "/open/"):
+            return True, None
+        if path.startswith("/open/"):
+            notespec = unquote(path[len("/open/") :])
+            if notespec and "/" not in notespec:
+                return True, notespec
+        return False, None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["method"] in ("GET", "HEAD"):
+            matched, notespec = self._match(scope["path"])
+            if matched:
+                start = time.perf_counter()
+                status = await self.open_note(scope, send, notespec)
+                # Same route labels as in the flask app
+                route = "/open/<notespec>" if notespec else scope["path"]
+                request_seconds.observe(
+                    time.perf_counter() - start,
+                    route=route,
+                    method=scope["method"],
+                    status=status,
+                )
+                return
+        await self.wsgi_app(scope, receive, send)
+
+    # Handling /open
+    # =========================================================================
+
+    def _prepare(self, notespec: Optional[str], if_none_match: Optional[str]):
+        """Look up note and check whether the client has an up to date
+        version (runs in thread pool).
+
+        Returns:
+            Tuple status, state, note, text, etag, error message
+        """
+        with self.state.read() as current:
+            if notespec is None:
+                notespec = current.zk.root
+            logger.debug(f"Opening {notespec}")
+            try:
+                note = zk_server.find_note(current.zk, notespec)
+            except KeyError:
+                return 404, current, None, None, None, f"No note {notespec}"
+            except ValueError as e:
+                return 404, current, None, None, None, str(e)
+            text = note.path.read_text()
+            etag = zk_server.note_etag(current, note, text)
+        if if_none_match and etag in parse_etags(if_none_match):
+            return 304, current, note, text, etag, None
+        return 200, current, note, text, etag, None
+
+    def _render_page(self, current, note, converted: str, path: str):
+        """Graph and template (runs in thread pool)
+
+        Returns:
+            page, last modified timestamp
+        """
+        with self.state.read():
+            with self.app.test_request_context(path):
+                page = zk_server.render_note_page(current, note, converted)
+            last_modified = zk_server.note_last_modified(current.zk, note)
+        return page, last_modified
+
+    async def open_note(self, scope, send, notespec: Optional[str]) -> int:
+        """Respond with the page of a note
+
+        Returns:
+            HTTP status
+        """
+        if self._render_limit is None:
+            self._render_limit = asyncio.Semaphore(self.max_renders)
+        loop = asyncio.get_running_loop()
+        headers = dict(scope["headers"])
+        if_none_match = headers.get(b"if-none-match", b"").decode("latin-1")
+        encoding = None
+        if self.compression is not None:
+            if_none_match, etag_encoding = strip_etag_encodings(if_none_match)
+            encoding = negotiate_encoding(
+                headers.get(b"accept-encoding", b"").decode("latin-1")
+            )
+        status, current, note, text, etag, error = await loop.run_in_executor(
+            None, self._prepare, notespec, if_none_match
+        )
+        if status == 404:
+            await self._respond(
+                send, scope, 404, html.escape(error).encode("utf-8")
+            )
+            return 404
+        cache_headers = [(b"cache-control", b"no-cache")]
+        if status == 304:
+            if self.compression is not None and etag_encoding is not None:
+                etag = add_etag_encoding(etag, etag_encoding)
+            cache_headers.append((b"etag", f'"{etag}"'.encode("latin-1")))
+            await self._respond(send, scope, 304, b"", cache_headers)
+            return 304
+        try:
+            converted = await current.html_converter.convert_async(
+                note,
+                text=text,
+                limit=self._render_limit,
+                read_lock=self.state.read,
+            )
+        except RenderError as e:
+            logger.error(str(e))
+            message = f"Failed to render {html.escape(note.title)}, see log."
+            # No validators, so that the next request tries again
+            await self._respond(
+                send,
+                scope,
+                500,
+                message.encode("utf-8"),
+                [(b"cache-control", b"no-store")],
+            )
+            return 500
+        page, last_modified = await loop.run_in_executor(
+            None, self._render_page, current, note, converted, scope["path"]
+        )
+        cache_headers.append(
+            (
+                b"last-modified",
+                email.utils.formatdate(last_modified, usegmt=True).encode(
+                    "latin-1"
+                ),
+            )
+        )
+        body = page.encode("utf-8")
+        if self.compression is not None:
+            cache_headers.append((b"vary", b"Accept-Encoding"))
+            if encoding is not None and len(body) >= self.compression.min_size:
+                body = await loop.run_in_executor(
+                    None, self.compression.compressed, body, encoding, etag
+                )
+                etag = add_etag_encoding(etag, encoding)
+                cache_headers.append(
+                    (b"content-encoding", encoding.encode("latin-1"))
+                )
+        cache_headers.append((b"etag", f'"{etag}"'.encode("latin-1")))
+        await self._respond(send, scope, 200, body, cache_headers)
+        return 200
+
+    @staticmethod
+    async def _respond(
+        send,
+        scope,
+        status: int,
+        body: bytes,
+        headers: Optional[List[Tuple[bytes, bytes]]] = None,
+    ) -> None:
+        headers = list(headers or [])
+        if status != 304:
+            headers.extend(
+                [
+                    (b"content-type", b"text/html; charset=utf-8"),
+                    (b"content-length", str(len(body)).encode("latin-1")),
+                ]
+            )
+        await send(
+            {
+                "type": "http.response.start",
+                "status": status,
+                "headers": headers,
+            }
+        )
+        if scope["method"] == "HEAD" or status == 304:
+            body = b""
+        await send({"type": "http.response.body", "body": body})
+
+
+def serve(
+    app: Flask,
+    state: SnapshotHolder,
+    compression: Optional[Compression] = None,
+    host: str = "127.0.0.1",
+    port: int = 5000,
+    max_renders: Optional[int] = None,
+) -> None:
+    """Run zk_server with uvicorn (the Zettelkasten has to be loaded
+    already). See :class:`AsyncNoteApp` for the arguments."""
+    uvicorn.run(
+        AsyncNoteApp(
+            app, state, compression=compression, max_renders=max_renders
+        ),
+        host=host,
+        port=port,
+    )
@@ -38,6 +38,7 @@ def cli():
         dest="file",
     )
     args = parser.parse_args()
+    cli_util.default_arg_handling(args)
     new_path = add_id(args.file)
     shutil.move(args.file, str(new_path))
 
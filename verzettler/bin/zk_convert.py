@@ -8,6 +8,7 @@ from verzettler.cli_util import init_zk_from_cli
 from verzettler.note_converter import JekyllConverter
 from verzettler.zettelkasten import Zettelkasten
 from verzettler.util.paths import get_jekyll_home_from_env
+from verzettler.log import logger
 
 
 def cli():
@@ -16,7 +17,8 @@ def cli():
     jekyll_dir = get_jekyll_home_from_env() / "pages"
     if jekyll_dir is None:
         raise ValueError("Need to set jekyll dir in environment variables")
-    zk.apply_converter(t, output_basedir=jekyll_dir)
+    summary = zk.apply_converter(t, output_basedir=jekyll_dir)
+    logger.info(f"Converted notes: {summary}")
 
 
 if __name__ == "__main__":
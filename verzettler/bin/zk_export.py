@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+
+""" Export the whole Zettelkasten as a static HTML site. """
+
+# std
+import argparse
+import os
+import re
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+# 3rd
+import jinja2
+
+# ours
+from verzettler.cli_util import init_zk_from_cli
+from verzettler.log import logger
+from verzettler.note import Note
+from verzettler.note_converter import (
+    HtmlConverter,
+    RenderError,
+    dotgraph_html,
+    html_converters,
+)
+from verzettler.note_graph import note_environment
+from verzettler.util.write import WriteSummary, write_if_changed
+from verzettler.zettelkasten import Zettelkasten
+
+
+_package_dir = Path(__file__).resolve().parent.parent
+_templates = _package_dir / "templates"
+_statics = _package_dir / "static"
+
+_open_link_regex = re.compile(
+    r"(?<=[\"'])(?:http://127\.0\.0\.1:5000)?/open/([0-9]{14})(?=[\"'])"
+)
+_static_link_regex = re.compile(r"(?<=[\"'])/static/")
+_asset_link_regex = re.compile(r"(?<=[\"'])/assets(/[^\"']+)(?=[\"'])")
+
+
+def output_name(nid: str) -> str:
+    return f"{nid}.html"
+
+
+def rewrite_links(page: str) -> Tuple[str, Set[str]]:
+    """Rewrite links to the server (as used by zk_server) to relative links
+    in the exported site.
+
+    >>> rewrite_links('<a href="/open/00000000000001">a</a>')
+    ('<a href="00000000000001.html">a</a>', set())
+    >>> rewrite_links('<img src="/assets/a/b.png">')
+    ('<img src="assets/a/b.png">', {'/a/b.png'})
+
+    Returns:
+        Page with rewritten links, set of absolute paths of linked assets
+    """
+    assets = set()
+
+    def replace_asset(match):
+        assets.add(match.group(1))
+        return "assets" + match.group(1)
+
+    page = _open_link_regex.sub(lambda m: output_name(m.group(1)), page)
+    page = _static_link_regex.sub("static/", page)
+    page = _asset_link_regex.sub(replace_asset, page)
+    return page, assets
+
+
+def get_dependencies(
+    zk: Zettelkasten, note: Note, with_graph: bool = False
+) -> List[Path]:
+    """Files that the exported page of a note depends on: The note itself,
+    the notes it links to (their titles are inlined) and the notes linking to
+    it. With the graph, also all notes of the environment of the note that
+    the graph is drawn from (see
+    :func:`verzettler.note_graph.note_environment`).
+    """
+    nids = set(note.links) | set(zk.get_backlinks(note.nid))
+    if with_graph:
+        for members in note_environment(zk, note.nid).values():
+            nids |= members
+    nids.discard(note.nid)
+    return [note.path] + [zk[nid].path for nid in sorted(nids) if nid in zk]
+
+
+def is_up_to_date(
+    zk: Zettelkasten,
+    note: Note,
+    output_dir: Path,
+    min_mtime: float = 0.0,
+    with_graph: bool = False,
+) -> bool:
+    """True if the exported page is newer than all of its dependencies
+    (see :func:`get_dependencies`) and than min_mtime."""
+    try:
+        output_mtime = (output_dir / output_name(note.nid)).stat().st_mtime
+    except OSError:
+        return False
+    if output_mtime < min_mtime:
+        return False
+    for path in get_dependencies(zk, note, with_graph=with_graph):
+        try:
+            if path.stat().st_mtime > output_mtime:
+                return False
+        except OSError:
+            return False
+    return True
+
+
+# Worker processes
+# =============================================================================
+
+# Set by _init_worker in each worker process
+_worker_state = {}  # type: Dict[str, object]
+
+
+def _init_worker(
+    zk: Zettelkasten, renderer: str, output_dir: Path, with_graph: bool
+) -> None:
+    env = jinja2.Environment(
+        loader=jinja2.FileSystemLoader(str(_templates)), autoescape=False
+    )
+    env.globals["url_for"] = lambda endpoint, filename: f"static/{filename}"
+    _worker_state.update(
+        zk=zk,
+        converter=html_converters[renderer](
+            zk=zk, self_contained=False, edit_links=False
+        ),
+        template=env.get_template("page.html"),
+        output_dir=output_dir,
+        with_graph=with_graph,
+    )
+
+
+def _export_note(nid: str) -> Tuple[str, bool, bool, int, Set[str]]:
+    """Export a single note (runs in worker process)
+
+    Returns:
+        nid, success, whether the page changed, bytes written, absolute
+        paths of linked assets
+    """
+    zk = _worker_state["zk"]  # type: Zettelkasten
+    converter = _worker_state["converter"]  # type: HtmlConverter
+    output_dir = _worker_state["output_dir"]  # type: Path
+    note = zk[nid]
+    try:
+        converted = converter.convert(note)
+    except RenderError as e:
+        logger.error(str(e))
+        return nid, False, False, 0, set()
+    dot = ""
+    if _worker_state["with_graph"]:
+        dot = "".join(dotgraph_html(zk, note))
+    page = _worker_state["template"].render(
+        pandoc_output=converted, title=note.title, dot=dot
+    )
+    page, assets = rewrite_links(page)
+    path = output_dir / output_name(nid)
+    summary = WriteSummary()
+    if not write_if_changed(path, page, summary=summary):
+        # Still up to date with respect to its dependencies
+        os.utime(str(path))
+    return nid, True, summary.changed > 0, summary.bytes_written, assets
+
+
+# Main process
+# =============================================================================
+
+
+def _copy_if_newer(source: Path, target: Path) -> None:
+    try:
+        if target.stat().st_mtime >= source.stat().st_mtime:
+            return
+    except OSError:
+        pass
+    target.parent.mkdir(parents=True, exist_ok=True)
+    shutil.copy2(str(source), str(target))
+
+
+def _copy_static_files(output_dir: Path) -> None:
+    for root, _, files in os.walk(str(_statics)):
+        for file in files:
+            source = Path(root) / file
+            _copy_if_newer(
+                source, output_dir / "static" / source.relative_to(_statics)
+            )
+
+
+def _write_index(zk: Zettelkasten, output_dir: Path) -> None:
+    target = output_name(zk.root)
+    with (output_dir / "index.html").open("w") as outf:
+        outf.write(
+            f'<!DOCTYPE html>\n<html><head><meta http-equiv="refresh" '
+            f'content="0; url={target}"></head>'
+            f'<body><a href="{target}">{target}</a></body></html>\n'
+        )
+
+
+def export(
+    zk: Zettelkasten,
+    output_dir: Path,
+    renderer: str = "pandoc",
+    processes: Optional[int] = None,
+    force: bool = False,
+    with_graph: bool = True,
+    summary: Optional[WriteSummary] = None,
+) -> int:
+    """Export all notes to a static HTML site.
+
+    Args:
+        zk:
+        output_dir: Output directory
+        renderer: Key of :data:`verzettler.note_converter.html_converters`
+        processes: Number of worker processes. Default: Number of CPUs.
+        force: Also export notes whose output is up to date
+        with_graph: Include the graph of the environment of each note
+        summary: Record the written (and failed) pages here
+
+    Returns:
+        Number of exported notes
+    """
+    output_dir.mkdir(parents=True, exist_ok=True)
+    _copy_static_files(output_dir)
+    _write_index(zk, output_dir)
+
+    # Pages also need to be regenerated if the template changed
+    min_mtime = (_templates / "page.html").stat().st_mtime
+    if force:
+        todo = [note.nid for note in zk.notes]
+    else:
+        todo = [
+            note.nid
+            for note in zk.notes
+            if not is_up_to_date(
+                zk,
+                note,
+                output_dir,
+                min_mtime=min_mtime,
+                with_graph=with_graph,
+            )
+        ]
+    logger.info(
+        f"Exporting {len(todo)} notes, {len(zk) - len(todo)} are up to date."
+    )
+    if not todo:
+        return 0
+
+    assets = set()
+    n_failed = 0
+    chunksize = max(
+        1, min(64, len(todo) // (4 * (processes or os.cpu_count() or 1)))
+    )
+    with ProcessPoolExecutor(
+        max_workers=processes,
+        initializer=_init_worker,
+        initargs=(zk, renderer, output_dir, with_graph),
+    ) as executor:
+        for i, (nid, success, changed, n_bytes, note_assets) in enumerate(
+            executor.map(_export_note, todo, chunksize=chunksize)
+        ):
+            if not success:
+                n_failed += 1
+                logger.error(f"Failed to export {nid}")
+                if summary is not None:
+                    summary.add_failed()
+            elif summary is not None:
+                summary.add(changed=changed, n_bytes=n_bytes)
+            assets |= note_assets
+            if (i + 1) % 1000 == 0:
+                logger.info(f"Exported {i + 1}/{len(todo)} notes")
+
+    for asset in assets:
+        source = Path(asset)
+        if source.is_file():
+            _copy_if_newer(source, output_dir / "assets" / asset.lstrip("/"))
+        else:
+            logger.warning(f"Asset {asset} not found")
+    logger.info(
+        f"Exported {len(todo) - n_failed} notes and {len(assets)} assets "
+        f"to {output_dir}"
+    )
+    return len(todo) - n_failed
+
+
+def cli():
+    def add_additional_arguments(parser: argparse.ArgumentParser):
+        parser.add_argument(
+            "-o",
+            "--output",
+            help="Output directory",
+            required=True,
+        )
+        parser.add_argument(
+            "--renderer",
+            help="How to render notes to HTML",
+            choices=list(html_converters),
+            default="pandoc",
+        )
+        parser.add_argument(
+            "-j",
+            "--processes",
+            help="Number of worker processes. Default: Number of CPUs.",
+            type=int,
+            default=None,
+        )
+        parser.add_argument(
+            "-f",
+            "--force",
+            help="Re-export all notes, even if their output is newer than "
+            "the notes they depend on.",
+            action="store_true",
+        )
+        parser.add_argument(
+            "--no-graph",
+            help="Do not include the graph of neighboring notes.",
+            action="store_true",
+        )
+
+    zk, args = init_zk_from_cli(
+        additional_argparse_setup=add_additional_arguments
+    )
+    summary = WriteSummary()
+    export(
+        zk,
+        Path(args.output),
+        renderer=args.renderer,
+        processes=args.processes,
+        force=args.force,
+        with_graph=not args.no_graph,
+        summary=summary,
+    )
+    logger.info(f"Exported pages: {summary}")
+
+
+if __name__ == "__main__":
+    cli()
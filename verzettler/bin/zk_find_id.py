@@ -8,7 +8,10 @@ import pyperclip
 
 # ours
 import verzettler.cli_util as cli_util
-from verzettler.bin.zk_open import get_search_results
+from verzettler.bin.zk_open import (
+    get_search_results,
+    add_index_cache_option,
+)
 from verzettler.bin.zk_get_id import get_id
 
 
@@ -20,10 +23,13 @@ def cli():
         dest="search",
         help="Search term",
     )
+    add_index_cache_option(parser)
     args = parser.parse_args()
     cli_util.default_arg_handling(args)
     results = get_search_results(
-        search_dirs=args.input, search_term=args.search
+        search_dirs=args.input,
+        search_term=args.search,
+        use_cache=not args.no_cache,
     )
     selection = cli_util.get_path_selection(results, search=args.search)
     if not selection:
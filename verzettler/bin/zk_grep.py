@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+
+# std
+import argparse
+import re
+import sys
+
+# 3rd
+from termcolor import colored
+
+# ours
+import verzettler.cli_util as cli_util
+from verzettler.log import logger
+from verzettler.grep import grep
+from verzettler.path_index import PathIndex
+from verzettler.bin.zk_open import add_index_cache_option
+
+
+def cli():
+    parser = argparse.ArgumentParser(
+        description="Search the contents of all notes with a regular "
+        "expression."
+    )
+    cli_util.add_zk_dirs_arg(parser)
+    cli_util.add_debug_args(parser)
+    parser.add_argument(
+        dest="pattern",
+        help="Regular expression (python syntax)",
+    )
+    parser.add_argument(
+        "-s",
+        "--case-sensitive",
+        help="Case sensitive search",
+        action="store_true",
+    )
+    parser.add_argument(
+        "-j",
+        "--processes",
+        help="Number of worker processes. Default: Number of CPUs.",
+        type=int,
+        default=None,
+    )
+    add_index_cache_option(parser)
+    args = parser.parse_args()
+    cli_util.default_arg_handling(args)
+
+    if args.no_cache:
+        index = PathIndex(args.input)
+        index.refresh()
+    else:
+        index = PathIndex.cached(args.input)
+    flags = 0 if args.case_sensitive else re.IGNORECASE
+
+    try:
+        matches = grep(
+            index.glob("*.md"),
+            args.pattern,
+            flags=flags,
+            processes=args.processes,
+        )
+        for match in matches:
+            print(
+                colored(str(match.path), "magenta")
+                + ":"
+                + colored(str(match.lineno), "green")
+                + ":"
+                + match.line
+            )
+    except re.error as e:
+        logger.critical(f"Invalid regular expression: {e}")
+        sys.exit(113)
+
+
+if __name__ == "__main__":
+    cli()
@@ -1,11 +1,35 @@
 #!/usr/bin/env python3
 
+# std
+import argparse
+import sys
+
 # ours
 from verzettler.cli_util import init_zk_from_cli
+from verzettler.log import logger
 
 
 def cli():
-    zk, _ = init_zk_from_cli()
+    def add_additional_arguments(parser: argparse.ArgumentParser):
+        parser.add_argument(
+            "-q",
+            "--query",
+            help="Instead of listing all tags, list the paths of all notes "
+            "matching this tag query, e.g. 'c_* AND NOT (draft OR todo)'.",
+        )
+
+    zk, args = init_zk_from_cli(
+        additional_argparse_setup=add_additional_arguments
+    )
+    if args.query:
+        try:
+            notes = zk.query_tags(args.query)
+        except ValueError as e:
+            logger.critical(str(e))
+            sys.exit(112)
+        for note in notes:
+            print(note.path)
+        return
     tags = sorted(list(zk.tags))
     for t in tags:
         print(t)
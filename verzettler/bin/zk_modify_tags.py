@@ -7,6 +7,9 @@ from typing import Set
 
 # ours
 from verzettler.cli_util import init_zk_from_cli
+from verzettler.note_transformer import DefaultTransformer
+from verzettler.util.write import WriteSummary
+from verzettler.log import logger
 
 
 def cli():
@@ -42,11 +45,17 @@ def cli():
         tags -= set(args.remove)
         return tags
 
+    transformer = DefaultTransformer(zk=zk, tag_transformer=tag_transformer)
+    summary = WriteSummary()
     for path in args.notes:
         path = Path(path).resolve()
-        z = zk.get_by_path(path)
-        # fixme
-        z.transform_file(tag_transformer=tag_transformer)
+        try:
+            z = zk.get_by_path(path)
+        except (KeyError, ValueError) as e:
+            logger.error(str(e))
+            continue
+        transformer.transform_write(z, summary=summary)
+    logger.info(f"Modified tags: {summary}")
 
 
 if __name__ == "__main__":
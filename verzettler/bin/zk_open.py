@@ -11,36 +11,39 @@ from typing import List
 # ours
 import verzettler.cli_util as cli_util
 from verzettler.log import logger
-
-
-def get_search_results(search_dirs: List[Path], search_term: str) -> List[Path]:
-    sb_params = [
-        "find",
-    ]
-    for d in search_dirs:
-        sb_params.append(str(d))
-    if "*" not in search_term:
-        if not search_term.endswith(".md"):
-            search_term = f"*{search_term}*.md"
-        else:
-            search_term = f"*{search_term}.md"
+from verzettler.path_index import PathIndex
+
+
+def get_search_results(
+    search_dirs: List[Path], search_term: str, use_cache: bool = True
+) -> List[Path]:
+    """Search files below the search directories by name.
+
+    Args:
+        search_dirs: Zettelkasten directories
+        search_term: Search term, see
+            :func:`verzettler.path_index.search_term_to_glob`
+        use_cache: Load (and update) the path index from the cache directory
+            rather than building it from scratch.
+
+    Returns:
+        List of paths
+    """
+    if use_cache:
+        index = PathIndex.cached(search_dirs)
     else:
-        if search_term.endswith("*"):
-            search_term += ".md"
-    logger.debug(f"Search term: '{search_term}'.")
-    sb_params.extend(
-        ["-type", "f", "-not", "-wholename", "*/.git*", "-name", search_term]
-    )
-
-    opt = subprocess.check_output(
-        sb_params,
-        universal_newlines=True,
-    ).strip()
+        index = PathIndex(search_dirs)
+        index.refresh()
+    return index.search(search_term)
 
-    if not opt.replace("\n", ""):
-        return []
 
-    return [Path(path_str) for path_str in opt.split("\n")]
+def add_index_cache_option(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--no-cache",
+        help="Do not use the persistent file name index, but list all "
+        "directories from scratch.",
+        action="store_true",
+    )
 
 
 def add_action_option(parser: argparse.ArgumentParser) -> None:
@@ -84,11 +87,14 @@ def cli():
         action="store_true",
     )
     add_action_option(parser)
+    add_index_cache_option(parser)
     args = parser.parse_args()
     cli_util.default_arg_handling(args)
 
     results = get_search_results(
-        search_dirs=args.input, search_term=args.search
+        search_dirs=args.input,
+        search_term=args.search,
+        use_cache=not args.no_cache,
     )
 
     selection = cli_util.get_path_selection(
@@ -6,24 +6,41 @@ import logging
 from pathlib import Path
 import argparse
 import json
+import html
+import re
+import time
+import hashlib
+import datetime
+import multiprocessing
+from functools import lru_cache, wraps
+from typing import Optional, List
 
 # 3rd
 from flask import Flask
-from flask import render_template, redirect, send_file, request
-from bokeh.embed import components
-from bokeh.resources import INLINE
-import tabulate
+from flask import render_template, redirect, send_file, request, g, jsonify
+from flask import Response, stream_with_context, make_response, url_for
 
 # ours
 from verzettler.zettelkasten import Zettelkasten
+from verzettler.note import Note
 from verzettler.log import logger
-from verzettler.note_converter import PandocConverter, dotgraph_html
-from verzettler.bokeh_plots import (
-    make_backlink_histogram,
-    make_link_histogram,
-    depth_histogram,
-    zk_name_pie_chart,
+from verzettler.note_converter import (
+    PandocConverter,
+    RenderError,
+    dotgraph_html,
+    html_converters,
 )
+from verzettler.grep import grep
+from verzettler.render_cache import RenderCache
+from verzettler.util.paths import get_cache_dir
+from verzettler.util.concurrency import SnapshotHolder
+from verzettler.compression import Compression
+from verzettler.dashboard import DashboardCache, bokeh_resources
+from verzettler.metrics import registry, request_seconds, search_seconds
+from verzettler.note_graph import environment_json
+from verzettler.clusters import cluster_graph, expand_cluster
+from verzettler.clusters import modes as cluster_modes
+from verzettler.clusters import default_max_clusters
 from verzettler.cli_util import (
     add_zk_dirs_arg,
     add_debug_args,
@@ -43,16 +60,216 @@ app.config["SECRET_KEY"] = "asfnfl1232#"
 # https://stackoverflow.com/questions/9508667/
 app.config["TEMPLATES_AUTO_RELOAD"] = True
 
-zk = Zettelkasten()
+
+# Metrics
+# =============================================================================
+
+# Registered before the compression, so that the time of the request includes
+# compressing the response (after_request functions run in reverse order)
+
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+
+@app.after_request
+def observe_request_time(response):
+    start = g.get("request_start")
+    if start is not None:
+        rule = request.url_rule.rule if request.url_rule else "unmatched"
+        request_seconds.observe(
+            time.perf_counter() - start,
+            route=rule,
+            method=request.method,
+            status=response.status_code,
+        )
+    return response
+
+
+def _render_cache_stats():
+    if render_cache is None:
+        return 0, 0, 0
+    return render_cache.hits, render_cache.misses, len(render_cache)
+
+
+registry.register_cache(
+    "render", _render_cache_stats, help="Rendered notes (see RenderCache)"
+)
+
+
+@app.route("/metrics")
+def metrics():
+    """Metrics in the Prometheus text format"""
+    return Response(
+        registry.render_prometheus(),
+        mimetype="text/plain",
+        headers={
+            "Content-Type": "text/plain; version=0.0.4; charset=utf-8",
+            "Cache-Control": "no-store",
+        },
+    )
+
+
+@app.route("/metrics.json")
+def metrics_json():
+    """Summary of all metrics (shown on the dashboard)"""
+    response = jsonify(registry.summary())
+    response.cache_control.no_store = True
+    return response
+
+
+compression = Compression(static_directory=statics)
+compression.init_app(app)
+compression.register_metrics()
+
 zk_directories = []
 
 # jekyll_converter = JekyllConverter(zk=zk)
-pandoc_converter = PandocConverter(zk=zk, self_contained=False)
+render_cache = RenderCache()
+converter_class = PandocConverter
+
+
+class ServerState(object):
+    """The Zettelkasten and everything built from it. On reload, a new
+    state is built and replaces the old one as a whole.
+    """
+
+    def __init__(self, zk: Zettelkasten):
+        self.zk = zk
+        self.html_converter = converter_class(
+            zk=zk, self_contained=False, cache=render_cache
+        )
+
+
+def load_state(directories: List[str]) -> ServerState:
+    zk = Zettelkasten()
+    for d in directories:
+        zk.add_notes_from_directory(d)
+    return ServerState(zk)
+
+
+state = SnapshotHolder(ServerState(Zettelkasten()))
+dashboard_cache = DashboardCache(read_lock=state.read)
+
+
+def with_state(view):
+    """Decorator for views: Passes the current state as first argument and
+    makes sure it isn't modified while the view runs."""
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        with state.read() as current:
+            return view(current, *args, **kwargs)
+
+    return wrapper
+
+
+# HTTP caching
+# =============================================================================
+
+# Part of all ETags of generated pages, because e.g. graph versions are only
+# unique within one process
+_server_instance = str(time.time())
+
+#: Cache-Control max-age for static files requested with their fingerprint
+static_max_age = 365 * 24 * 3600
+
+
+@lru_cache(maxsize=100)
+def _file_fingerprint(path: str, mtime_ns: int) -> str:
+    return hashlib.sha1(Path(path).read_bytes()).hexdigest()[:12]
+
+
+def static_fingerprint(filename: str) -> Optional[str]:
+    """Hash of the content of a static file or None if it doesn't exist"""
+    path = statics / filename
+    try:
+        return _file_fingerprint(str(path), path.stat().st_mtime_ns)
+    except OSError:
+        return None
+
+
+@app.url_defaults
+def add_static_fingerprint(endpoint, values):
+    """url_for('static', ...) adds the hash of the file as query parameter,
+    so that the browser can cache it forever."""
+    if endpoint == "static" and "v" not in values:
+        fingerprint = static_fingerprint(values.get("filename", ""))
+        if fingerprint is not None:
+            values["v"] = fingerprint
+
+
+@app.after_request
+def add_static_cache_control(response):
+    if (
+        request.endpoint == "static"
+        and response.status_code in (200, 304)
+        and request.args.get("v") is not None
+        and request.args.get("v")
+        == static_fingerprint(request.view_args.get("filename", ""))
+    ):
+        response.headers[
+            "Cache-Control"
+        ] = f"public, max-age={static_max_age}, immutable"
+    return response
+
+
+def _template_mtime(name: str) -> int:
+    return (templates / name).stat().st_mtime_ns
+
+
+def page_etag(*parts) -> str:
+    return RenderCache.make_key(_server_instance, *map(str, parts))
+
+
+def not_modified(etag: str) -> Optional[Response]:
+    """Response with status 304 if the client already has the page with
+    this ETag, else None."""
+    if etag not in request.if_none_match:
+        return None
+    response = Response(status=304)
+    response.set_etag(etag)
+    response.cache_control.no_cache = True
+    return response
+
+
+def cacheable(
+    body, etag: str, last_modified: Optional[float] = None
+) -> Response:
+    """Response with validators. The client still revalidates every time,
+    but unchanged pages are answered with :func:`not_modified`."""
+    response = make_response(body)
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = datetime.datetime.fromtimestamp(
+            last_modified, tz=datetime.timezone.utc
+        )
+    response.cache_control.no_cache = True
+    return response
+
+
+def note_last_modified(zk: Zettelkasten, note: Note) -> float:
+    """Latest modification time of the note and the notes it links to
+    (whose titles are used in the rendered page)."""
+    mtime = note.path.stat().st_mtime
+    for nid in note.links:
+        if nid in zk:
+            try:
+                mtime = max(mtime, zk[nid].path.stat().st_mtime)
+            except OSError:
+                pass
+    return mtime
+
+
+# Routes
+# =============================================================================
 
 
 @app.route("/open/<program>/<zid>")
-def open_external(program, zid):
-    path = zk[zid].path
+@with_state
+def open_external(current: ServerState, program, zid):
+    path = current.zk[zid].path
     if program == "typora":
         print("Opening typora")
         proc = subprocess.Popen(["typora", path])
@@ -64,55 +281,53 @@ def open_external(program, zid):
 
 @app.route("/reload")
 def reload():
-    global zk
-    global zk_directories
-    zk = Zettelkasten()
-    for d in zk_directories:
-        zk.add_notes_from_directory(d)
+    # Requests are still served from the old state while loading.
+    # Cached renders stay valid, because they are keyed by content.
+    new_state = state.replace(lambda _: load_state(zk_directories))
+    dashboard_cache.refresh(new_state.zk)
     return "Reloaded."
 
 
 @app.route("/dashboard")
-def dashboard():
-    plots = [
-        make_link_histogram(zk=zk),
-        make_backlink_histogram(zk=zk),
-        depth_histogram(zk=zk),
-        zk_name_pie_chart(zk=zk),
-    ]
-    plots = [components(plot) for plot in plots]
-    scripts, divs = list(zip(*plots))
-    js_resources = INLINE.render_js()
-    css_resources = INLINE.render_css()
-
-    max_depth = max(zk.get_nnotes_by_depth().keys())
-    table_data = [
-        (f"Number of notes", f"{len(zk._nid2note)}"),
-        (f"Number of links", f"{zk._graph.size()}"),
-        (f"Links/note", f"{zk._graph.size()/len(zk._nid2note):.2f}"),
-        (f"Number of tags", f"{len(zk.tags)}"),
-        (f"Number of orphans", f"{len(zk.get_orphans())} "),
-        (f"Maximum depth", f"{max_depth}"),
-    ]
-    table = tabulate.tabulate(table_data, tablefmt="html")
-
-    return render_template(
+@with_state
+def dashboard(current: ServerState):
+    zk = current.zk
+    cached = dashboard_cache.get(zk)
+    if cached is None and dashboard_cache.failed_version == zk.version:
+        return "Failed to compute the dashboard, see log.", 500
+    if cached is None:
+        response = make_response(
+            '<meta http-equiv="refresh" content="2">'
+            "Computing dashboard, please wait..."
+        )
+        response.cache_control.no_store = True
+        return response
+    version, outdated, data = cached
+    etag = page_etag(
+        "dashboard", version, outdated, _template_mtime("dashboard.html")
+    )
+    cached_response = not_modified(etag)
+    if cached_response is not None:
+        return cached_response
+    js_resources, css_resources = bokeh_resources()
+    page = render_template(
         "dashboard.html",
-        scripts=scripts,
-        divs=divs,
         js_resources=js_resources,
         css_resources=css_resources,
-        table=table,
+        outdated=outdated,
+        **data,
     )
+    return cacheable(page, etag)
 
 
 # todo: search with program
 # todo: fulltext search as an option
 @app.route("/search/<search>")
-def search(search):
+@with_state
+def search(current: ServerState, search):
     # Split any extensions
     search = Path(search).stem
-    results = zk.search(search)
+    results = current.zk.search(search)
     if len(results) == 1:
         return redirect(f"/open/{results[0].nid}")
     elif len(results) > 1:
@@ -125,14 +340,83 @@ def search(search):
         return "No results"
 
 
+@app.route("/tags/<query>")
+@with_state
+def tags(current: ServerState, query):
+    try:
+        results = current.zk.query_tags(query)
+    except ValueError as e:
+        return str(e)
+    if not results:
+        return "No results"
+    out = "<ul>"
+    for result in results:
+        out += f'<li><a href="/open/{result.nid}">{result.title} ({result.path.stem})</a></li>'
+    out += "</ul>"
+    return out
+
+
+# Start method of the processes of the full text search: The forkserver is
+# cheaper to start from than a new interpreter, but only available on unix.
+_grep_start_method = (
+    "forkserver"
+    if "forkserver" in multiprocessing.get_all_start_methods()
+    else "spawn"
+)
+
+
+@app.route("/grep/<path:pattern>")
+@with_state
+def grep_notes(current: ServerState, pattern):
+    """Regex search over the contents of all notes. Results are streamed to
+    the browser as they come in.
+    """
+    zk = current.zk
+    notes = list(zk.notes)
+    try:
+        # Forking from the multithreaded server could copy locks in a held
+        # state into the workers, so they are started fresh.
+        matches = grep(
+            [note.path for note in notes],
+            pattern,
+            flags=re.IGNORECASE,
+            start_method=_grep_start_method,
+        )
+    except re.error as e:
+        return f"Invalid regular expression: {html.escape(str(e))}"
+    nid2note = {note.nid: note for note in notes}
+
+    def generate():
+        yield f"<h1>Search results for <code>{html.escape(pattern)}</code></h1>"
+        yield "<ul>"
+        n_matches = 0
+        # Includes the time to send the results to the client
+        with search_seconds.time(kind="fulltext"):
+            for match in matches:
+                n_matches += 1
+                title = match.nid
+                if match.nid in nid2note:
+                    title = nid2note[match.nid].title
+                yield (
+                    f'<li><a href="/open/{match.nid}">{html.escape(title)}</a>'
+                    f":{match.lineno}: <code>{html.escape(match.line)}</code>"
+                    f"</li>\n"
+                )
+        yield "</ul>"
+        yield f"<p>{n_matches} matches.</p>"
+
+    return Response(stream_with_context(generate()), mimetype="text/html")
+
+
 @app.route("/lucky/<search>")
-def search_lucky(search):
+@with_state
+def search_lucky(current: ServerState, search):
     search = Path(search).stem
     if search.startswith("."):
         logger.debug(f"Redirecting to {search[1:]}")
         # e.g. allows access the dashboard with .dashboard
         return redirect(f"/{search[1:]}")
-    results = zk.search(search)
+    results = current.zk.search(search)
     if results:
         return redirect(f"/open/{results[0].nid}")
     else:
@@ -140,14 +424,44 @@ def search_lucky(search):
 
 
 @app.route("/open/<notespec>")
-def open(notespec: str):
-    logger.debug(f"Opening {notespec}")
+@with_state
+def open(current: ServerState, notespec: str):
+    return open_note(current, notespec)
+
+
+def find_note(zk: Zettelkasten, notespec: str) -> Note:
+    """Note by ID or by (file) name
+
+    Raises:
+        KeyError if there is no such note, ValueError if the name is
+        ambiguous
+    """
     if notespec.isnumeric():
-        note = zk[notespec]
-    else:
-        note = zk.get_by_path(notespec)
-    converted = pandoc_converter.convert(note)
-    dot = "".join(dotgraph_html(zk, note))
+        return zk[notespec]
+    return zk.get_by_path(notespec)
+
+
+def note_etag(current: ServerState, note: Note, text: str) -> str:
+    # The page also contains the graph of the environment of the note
+    return page_etag(
+        current.zk.version,
+        _template_mtime("page.html"),
+        current.html_converter.render_key(note, text),
+    )
+
+
+def render_note_page(current: ServerState, note: Note, converted: str) -> str:
+    """Full page of a note (needs a request context)"""
+    dot = "".join(
+        dotgraph_html(
+            current.zk,
+            note,
+            vis_js_url=url_for("static", filename="js/vis-network.min.js"),
+            graph_js_url=url_for("static", filename="js/graph.js"),
+            # URL of the graph of any note is this prefix plus its ID
+            api_url=url_for("api_graph", nid=note.nid)[: -len(note.nid)],
+        )
+    )
     return render_template(
         "page.html",
         pandoc_output=converted,
@@ -156,19 +470,154 @@ def open(notespec: str):
     )
 
 
+def render_failed(note: Note, error: RenderError) -> Response:
+    """Response for a note that couldn't be rendered. It has no validators
+    and must not be cached, so that the next request tries again."""
+    logger.error(str(error))
+    response = make_response(
+        f"Failed to render {html.escape(note.title)}, see log.", 500
+    )
+    response.cache_control.no_store = True
+    return response
+
+
+def open_note(current: ServerState, notespec: str):
+    logger.debug(f"Opening {notespec}")
+    try:
+        note = find_note(current.zk, notespec)
+    except KeyError:
+        return f"No note {html.escape(notespec)}", 404
+    except ValueError as e:
+        return html.escape(str(e)), 404
+    text = note.path.read_text()
+    etag = note_etag(current, note, text)
+    cached = not_modified(etag)
+    if cached is not None:
+        return cached
+    try:
+        converted = current.html_converter.convert(note, text=text)
+    except RenderError as e:
+        return render_failed(note, e)
+    page = render_note_page(current, note, converted)
+    return cacheable(
+        page, etag, last_modified=note_last_modified(current.zk, note)
+    )
+
+
+@app.route("/api/graph/<nid>")
+@with_state
+def api_graph(current: ServerState, nid: str):
+    """Graph of the environment of a note as JSON, see
+    :func:`verzettler.note_graph.environment_json`"""
+    zk = current.zk
+    if nid not in zk:
+        return jsonify(error=f"No note {nid}"), 404
+    etag = page_etag("graph", zk.version, nid)
+    cached = not_modified(etag)
+    if cached is not None:
+        return cached
+    return cacheable(
+        Response(environment_json(zk, nid), mimetype="application/json"),
+        etag,
+    )
+
+
+def _allow_any_origin(response: Response) -> Response:
+    # The level of detail view of zk_web is a local file
+    response.headers["Access-Control-Allow-Origin"] = "*"
+    return response
+
+
+def _max_clusters() -> Optional[int]:
+    """``max_clusters`` parameter of the request (None if invalid)"""
+    max_clusters = request.args.get(
+        "max_clusters", default=default_max_clusters, type=int
+    )
+    if max_clusters is None or max_clusters < 1:
+        return None
+    return max_clusters
+
+
+@app.route("/api/clusters/<mode>")
+@with_state
+def api_clusters(current: ServerState, mode: str):
+    """Graph of the clusters of notes as JSON, see
+    :func:`verzettler.clusters.cluster_graph`. The number of clusters can be
+    limited with the ``max_clusters`` parameter."""
+    zk = current.zk
+    if mode not in cluster_modes:
+        return jsonify(error=f"Unknown mode {mode}"), 404
+    max_clusters = _max_clusters()
+    if max_clusters is None:
+        return _allow_any_origin(
+            make_response(jsonify(error="Invalid max_clusters"), 400)
+        )
+    etag = page_etag("clusters", zk.version, mode, max_clusters)
+    cached = not_modified(etag)
+    if cached is not None:
+        return _allow_any_origin(cached)
+    graph = cluster_graph(zk, mode, max_clusters=max_clusters)
+    return _allow_any_origin(cacheable(jsonify(graph), etag))
+
+
+@app.route("/api/clusters/<mode>/<path:cluster>")
+@with_state
+def api_expand_cluster(current: ServerState, mode: str, cluster: str):
+    """Notes of a cluster as JSON, see
+    :func:`verzettler.clusters.expand_cluster`. Clusters that the client
+    already expanded are given as (repeated) ``expanded`` parameter,
+    ``max_clusters`` has to be the same as for the graph of the clusters."""
+    zk = current.zk
+    if mode not in cluster_modes:
+        return jsonify(error=f"Unknown mode {mode}"), 404
+    max_clusters = _max_clusters()
+    if max_clusters is None:
+        return _allow_any_origin(
+            make_response(jsonify(error="Invalid max_clusters"), 400)
+        )
+    expanded = sorted(set(request.args.getlist("expanded")))
+    etag = page_etag(
+        "cluster", zk.version, mode, max_clusters, cluster, *expanded
+    )
+    cached = not_modified(etag)
+    if cached is not None:
+        return _allow_any_origin(cached)
+    try:
+        graph = expand_cluster(
+            zk, mode, cluster, expanded=expanded, max_clusters=max_clusters
+        )
+    except KeyError:
+        return _allow_any_origin(
+            make_response(jsonify(error=f"No cluster {cluster}"), 404)
+        )
+    return _allow_any_origin(cacheable(jsonify(graph), etag))
+
+
 @app.route("/edit/<string:notespec>", methods=["POST", "GET"])
 def edit(notespec: str):
     if request.method == "GET":
         logger.debug(f"Opening in the editor {notespec}")
-        content = Path(zk[notespec].path).read_text()
+        with state.read() as current:
+            path = current.zk[notespec].path
+        content = Path(path).read_text()
         url = "/edit/" + notespec
         return render_template("edit.html", value=content, id=url)
     elif request.method == "POST":
         new_version = request.json["content"]
-        path = zk[notespec].path
-        logger.debug(f"Save from the editor {notespec} to {path}")
-        with path.open("w") as outf:
-            outf.write(new_version)
+        # Serializes writing with other modifications and reloads
+        with state.modify() as current:
+            path = current.zk[notespec].path
+            logger.debug(f"Save from the editor {notespec} to {path}")
+            with path.open("w") as outf:
+                outf.write(new_version)
+            old = current.zk.update_note(notespec, new_version)
+            if render_cache is not None:
+                # Renders of notes linking here only change with the title
+                render_cache.invalidate(
+                    [notespec],
+                    dependents=old.title != current.zk[notespec].title,
+                )
+        dashboard_cache.refresh(current.zk)
         return redirect(f"/open/{notespec}")
     else:
         raise ValueError
@@ -176,8 +625,9 @@ def edit(notespec: str):
 
 @app.route("/open/")
 @app.route("/")
-def root():
-    return open(zk.root)
+@with_state
+def root(current: ServerState):
+    return open_note(current, current.zk.root)
 
 
 @app.route("/assets/<path:path>")
@@ -187,7 +637,10 @@ def assets(path: str):
     path = Path("/" + path)
     assert path.suffix.lower() in [".png", ".svg", ".jpg", ".jpeg"]
     logger.debug(f"Asset {path}")
-    return send_file(path)
+    # Answers with 304 if the file is unchanged
+    response = send_file(path, conditional=True)
+    response.cache_control.no_cache = True
+    return response
 
 
 def main():
@@ -195,17 +648,84 @@ def main():
 
     add_zk_dirs_arg(parser)
     add_debug_args(parser)
+    parser.add_argument(
+        "--render-cache-size",
+        help="Maximal size of the in-memory cache of rendered notes in MB. "
+        "0 disables the cache.",
+        type=float,
+        default=64,
+    )
+    parser.add_argument(
+        "--persist-render-cache",
+        help="Also keep rendered notes on disk, so that they survive "
+        "restarts of the server.",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--renderer",
+        help="How to render notes to HTML: With pandoc or in-process with "
+        "the python markdown package (faster, but needs 'markdown' and "
+        "'pygments' to be installed).",
+        choices=list(html_converters),
+        default="pandoc",
+    )
+    parser.add_argument(
+        "--no-compression",
+        help="Do not compress responses with gzip or brotli.",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--async",
+        dest="use_async",
+        help="Serve asynchronously with uvicorn, so that notes are rendered "
+        "concurrently (needs 'uvicorn' and 'asgiref' to be installed).",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--max-renders",
+        help="With --async: Maximal number of notes that are rendered "
+        "concurrently. Default: Number of CPUs.",
+        type=int,
+        default=None,
+    )
     args = parser.parse_args()
     default_arg_handling(args)
 
-    global zk
     global zk_directories
+    global render_cache
+    global converter_class
+    if args.render_cache_size > 0:
+        render_cache = RenderCache(
+            max_bytes=int(args.render_cache_size * 2**20),
+            directory=get_cache_dir() / "render"
+            if args.persist_render_cache
+            else None,
+        )
+    else:
+        render_cache = None
+    converter_class = html_converters[args.renderer]
     zk_directories = args.input
-    for d in zk_directories:
-        zk.add_notes_from_directory(d)
+    current = state.replace(lambda _: load_state(zk_directories))
+    dashboard_cache.refresh(current.zk)
+
+    if args.no_compression:
+        compression.enabled = False
+    else:
+        compression.precompress_static()
 
     app.logger.setLevel(logging.DEBUG)
-    app.run()
+    if args.use_async:
+        # Imported here, because it imports this module
+        from verzettler.asgi import serve
+
+        serve(
+            app,
+            state,
+            compression=compression if compression.enabled else None,
+            max_renders=args.max_renders,
+        )
+    else:
+        app.run()
 
 
 if __name__ == "__main__":
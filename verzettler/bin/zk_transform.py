@@ -1,15 +1,65 @@
 #!/usr/bin/env python3
 
+# std
+import argparse
+
 # ours
 from verzettler.cli_util import init_zk_from_cli
 from verzettler.note_transformer import DefaultTransformer
+from verzettler.transform_manifest import (
+    TransformManifest,
+    default_manifest_path,
+    transform_incremental,
+)
+from verzettler.util.write import WriteSummary
+from verzettler.log import logger
+
+
+def add_additional_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only transform notes whose content, links or backlinks changed "
+        "since the last incremental run (recorded in a manifest).",
+    )
+    parser.add_argument(
+        "-j",
+        "--processes",
+        help="Transform notes in this many worker processes. 0: Number of "
+        "CPUs. Default: 1 (no worker processes).",
+        type=int,
+        default=1,
+    )
+    parser.add_argument(
+        "--manifest",
+        help="Manifest for --incremental. Default: One per set of input "
+        "directories in the cache directory.",
+    )
 
 
 def cli():
-    zk, _ = init_zk_from_cli()
+    zk, args = init_zk_from_cli(
+        additional_argparse_setup=add_additional_arguments
+    )
     t = DefaultTransformer(zk=zk)
-    for z in zk.notes:
-        t.transform_write(z)
+    summary = WriteSummary()
+    # 0 -> None, i.e. number of CPUs
+    processes = args.processes or None
+    if args.incremental:
+        manifest = TransformManifest(
+            args.manifest or default_manifest_path(args.input),
+            transformer=type(t).__name__,
+        )
+        skipped = transform_incremental(
+            zk, t, manifest, summary=summary, processes=processes
+        )
+        manifest.save()
+        logger.info(
+            f"Transformed notes: {summary}, {skipped} skipped as up to date"
+        )
+        return
+    t.transform_write_many(zk.notes, summary=summary, processes=processes)
+    logger.info(f"Transformed notes: {summary}")
 
 
 if __name__ == "__main__":
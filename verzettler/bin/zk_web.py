@@ -9,42 +9,91 @@ import sys
 from verzettler.cli_util import init_zk_from_cli
 from verzettler.zettelkasten import Zettelkasten
 from verzettler.log import logger
-from verzettler.dotgraphgenerator import DotGraphGenerator
-
-
-def format_dot_html(dot_str: str) -> str:
-    html_resource_dir = (
-        Path(__file__).parent.resolve().parent / "html_resources"
-    )
-    js_resource_dir = Path(__file__).parent.resolve().parent / "static/js/"
-    js_path = js_resource_dir / "vis-network.min.js"
-    html_path = html_resource_dir / "dot.html"
-    dot_str = dot_str.replace("'", "\\'")
-    dot_str = dot_str.replace("\n", "' + \n'")
+from verzettler.graph_export import export_graph
+from verzettler.graph_export import writers as graph_writers
+from verzettler.layout import layout_zettelkasten
+from verzettler.clusters import cluster_graph
+from verzettler.clusters import modes as cluster_modes
+from verzettler.clusters import default_max_clusters
+from verzettler.note_graph import dumps, embed_json, graph_data
+
+#: zk_server, which opens the notes
+server_url = "http://127.0.0.1:5000"
+
+
+def format_graph_html(graph_json: str, cluster_url: str = "") -> str:
+    """Standalone HTML page that draws a graph in the format of
+    :func:`verzettler.note_graph.graph_data` with static/js/graph.js.
+
+    Args:
+        graph_json: Graph
+        cluster_url: URL of ``/api/clusters/<mode>/`` of zk_server, to
+            expand clusters of notes. Its query (e.g. ``max_clusters``) is
+            kept when requesting a cluster.
+    """
+    resource_dir = Path(__file__).parent.resolve().parent
+    html_path = resource_dir / "html_resources" / "graph.html"
+    js_resource_dir = resource_dir / "static" / "js"
     with open(html_path) as html_file:
-        html = "\n".join(html_file.readlines())
-        html = html.replace("{js_path}", str(js_path.resolve()))
-        html = html.replace("{dotgraph}", dot_str)
+        html = html_file.read()
+    html = html.replace(
+        "{vis_js_path}", str(js_resource_dir / "vis-network.min.js")
+    )
+    html = html.replace("{graph_js_path}", str(js_resource_dir / "graph.js"))
+    data = ""
+    if cluster_url:
+        data = f' data-cluster-url="{cluster_url}"'
+    html = html.replace("{data}", data)
+    # Last, so that the graph itself is never searched for placeholders
+    html = html.replace("{graph}", embed_json(graph_json, "note-graph-data"))
     return html
 
 
-def _get_dot(zk: Zettelkasten):
-    return DotGraphGenerator(zk=zk).graph_from_notes(
-        list(map(lambda n: n.nid, zk.notes))
+def _get_graph_json(
+    zk: Zettelkasten, physics: bool = False, iterations: int = 100
+) -> str:
+    """Graph of all notes. Unless physics is requested, the positions of the
+    notes are computed here (and cached), so that the browser doesn't have
+    to simulate the graph."""
+    positions = None
+    if not physics:
+        positions = layout_zettelkasten(zk, iterations=iterations)
+    graph = graph_data(
+        zk,
+        (note.nid for note in zk.notes),
+        url=server_url + "/open/{nid}",
+        positions=positions,
     )
+    return dumps(graph)
 
 
-def _output_html(zk: Zettelkasten, path: Path) -> None:
-    with path.open("w") as outf:
-        outf.write(format_dot_html(_get_dot(zk)))
+def _output_html(zk: Zettelkasten, path: Path, args) -> None:
+    if args.lod:
+        graph_json = dumps(
+            cluster_graph(zk, args.lod, max_clusters=args.max_clusters)
+        )
+        # The server has to build the same clusters
+        cluster_url = (
+            f"{server_url}/api/clusters/{args.lod}/"
+            f"?max_clusters={args.max_clusters}"
+        )
+    else:
+        graph_json = _get_graph_json(
+            zk, physics=args.physics, iterations=args.layout_iterations
+        )
+        cluster_url = ""
+    with path.open("w", encoding="utf-8") as outf:
+        outf.write(format_graph_html(graph_json, cluster_url=cluster_url))
 
 
-def _output_dot(zk: Zettelkasten, path: Path) -> None:
-    with path.open("w") as outf:
-        outf.write(_get_dot(zk=zk))
+def _output_graph(zk: Zettelkasten, path: Path, args) -> None:
+    export_graph(zk, path, url=server_url + "/open/{nid}")
 
 
-output_format_to_converter = {".html": _output_html, ".dot": _output_dot}
+output_format_to_converter = {
+    ".html": _output_html,
+    **{suffix: _output_graph for suffix in graph_writers},
+}
 
 
 def cli():
@@ -56,16 +105,46 @@ def cli():
             f"supported: {', '.join(output_format_to_converter.keys())}.",
             default="out.html",
         )
+        parser.add_argument(
+            "--physics",
+            action="store_true",
+            help="HTML output: Let the browser position the notes with a "
+            "physics simulation instead of computing the layout up front. "
+            "Slow for large graphs.",
+        )
+        parser.add_argument(
+            "--layout-iterations",
+            type=int,
+            default=100,
+            help="HTML output: Number of iterations of the force directed "
+            "layout. Layouts are cached.",
+        )
+        parser.add_argument(
+            "--lod",
+            choices=cluster_modes,
+            help="HTML output: Level of detail view for large "
+            "Zettelkastens. Notes are collapsed into clusters by category "
+            "or by communities of the graph. Clusters can be expanded by "
+            "clicking on them while zk_server is running.",
+        )
+        parser.add_argument(
+            "--max-clusters",
+            type=int,
+            default=default_max_clusters,
+            help="With --lod: Maximal number of clusters, smaller clusters "
+            "are merged.",
+        )
 
     zk, args = init_zk_from_cli(
         additional_argparse_setup=add_additional_arguments
     )
     args.output = Path(args.output)
     try:
-        output_format_to_converter[args.output.suffix](zk, args.output)
+        converter = output_format_to_converter[args.output.suffix]
     except KeyError:
         logger.critical(f"Unsupported suffix: {args.output.suffix}")
         sys.exit(86)
+    converter(zk, args.output, args)
 
 
 if __name__ == "__main__":
@@ -74,11 +74,11 @@ def zk_name_pie_chart(zk: Zettelkasten):
     )
     print(x)
     data["angle"] = data["value"] / data["value"].sum() * 2 * pi
-    # fixme: problems if we have <= 2 zks
-    data["color"] = Reds[len(x)]
+    # Palettes only exist for 3 or more colors
+    data["color"] = Reds[max(3, len(x))][: len(x)]
 
     p = figure(
-        plot_height=350,
+        height=350,
         title="Pie Chart",
         toolbar_location=None,
         tools="hover",
@@ -32,7 +32,7 @@ def int_hist_from_binned_data(
 
     # Set up the figure same as before
     p = figure(
-        plot_height=300,
+        height=300,
         sizing_mode="scale_width",
         title=title,
         x_axis_label=x_axis_label,
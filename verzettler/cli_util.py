@@ -2,6 +2,7 @@
 
 # std
 import argparse
+import atexit
 import sys
 from typing import Callable, Tuple, List, Optional
 import os
@@ -15,6 +16,7 @@ from termcolor import colored
 # ours
 from verzettler.util.paths import get_zk_base_dirs_from_env, pass_fct
 from verzettler.log import logger
+from verzettler.util.profiling import Profiler
 
 
 def add_debug_args(parser: argparse.ArgumentParser) -> None:
@@ -26,6 +28,18 @@ def add_debug_args(parser: argparse.ArgumentParser) -> None:
         default="i",
         choices=list("diwec"),
     )
+    parser.add_argument(
+        "--profile",
+        help="Profile the command and print a report of where the time was "
+        "spent (loading, parsing, graph building, ...) when it exits.",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--profile-output",
+        help="Write the raw cProfile data to this file, e.g. to inspect it "
+        "with snakeviz. Implies --profile.",
+        default=None,
+    )
 
 
 def add_zk_dirs_arg(parser: argparse.ArgumentParser) -> None:
@@ -49,6 +63,10 @@ def default_arg_handling(args: argparse.Namespace) -> None:
             "c": logging.CRITICAL,
         }
         logger.setLevel(abbrev2loglevel[args.log])
+    if getattr(args, "profile", False) or getattr(args, "profile_output", None):
+        profiler = Profiler(output=args.profile_output)
+        profiler.start()
+        atexit.register(profiler.print_report)
     if hasattr(args, "input"):
         if not args.input:
             args.input = get_zk_base_dirs_from_env()
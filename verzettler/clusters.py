@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+
+""" Level of detail view of the graph of very large Zettelkastens: Notes
+are collapsed into clusters, either by their category tags (``c_*``, the
+same categories that
+:class:`verzettler.nodecolorpicker.CategoryNodeColorPicker` colors) or by
+communities of the link graph. Clusters are linked if their notes are, the
+weight of the link is the number of links between the notes.
+
+Clusters can be expanded into their notes one at a time
+(``/api/clusters/<mode>/<cluster>`` of zk_server), so that the number of
+drawn elements stays bounded.
+"""
+
+# std
+import collections
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+# 3rd
+import networkx as nx
+
+# ours
+from verzettler.layout import layout_notes
+from verzettler.metrics import registry
+from verzettler.note_graph import graph_data
+
+#: Ways to cluster notes
+modes = ["categories", "communities"]
+
+#: Cluster of notes without category
+uncategorized = "uncategorized"
+
+#: Cluster of the notes of all clusters beyond max_clusters
+other = "other"
+
+#: Prefix of the node IDs of clusters (note IDs are numbers)
+cluster_prefix = "cluster:"
+
+#: Default for the maximal number of clusters
+default_max_clusters = 200
+
+
+def category_clusters(zk) -> Dict[str, str]:
+    """Cluster notes by category. Notes with several categories are put
+    into the largest of them.
+
+    Returns:
+        Mapping of note ID to cluster
+    """
+    counts = zk.tag_counts
+    clusters = {}
+    for note in zk.notes:
+        categories = [t for t in note.tags if t.startswith("c_")]
+        if categories:
+            clusters[note.nid] = min(
+                categories, key=lambda c: (-counts.get(c, 0), c)
+            )
+        else:
+            clusters[note.nid] = uncategorized
+    return clusters
+
+
+def community_clusters(zk, seed: int = 0) -> Dict[str, str]:
+    """Cluster notes by communities of the (undirected) link graph, found
+    with the Louvain method. Communities are named after their note with
+    the most links.
+
+    Returns:
+        Mapping of note ID to cluster
+    """
+    g = nx.Graph()
+    g.add_nodes_from(note.nid for note in zk.notes)
+    g.add_edges_from(
+        (note.nid, link)
+        for note in zk.notes
+        for link in note.links
+        if link in zk and link != note.nid
+    )
+    communities = nx.algorithms.community.louvain_communities(g, seed=seed)
+    clusters = {}
+    for community in communities:
+        center = min(community, key=lambda nid: (-g.degree(nid), nid))
+        for nid in community:
+            clusters[nid] = f"{zk[center].title} ({center})"
+    return clusters
+
+
+def _limit_clusters(
+    clusters: Dict[str, str], max_clusters: int
+) -> Dict[str, str]:
+    """Merge the smallest clusters into :data:`other`"""
+    sizes = collections.Counter(clusters.values())
+    if len(sizes) <= max_clusters:
+        return clusters
+    keep = {
+        cluster
+        for cluster, _ in sorted(sizes.items(), key=lambda x: (-x[1], x[0]))[
+            : max_clusters - 1
+        ]
+    }
+    return {
+        nid: cluster if cluster in keep else other
+        for nid, cluster in clusters.items()
+    }
+
+
+@lru_cache(maxsize=4)
+def _clusters(zk, version: int, mode: str, max_clusters: int) -> Dict[str, str]:
+    if mode == "categories":
+        clusters = category_clusters(zk)
+    elif mode == "communities":
+        clusters = community_clusters(zk)
+    else:
+        raise ValueError(f"Unknown mode {mode}, use one of {modes}")
+    return _limit_clusters(clusters, max_clusters)
+
+
+registry.register_lru_cache(
+    "clusters", _clusters, help="Clusterings of the notes for the LOD view"
+)
+
+
+def get_clusters(
+    zk, mode: str, max_clusters: int = default_max_clusters
+) -> Dict[str, str]:
+    """Cluster of every note (cached per version of the Zettelkasten).
+
+    Args:
+        zk: Zettelkasten
+        mode: One of :data:`modes`
+        max_clusters: The notes of the smallest clusters are merged into
+            :data:`other` to stay below this number of clusters
+
+    Returns:
+        Mapping of note ID to cluster
+
+    Raises:
+        ValueError: Unknown mode
+    """
+    return _clusters(zk, zk.version, mode, max_clusters)
+
+
+def cluster_id(cluster: str) -> str:
+    """ID of the node of a cluster"""
+    return cluster_prefix + cluster
+
+
+def _aggregate(links: Iterable[Tuple[str, str]]) -> List[List[Any]]:
+    """Edges ``[from, to, both, weight]`` from links between nodes: Links in
+    both directions are joined, weight is the number of links."""
+    weights = collections.Counter()  # type: Dict[Tuple[str, str], int]
+    directions = collections.defaultdict(set)  # type: Dict[Tuple, Set[str]]
+    for source, target in links:
+        if source == target:
+            continue
+        key = (source, target) if source < target else (target, source)
+        weights[key] += 1
+        directions[key].add(source)
+    return [
+        [a, b, int(len(directions[(a, b)]) == 2), weight]
+        for (a, b), weight in sorted(weights.items())
+    ]
+
+
+def _heaviest(edges: List[List[Any]], max_edges: int) -> List[List[Any]]:
+    if len(edges) <= max_edges:
+        return edges
+    return sorted(edges, key=lambda e: (-e[3], e[0], e[1]))[:max_edges]
+
+
+def cluster_graph(
+    zk,
+    mode: str,
+    max_clusters: int = default_max_clusters,
+    max_edges: int = 2000,
+    positions: bool = True,
+) -> Dict[str, Any]:
+    """Graph of the clusters in the format of
+    :func:`verzettler.note_graph.environment_json`. Nodes have the additional
+    keys ``cluster`` (name of the cluster) and ``size`` (number of notes),
+    edges are ``[from, to, both, weight]``.
+
+    Args:
+        zk: Zettelkasten
+        mode: See :func:`get_clusters`
+        max_clusters: See :func:`get_clusters`
+        max_edges: Only keep the edges with the highest weights
+        positions: Add positions from :func:`verzettler.layout.layout_notes`
+
+    Returns:
+        Object with ``mode``, ``nodes`` and ``edges``
+    """
+    clusters = get_clusters(zk, mode, max_clusters=max_clusters)
+    sizes = collections.Counter(clusters.values())
+    edges = _heaviest(
+        _aggregate(
+            (cluster_id(clusters[note.nid]), cluster_id(clusters[link]))
+            for note in zk.notes
+            for link in note.links
+            if link in clusters
+        ),
+        max_edges,
+    )
+    layout = {}  # type: Dict[str, Tuple[float, float]]
+    if positions:
+        layout = layout_notes(
+            [cluster_id(c) for c in sizes],
+            [(e[0], e[1]) for e in edges],
+            scale=100.0,
+        )
+    nodes = []
+    for cluster, size in sorted(sizes.items()):
+        node = {
+            "id": cluster_id(cluster),
+            "label": f"{cluster} ({size})",
+            "group": "cluster",
+            "cluster": cluster,
+            "size": size,
+        }  # type: Dict[str, Any]
+        if node["id"] in layout:
+            node["x"], node["y"] = layout[node["id"]]
+        nodes.append(node)
+    return {"mode": mode, "nodes": nodes, "edges": edges}
+
+
+def expand_cluster(
+    zk,
+    mode: str,
+    cluster: str,
+    expanded: Iterable[str] = (),
+    max_nodes: int = 500,
+    max_clusters: int = default_max_clusters,
+    url: str = "/open/{nid}",
+) -> Dict[str, Any]:
+    """The notes of a cluster, to replace the node of the cluster.
+
+    Args:
+        zk: Zettelkasten
+        mode: See :func:`get_clusters`
+        cluster: Name of the cluster
+        expanded: Names of clusters that were already expanded. Links to
+            their notes are kept, links to the notes of other clusters are
+            aggregated into links to the cluster.
+        max_nodes: Only include the notes with the most links
+        max_clusters: See :func:`get_clusters`
+        url: See :func:`verzettler.note_graph.graph_data`
+
+    Returns:
+        Object in the format of :func:`verzettler.note_graph.graph_data`
+        with the additional keys ``cluster`` and ``truncated`` (number of
+        notes that were left out). Positions of the notes are relative to
+        the position of the cluster.
+
+    Raises:
+        KeyError: Unknown cluster
+    """
+    clusters = get_clusters(zk, mode, max_clusters=max_clusters)
+    members = [nid for nid, c in clusters.items() if c == cluster]
+    if not members:
+        raise KeyError(cluster)
+    if len(members) > max_nodes:
+        n_links = {
+            nid: len(zk[nid].links) + len(zk.get_backlinks(nid))
+            for nid in members
+        }
+        members = sorted(members, key=lambda nid: (-n_links[nid], nid))
+    shown = set(members[:max_nodes])
+    internal = [
+        (nid, link) for nid in shown for link in zk[nid].links if link in shown
+    ]
+    graph = graph_data(
+        zk,
+        shown,
+        url=url,
+        positions=layout_notes(shown, internal),
+    )
+    expanded = set(expanded) - {cluster}
+
+    def endpoint(nid: str) -> Optional[str]:
+        if nid in shown:
+            return nid
+        if nid not in clusters or clusters[nid] == cluster:
+            # Left out notes of this cluster
+            return None
+        if clusters[nid] in expanded:
+            return nid
+        return cluster_id(clusters[nid])
+
+    external = []
+    for nid in shown:
+        for link in zk[nid].links:
+            if link not in shown and endpoint(link) is not None:
+                external.append((nid, endpoint(link)))
+        for backlink in zk.get_backlinks(nid):
+            if backlink not in shown and endpoint(backlink) is not None:
+                external.append((endpoint(backlink), nid))
+    graph["edges"].extend(_aggregate(external))
+    graph["cluster"] = cluster
+    graph["truncated"] = len(members) - len(shown)
+    return graph
@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+
+""" gzip/brotli compression of zk_server responses, negotiated via the
+Accept-Encoding header. Static files are compressed only once.
+"""
+
+# std
+import collections
+import gzip
+import os
+import re
+import threading
+from pathlib import Path, PurePath
+from typing import Dict, Optional, Tuple, Union
+
+# 3rd
+from flask import Flask, Response, g, request
+from werkzeug.http import parse_accept_header
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# ours
+from verzettler.metrics import registry
+
+
+def available_encodings() -> Tuple[str, ...]:
+    """Supported content encodings, most preferred first"""
+    if brotli is not None:
+        return "br", "gzip"
+    return ("gzip",)
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """Pick content encoding based on the Accept-Encoding header.
+
+    >>> negotiate_encoding("gzip, deflate")
+    'gzip'
+    >>> negotiate_encoding("gzip;q=0, deflate") is None
+    True
+
+    Returns:
+        Encoding or None for no compression
+    """
+    if not accept_encoding:
+        return None
+    accepted = parse_accept_header(accept_encoding)
+    best = None
+    best_quality = 0.0
+    for encoding in available_encodings():
+        quality = accepted.quality(encoding)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    if encoding == "gzip":
+        return gzip.compress(data, compresslevel=6)
+    elif encoding == "br":
+        return brotli.compress(data, quality=5)
+    raise ValueError(f"Unknown encoding {encoding}")
+
+
+_compressible_types = {
+    "application/javascript",
+    "application/json",
+    "application/xml",
+    "image/svg+xml",
+}
+
+
+def is_compressible(mimetype: Optional[str]) -> bool:
+    if not mimetype:
+        return False
+    return mimetype.startswith("text/") or mimetype in _compressible_types
+
+
+# Compressed responses get an own ETag, because they are a different
+# representation. The encoding is appended to the ETag of the uncompressed
+# response.
+_etag_encoding_regex = re.compile(r"-(gzip|br)(?=\")")
+
+
+def add_etag_encoding(etag: str, encoding: str) -> str:
+    return f"{etag}-{encoding}"
+
+
+def strip_etag_encodings(if_none_match: str) -> Tuple[str, Optional[str]]:
+    """Remove encodings that were added by :func:`add_etag_encoding` from
+    an If-None-Match header, so that it can be compared against the ETags of
+    uncompressed responses.
+
+    >>> strip_etag_encodings('"abc-gzip", "def"')
+    ('"abc", "def"', 'gzip')
+
+    Returns:
+        Header value, last removed encoding (or None)
+    """
+    encodings = _etag_encoding_regex.findall(if_none_match)
+    if not encodings:
+        return if_none_match, None
+    return _etag_encoding_regex.sub("", if_none_match), encodings[-1]
+
+
+class Compression(object):
+    """Compresses responses of a flask app. Use :meth:`init_app` to register
+    it.
+
+    * Static files are compressed once and kept in memory (see
+      :meth:`precompress_static`).
+    * Compressed dynamic responses with an ETag are kept in a small LRU
+      cache, so that e.g. the dashboard is not compressed again for every
+      request.
+    * Streamed responses (e.g. grep results) and files that are passed
+      through (e.g. /assets) are not compressed.
+
+    Args:
+        static_directory: Directory of the static files of the app
+        min_size: Responses smaller than this (in bytes) are not compressed
+        max_cached: Maximal number of cached compressed dynamic responses
+    """
+
+    def __init__(
+        self,
+        static_directory: Optional[Union[str, PurePath]] = None,
+        min_size: int = 500,
+        max_cached: int = 32,
+    ):
+        self.static_directory = (
+            Path(static_directory) if static_directory is not None else None
+        )
+        self.min_size = min_size
+        self.max_cached = max_cached
+        self.enabled = True
+        # (path, mtime_ns, encoding) -> compressed data
+        self._static = {}  # type: Dict[Tuple[str, int, str], bytes]
+        # (etag, encoding) -> compressed data, least recently used first
+        self._dynamic = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def register_metrics(self, name: str = "compression") -> None:
+        """Report the hit rate of the cache of compressed responses to the
+        metrics registry"""
+        registry.register_cache(
+            name,
+            lambda: (
+                self.hits,
+                self.misses,
+                len(self._static) + len(self._dynamic),
+            ),
+            help="Compressed responses and static files",
+        )
+
+    # Static files
+    # =========================================================================
+
+    def static_compressed(
+        self, filename: str, encoding: str
+    ) -> Optional[bytes]:
+        """Compressed content of a static file (compressed on first use)
+
+        Args:
+            filename: Path relative to the static directory
+            encoding: Content encoding
+
+        Returns:
+            Compressed data or None if the file doesn't exist
+        """
+        path = self.static_directory / filename
+        try:
+            mtime_ns = path.stat().st_mtime_ns
+        except OSError:
+            return None
+        key = (str(path), mtime_ns, encoding)
+        with self._lock:
+            if key in self._static:
+                self.hits += 1
+                return self._static[key]
+        data = compress(path.read_bytes(), encoding)
+        with self._lock:
+            self.misses += 1
+            self._static[key] = data
+        return data
+
+    def precompress_static(self) -> int:
+        """Compress all static files with all available encodings.
+
+        Returns:
+            Number of compressed files
+        """
+        n_files = 0
+        for root, _, files in os.walk(str(self.static_directory)):
+            for file in files:
+                path = Path(root) / file
+                if path.stat().st_size < self.min_size:
+                    continue
+                filename = str(path.relative_to(self.static_directory))
+                for encoding in available_encodings():
+                    self.static_compressed(filename, encoding)
+                n_files += 1
+        return n_files
+
+    # Dynamic responses
+    # =========================================================================
+
+    def compressed(
+        self, data: bytes, encoding: str, etag: Optional[str] = None
+    ) -> bytes:
+        """Compress data, using the cache if an ETag is given"""
+        if etag is None:
+            return compress(data, encoding)
+        key = (etag, encoding)
+        with self._lock:
+            if key in self._dynamic:
+                self.hits += 1
+                self._dynamic.move_to_end(key)
+                return self._dynamic[key]
+        compressed = compress(data, encoding)
+        with self._lock:
+            self.misses += 1
+            self._dynamic[key] = compressed
+            while len(self._dynamic) > self.max_cached:
+                self._dynamic.popitem(last=False)
+        return compressed
+
+    # Flask
+    # =========================================================================
+
+    def init_app(self, app: Flask) -> None:
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+
+    def _before_request(self) -> None:
+        # Let the views compare the ETags of uncompressed responses
+        if_none_match = request.environ.get("HTTP_IF_NONE_MATCH")
+        if not if_none_match:
+            return
+        stripped, encoding = strip_etag_encodings(if_none_match)
+        if encoding is not None:
+            request.environ["HTTP_IF_NONE_MATCH"] = stripped
+            g.etag_encoding = encoding
+
+    def _after_request(self, response: Response) -> Response:
+        if not self.enabled:
+            return response
+        if response.status_code == 304:
+            etag, _ = response.get_etag()
+            encoding = g.get("etag_encoding")
+            if etag and encoding:
+                response.set_etag(add_etag_encoding(etag, encoding))
+            return response
+        if (
+            response.status_code != 200
+            or (response.is_streamed and request.endpoint != "static")
+            or "Content-Encoding" in response.headers
+            or not is_compressible(response.mimetype)
+        ):
+            return response
+        response.vary.add("Accept-Encoding")
+        encoding = negotiate_encoding(request.headers.get("Accept-Encoding"))
+        if encoding is None:
+            return response
+        if request.endpoint == "static":
+            if response.content_length and (
+                response.content_length < self.min_size
+            ):
+                return response
+            data = self.static_compressed(
+                request.view_args["filename"], encoding
+            )
+            if data is None:
+                return response
+            # Closes the file that would have been passed through
+            response.close()
+            response.direct_passthrough = False
+        else:
+            body = response.get_data()
+            if len(body) < self.min_size:
+                return response
+            etag, _ = response.get_etag()
+            data = self.compressed(body, encoding, etag=etag)
+        response.set_data(data)
+        response.headers["Content-Encoding"] = encoding
+        etag, _ = response.get_etag()
+        if etag:
+            response.set_etag(add_etag_encoding(etag, encoding))
+        return response
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+
+""" Statistics and plots for the dashboard of zk_server, computed in a
+background thread.
+"""
+
+# std
+import threading
+import contextlib
+from functools import lru_cache
+from typing import Any, Callable, ContextManager, Dict, Optional, Tuple
+
+# 3rd
+from bokeh.embed import components
+from bokeh.resources import INLINE
+import tabulate
+
+# ours
+from verzettler.zettelkasten import Zettelkasten
+from verzettler.log import logger
+from verzettler.bokeh_plots import (
+    make_backlink_histogram,
+    make_link_histogram,
+    depth_histogram,
+    zk_name_pie_chart,
+)
+
+
+@lru_cache(maxsize=1)
+def bokeh_resources() -> Tuple[str, str]:
+    """Inline bokeh javascript and css. These only depend on the bokeh
+    version and are therefore only rendered once.
+
+    Returns:
+        js resources, css resources
+    """
+    return INLINE.render_js(), INLINE.render_css()
+
+
+def compute_dashboard(zk: Zettelkasten) -> Dict[str, Any]:
+    """Everything the dashboard template needs except for the bokeh
+    resources.
+
+    Returns:
+        Dictionary with keys scripts, divs (bokeh components) and table
+    """
+    plots = [
+        make_link_histogram(zk=zk),
+        make_backlink_histogram(zk=zk),
+        depth_histogram(zk=zk),
+        zk_name_pie_chart(zk=zk),
+    ]
+    plots = [components(plot) for plot in plots]
+    scripts, divs = list(zip(*plots))
+
+    max_depth = max(zk.get_nnotes_by_depth().keys())
+    table_data = [
+        (f"Number of notes", f"{len(zk._nid2note)}"),
+        (f"Number of links", f"{zk._graph.size()}"),
+        (f"Links/note", f"{zk._graph.size()/len(zk._nid2note):.2f}"),
+        (f"Number of tags", f"{len(zk.tags)}"),
+        (f"Number of orphans", f"{len(zk.get_orphans())} "),
+        (f"Maximum depth", f"{max_depth}"),
+    ]
+    table = tabulate.tabulate(table_data, tablefmt="html")
+    return dict(scripts=list(scripts), divs=list(divs), table=table)
+
+
+class DashboardCache(object):
+    """Holds the dashboard of the latest version of a Zettelkasten that has
+    been computed. If the Zettelkasten changed, the dashboard is recomputed
+    in a background thread, while the old one is still being served.
+
+    The dashboard is computed from a copy of the Zettelkasten, so that it
+    can be modified in the meantime. A dashboard whose Zettelkasten changed
+    while it was computed is discarded and computed again.
+
+    Args:
+        read_lock: Returns a context manager that is held while copying
+            the Zettelkasten, e.g. to keep it from being modified
+            (see :meth:`verzettler.util.concurrency.SnapshotHolder.read`)
+    """
+
+    def __init__(
+        self, read_lock: Optional[Callable[[], ContextManager]] = None
+    ):
+        if read_lock is None:
+            read_lock = contextlib.nullcontext
+        self._read_lock = read_lock
+        self._lock = threading.Lock()
+        # Latest Zettelkasten we have been asked about (might be replaced
+        # by a new object on reload)
+        self._zk = None  # type: Optional[Zettelkasten]
+        self._version = None  # type: Optional[int]
+        self._dashboard = None  # type: Optional[Dict[str, Any]]
+        self._thread = None  # type: Optional[threading.Thread]
+        #: Version for which computing the dashboard raised an exception
+        #: (not retried)
+        self.failed_version = None  # type: Optional[int]
+
+    def refresh(self, zk: Zettelkasten) -> None:
+        """Start recomputing the dashboard in the background if it is not up
+        to date with zk.
+        """
+        with self._lock:
+            self._zk = zk
+            if zk.version in (self._version, self.failed_version):
+                return
+            if self._thread is not None and self._thread.is_alive():
+                # Will pick up the new zk when it's done
+                return
+            self._thread = threading.Thread(
+                target=self._run, name="dashboard", daemon=True
+            )
+            self._thread.start()
+
+    def get(
+        self, zk: Zettelkasten
+    ) -> Optional[Tuple[int, bool, Dict[str, Any]]]:
+        """Never blocks. Triggers a recomputation if the dashboard is out of
+        date.
+
+        Returns:
+            None if no dashboard has been computed yet, else a tuple of
+            the version of the Zettelkasten it has been computed for,
+            whether it is out of date and the dashboard
+            (see :func:`compute_dashboard`)
+        """
+        self.refresh(zk)
+        with self._lock:
+            if self._dashboard is None:
+                return None
+            return (
+                self._version,
+                self._version != zk.version,
+                self._dashboard,
+            )
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                zk = self._zk
+                if zk.version in (self._version, self.failed_version):
+                    self._thread = None
+                    return
+            # Only hold the lock while copying, not while computing
+            with self._read_lock():
+                version = zk.version
+                snapshot = zk.copy()
+            try:
+                dashboard = compute_dashboard(snapshot)
+            except Exception:
+                logger.exception("Failed to compute dashboard")
+                with self._lock:
+                    self.failed_version = version
+                continue
+            with self._lock:
+                if self._zk.version != version:
+                    logger.debug(f"Discarding dashboard for version {version}")
+                    continue
+                self._version = version
+                self._dashboard = dashboard
+            logger.debug(f"Computed dashboard for version {version}")
@@ -1,15 +1,26 @@
 #!/usr/bin/env python3
 
 # std
-from typing import Iterable
+from typing import Iterable, Iterator, Optional, TextIO
 
 # ours
 from verzettler.note import Note
 from verzettler.log import logger
 
 
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"')
+
+
 class DotGraphGenerator(object):
-    def __init__(self, zk):
+    """DOT graph of the notes
+
+    Args:
+        zk: Zettelkasten
+        url: Format of the URL of a note (``labelURL`` of the nodes)
+    """
+
+    def __init__(self, zk, url: str = "http://127.0.0.1:5000/open/{nid}"):
         self.prologue = [
             "digraph zettelkasten {",
             "\tnode [shape=box];"
@@ -17,33 +28,45 @@ class DotGraphGenerator(object):
         ]
         self.epilogue = ["}"]
         self.zk = zk
+        self.url = url
 
-    def graph_from_notes(self, nids: Iterable[str]):
-        lines = []
-        lines.extend(self.prologue)
-        drawn_links = []
-        notes = self.zk._nids2notes(nids)
-        for note in notes:
-            lines.append(self.format_note(note))
-            for link in note.links:
-                if link not in nids:
+    def iter_lines(self, nids: Optional[Iterable[str]] = None) -> Iterator[str]:
+        """Lines of the DOT graph of the notes (default: all notes). Links in
+        both directions are drawn once, as a single edge with arrows on both
+        ends.
+        """
+        yield from self.prologue
+        if nids is None:
+            nids = [note.nid for note in self.zk.notes]
+        else:
+            # Keep the order, but drop duplicates
+            nids = list(dict.fromkeys(nids))
+        selected = set(nids)
+        for nid in nids:
+            if nid not in self.zk:
+                continue
+            note = self.zk[nid]
+            yield self.format_note(note)
+            for link in dict.fromkeys(note.links):
+                if link not in selected or link == nid:
                     continue
-
                 if link not in self.zk:
                     logger.error(f"Didn't find note with id {link}.")
                     continue
-                if (note.nid, link) in drawn_links:
-                    continue
-                if note.nid not in self.zk._nid2note[link].links:
-                    lines.append(f'\t{note.nid} -> {link} [color="black"];')
-                    drawn_links.append((note.nid, link))
-                else:
-                    lines.append(
-                        f'\t{note.nid} -> {link} [color="black" dir="both"];'
-                    )
-                    drawn_links.extend([(note.nid, link), (link, note.nid)])
-        lines.extend(self.epilogue)
-        return "\n".join(lines)
+                line = self.format_link(nid, link)
+                if line is not None:
+                    yield line
+        yield from self.epilogue
+
+    def graph_from_notes(self, nids: Iterable[str]):
+        return "\n".join(self.iter_lines(nids))
+
+    def write(self, outf: TextIO, nids: Optional[Iterable[str]] = None) -> None:
+        """Write the DOT graph line by line to a file handle, see
+        :meth:`iter_lines`."""
+        for line in self.iter_lines(nids):
+            outf.write(line)
+            outf.write("\n")
 
     def get_color(self, note: Note):
         return "#8dd3c7"
@@ -51,12 +74,21 @@ class DotGraphGenerator(object):
     def get_fontsize(self, note: Note):
         return 14
 
+    def format_link(self, source: str, target: str) -> Optional[str]:
+        """Edge of a link. Links in both directions are drawn by the note
+        with the smaller ID, for the other one, None is returned."""
+        if not self.zk._graph.has_edge(target, source):
+            return f'\t{source} -> {target} [color="black"];'
+        if source < target:
+            return f'\t{source} -> {target} [color="black" dir="both"];'
+        return None
+
     def format_note(self, note: Note):
         return (
             f"\t{note.nid} ["
-            f'label="{note.title}" '
-            f'labelURL="http://127.0.0.1:5000/open/{note.nid}" '
-            f'color="{self.get_color(note)}"'
+            f'label="{_escape(note.title)}" '
+            f'labelURL="{_escape(self.url.format(nid=note.nid))}" '
+            f'color="{self.get_color(note)}" '
             f"fontsize={self.get_fontsize(note)}"
             f"];"
         )
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+
+""" Export of the graph of the notes to files in several formats (DOT,
+GraphML, GEXF and node-link JSON), e.g. for Gephi, Cytoscape or networkx.
+
+The writers stream nodes and edges to the file handle as they go, so that
+the memory needed doesn't grow with the number of links:
+
+    >>> import io
+    >>> from verzettler.zettelkasten import Zettelkasten
+    >>> outf = io.StringIO()
+    >>> GraphMLWriter(Zettelkasten()).write(outf)
+    >>> "<graphml" in outf.getvalue()
+    True
+"""
+
+# std
+from abc import ABC, abstractmethod
+import json
+from pathlib import Path, PurePath
+from typing import (
+    Dict,
+    Iterable,
+    Iterator,
+    Optional,
+    TextIO,
+    Tuple,
+    Type,
+    Union,
+)
+from xml.sax.saxutils import escape, quoteattr
+
+# ours
+from verzettler.dotgraphgenerator import DotGraphGenerator
+from verzettler.note import Note
+
+
+class GraphWriter(ABC):
+    """Base class of the writers. Subclasses write the nodes and the edges
+    in between :meth:`write_header` and :meth:`write_footer`.
+
+    Args:
+        zk: Zettelkasten
+        url: Format of the URL of a note that is added to the nodes
+    """
+
+    def __init__(self, zk, url: str = "http://127.0.0.1:5000/open/{nid}"):
+        self.zk = zk
+        self.url = url
+
+    def _nids(self, nids: Optional[Iterable[str]]) -> Iterable[str]:
+        if nids is None:
+            return [note.nid for note in self.zk.notes]
+        # Keep the order, but drop duplicates and unknown notes
+        return [nid for nid in dict.fromkeys(nids) if nid in self.zk]
+
+    def iter_links(self, nids: Iterable[str]) -> Iterator[Tuple[str, str]]:
+        """Links (source, target) between the notes. Repeated links of a note
+        are only reported once."""
+        selected = set(nids)
+        for nid in nids:
+            for link in dict.fromkeys(self.zk[nid].links):
+                if link in selected and link != nid:
+                    yield nid, link
+
+    def write(self, outf: TextIO, nids: Optional[Iterable[str]] = None) -> None:
+        """Write the graph of the notes.
+
+        Args:
+            outf: File handle
+            nids: IDs of the notes. Default: All notes.
+        """
+        nids = self._nids(nids)
+        self.write_header(outf)
+        for i, nid in enumerate(nids):
+            self.write_node(outf, self.zk[nid], first=i == 0)
+        self.write_separator(outf)
+        for i, (source, target) in enumerate(self.iter_links(nids)):
+            self.write_edge(outf, source, target, first=i == 0)
+        self.write_footer(outf)
+
+    def write_header(self, outf: TextIO) -> None:
+        pass
+
+    @abstractmethod
+    def write_node(self, outf: TextIO, note: Note, first: bool) -> None:
+        pass
+
+    def write_separator(self, outf: TextIO) -> None:
+        pass
+
+    @abstractmethod
+    def write_edge(
+        self, outf: TextIO, source: str, target: str, first: bool
+    ) -> None:
+        pass
+
+    def write_footer(self, outf: TextIO) -> None:
+        pass
+
+
+class DotWriter(GraphWriter):
+    """DOT, as written by :class:`verzettler.dotgraphgenerator.DotGraphGenerator`
+    (links in both directions are drawn as one edge)"""
+
+    def __init__(self, zk, **kwargs):
+        super().__init__(zk, **kwargs)
+        self._generator = DotGraphGenerator(zk, url=self.url)
+
+    def write_header(self, outf: TextIO) -> None:
+        for line in self._generator.prologue:
+            outf.write(line + "\n")
+
+    def write_node(self, outf: TextIO, note: Note, first: bool) -> None:
+        outf.write(self._generator.format_note(note) + "\n")
+
+    def write_edge(
+        self, outf: TextIO, source: str, target: str, first: bool
+    ) -> None:
+        line = self._generator.format_link(source, target)
+        if line is not None:
+            outf.write(line + "\n")
+
+    def write_footer(self, outf: TextIO) -> None:
+        for line in self._generator.epilogue:
+            outf.write(line + "\n")
+
+
+class GraphMLWriter(GraphWriter):
+    def write_header(self, outf: TextIO) -> None:
+        outf.write(
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<graphml xmlns="http://graphml.graphdrawing.org/xmlns">\n'
+            '  <key id="label" for="node" attr.name="label" '
+            'attr.type="string"/>\n'
+            '  <key id="url" for="node" attr.name="url" attr.type="string"/>\n'
+            '  <graph id="zettelkasten" edgedefault="directed">\n'
+        )
+
+    def write_node(self, outf: TextIO, note: Note, first: bool) -> None:
+        outf.write(
+            f"    <node id={quoteattr(note.nid)}>"
+            f'<data key="label">{escape(note.title)}</data>'
+            f'<data key="url">{escape(self.url.format(nid=note.nid))}</data>'
+            "</node>\n"
+        )
+
+    def write_edge(
+        self, outf: TextIO, source: str, target: str, first: bool
+    ) -> None:
+        outf.write(
+            f"    <edge source={quoteattr(source)} "
+            f"target={quoteattr(target)}/>\n"
+        )
+
+    def write_footer(self, outf: TextIO) -> None:
+        outf.write("  </graph>\n</graphml>\n")
+
+
+class GEXFWriter(GraphWriter):
+    def write_header(self, outf: TextIO) -> None:
+        outf.write(
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<gexf xmlns="http://gexf.net/1.3" version="1.3">\n'
+            '  <graph defaultedgetype="directed">\n'
+            '    <attributes class="node">\n'
+            '      <attribute id="url" title="url" type="string"/>\n'
+            "    </attributes>\n"
+            "    <nodes>\n"
+        )
+        self._n_edges = 0
+
+    def write_node(self, outf: TextIO, note: Note, first: bool) -> None:
+        outf.write(
+            f"      <node id={quoteattr(note.nid)} "
+            f"label={quoteattr(note.title)}><attvalues>"
+            f'<attvalue for="url" '
+            f"value={quoteattr(self.url.format(nid=note.nid))}/>"
+            "</attvalues></node>\n"
+        )
+
+    def write_separator(self, outf: TextIO) -> None:
+        outf.write("    </nodes>\n    <edges>\n")
+
+    def write_edge(
+        self, outf: TextIO, source: str, target: str, first: bool
+    ) -> None:
+        outf.write(
+            f'      <edge id="{self._n_edges}" source={quoteattr(source)} '
+            f"target={quoteattr(target)}/>\n"
+        )
+        self._n_edges += 1
+
+    def write_footer(self, outf: TextIO) -> None:
+        outf.write("    </edges>\n  </graph>\n</gexf>\n")
+
+
+class JSONWriter(GraphWriter):
+    """Node-link JSON, as read by ``networkx.node_link_graph``"""
+
+    def write_header(self, outf: TextIO) -> None:
+        outf.write(
+            '{"directed": true, "multigraph": false, "graph": {}, "nodes": ['
+        )
+
+    def write_node(self, outf: TextIO, note: Note, first: bool) -> None:
+        if not first:
+            outf.write(",")
+        node = {
+            "id": note.nid,
+            "label": note.title,
+            "url": self.url.format(nid=note.nid),
+        }
+        outf.write("\n" + json.dumps(node, ensure_ascii=False))
+
+    def write_separator(self, outf: TextIO) -> None:
+        outf.write('\n], "links": [')
+
+    def write_edge(
+        self, outf: TextIO, source: str, target: str, first: bool
+    ) -> None:
+        if not first:
+            outf.write(",")
+        outf.write("\n" + json.dumps({"source": source, "target": target}))
+
+    def write_footer(self, outf: TextIO) -> None:
+        outf.write("\n]}\n")
+
+
+#: File suffix to writer
+writers = {
+    ".dot": DotWriter,
+    ".graphml": GraphMLWriter,
+    ".gexf": GEXFWriter,
+    ".json": JSONWriter,
+}  # type: Dict[str, Type[GraphWriter]]
+
+
+def export_graph(
+    zk,
+    path: Union[str, PurePath],
+    nids: Optional[Iterable[str]] = None,
+    **kwargs,
+) -> None:
+    """Write the graph of the notes to a file. The format is determined by
+    the suffix of the file, see :data:`writers`.
+
+    Args:
+        zk: Zettelkasten
+        path: Output file
+        nids: IDs of the notes. Default: All notes.
+        **kwargs: Passed on to the writer
+
+    Raises:
+        ValueError: Unsupported suffix
+    """
+    path = Path(path)
+    try:
+        writer = writers[path.suffix]
+    except KeyError:
+        raise ValueError(
+            f"Unsupported suffix {path.suffix}, use one of "
+            f"{', '.join(writers)}"
+        ) from None
+    with path.open("w", encoding="utf-8") as outf:
+        writer(zk, **kwargs).write(outf, nids)
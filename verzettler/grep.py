@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+
+""" Regex search over the full contents of notes, running in a process pool
+and yielding matches as soon as the first files have been scanned.
+"""
+
+# std
+import re
+import multiprocessing
+from functools import lru_cache
+from pathlib import Path, PurePath
+from typing import Iterable, Iterator, List, Tuple, Optional, Union
+
+# ours
+from verzettler.note import Note
+
+
+class GrepMatch(object):
+    def __init__(self, nid: str, path: Path, lineno: int, line: str):
+        self.nid = nid
+        self.path = path
+        #: Line number, starting from 1
+        self.lineno = lineno
+        #: Line without trailing newline
+        self.line = line
+
+    def __repr__(self):
+        return f"GrepMatch({self.nid}, {self.lineno}, {self.line!r})"
+
+
+@lru_cache(maxsize=10)
+def _compile(pattern: str, flags: int):
+    # Cached per worker process
+    return re.compile(pattern, flags)
+
+
+def grep_file(
+    path: Union[str, PurePath], pattern: str, flags: int = 0
+) -> List[Tuple[int, str]]:
+    """All lines of a file that match a regex.
+
+    Args:
+        path: Path to file
+        pattern: Regular expression, matched with ``re.search``
+        flags: Flags for ``re.compile``
+
+    Returns:
+        List of tuples (line number, line without trailing newline)
+    """
+    regex = _compile(pattern, flags)
+    matches = []
+    with open(str(path), errors="replace") as inf:
+        for lineno, line in enumerate(inf, start=1):
+            if regex.search(line):
+                matches.append((lineno, line.rstrip("\n")))
+    return matches
+
+
+def _grep_file_worker(
+    args: Tuple[str, str, int]
+) -> Tuple[str, List[Tuple[int, str]]]:
+    path, pattern, flags = args
+    try:
+        return path, grep_file(path, pattern, flags)
+    except OSError:
+        # File was removed in the meantime
+        return path, []
+
+
+def _nid_from_path(path: Path) -> str:
+    # Like Note.get_nid, but without logging errors for non-notes
+    matches = Note.id_regex.findall(path.name)
+    if matches:
+        return matches[0]
+    return path.name
+
+
+def grep(
+    paths: Iterable[Union[str, PurePath]],
+    pattern: str,
+    flags: int = 0,
+    processes: Optional[int] = None,
+    chunksize: int = 8,
+    start_method: Optional[str] = None,
+) -> Iterator[GrepMatch]:
+    """Search files for lines matching a regex. The files are scanned in a
+    process pool and matches are yielded as soon as they are found, i.e.
+    files are not yielded in the order they were given.
+
+    Args:
+        paths: Paths of the files to search
+        pattern: Regular expression, matched with ``re.search``
+        flags: Flags for ``re.compile``, e.g. ``re.IGNORECASE``
+        processes: Number of worker processes. Default: Number of CPUs.
+            If 1, the files are searched in the current process.
+        chunksize: Number of files that are sent to a worker at once
+        start_method: Start method of the worker processes, e.g.
+            ``spawn`` or ``forkserver`` in multithreaded programs, where
+            forking could copy locks that are held by other threads.
+            Default: The default of :mod:`multiprocessing`.
+
+    Returns:
+        Iterator over :class:`GrepMatch` objects
+
+    Raises:
+        re.error if the pattern is invalid
+    """
+    # Fail early and in the current process
+    _compile(pattern, flags)
+    tasks = [(str(path), pattern, flags) for path in paths]
+    if processes == 1:
+        return _to_grep_matches(map(_grep_file_worker, tasks))
+    return _grep_pool(
+        tasks,
+        processes=processes,
+        chunksize=chunksize,
+        start_method=start_method,
+    )
+
+
+def _grep_pool(
+    tasks: List[Tuple[str, str, int]],
+    processes: Optional[int],
+    chunksize: int,
+    start_method: Optional[str] = None,
+) -> Iterator[GrepMatch]:
+    # Leaving the with block (also if the consumer stops iterating) terminates
+    # the workers.
+    context = multiprocessing.get_context(start_method)
+    with context.Pool(processes) as pool:
+        results = pool.imap_unordered(
+            _grep_file_worker, tasks, chunksize=chunksize
+        )
+        yield from _to_grep_matches(results)
+
+
+def _to_grep_matches(
+    results: Iterable[Tuple[str, List[Tuple[int, str]]]]
+) -> Iterator[GrepMatch]:
+    for path, matches in results:
+        path = Path(path)
+        nid = _nid_from_path(path)
+        for lineno, line in matches:
+            yield GrepMatch(nid=nid, path=path, lineno=lineno, line=line)
@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+
+""" Force directed layout of the graph of the whole Zettelkasten, computed
+up front with NumPy, so that the browser can show it without running a
+physics simulation (see zk_web).
+
+The initial positions come from Pivot MDS (Brandes and Pich, 2007), which
+places the notes according to their distances (number of links) to a few
+pivot notes. The layout is then refined following Fruchterman and
+Reingold: Linked notes attract each other, all notes repel each other.
+Repulsion is only computed exactly between notes in neighbouring cells of
+a grid; further away, the notes of a cell are replaced by their centroid.
+This makes an iteration roughly linear in the number of notes.
+"""
+
+# std
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# 3rd
+import numpy as np
+
+# ours
+from verzettler.log import logger
+from verzettler.util.paths import get_cache_dir
+from verzettler.util.write import write_if_changed
+
+#: Bump when the algorithm changes, so that cached layouts are recomputed
+layout_version = 2
+
+#: Number of layouts that are kept in the cache directory (every change of
+#: the Zettelkasten gives a new layout)
+max_cached_layouts = 32
+
+
+def _repulsion(pos: np.ndarray, k: float) -> np.ndarray:
+    """Repulsive displacement of every node from all other nodes.
+
+    The nodes are put into a grid of about n^(2/3) cells. Repulsion between
+    nodes in the same or neighbouring cells is computed exactly, nodes in
+    cells further away are replaced by the centroid of their cell.
+    """
+    n = len(pos)
+    lower = pos.min(axis=0)
+    extent = max(float((pos.max(axis=0) - lower).max()), k)
+    n_side = max(1, int(round(1.5 * n ** (1 / 3))))
+    cells = np.floor((pos - lower) / extent * n_side).astype(np.int64)
+    # Pad by one cell on every side, so that neighbouring cells of different
+    # columns never get the same ID
+    cells = np.minimum(cells, n_side - 1) + 1
+    height = n_side + 2
+    cell_ids = cells[:, 0] * height + cells[:, 1]
+    occupied, cell_index = np.unique(cell_ids, return_inverse=True)
+    n_occupied = len(occupied)
+    counts = np.bincount(cell_index)
+    # Table of the nodes in every occupied cell. Rows are padded with n,
+    # a dummy node far away, and the last row stands for all empty cells.
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    order = np.argsort(cell_index, kind="stable")
+    sorted_index = cell_index[order]
+    table = np.full((n_occupied + 1, counts.max()), n, dtype=np.int64)
+    table[sorted_index, np.arange(n) - starts[sorted_index]] = order
+    far_away = 1e6 * extent
+    x = np.append(pos[:, 0], far_away)
+    y = np.append(pos[:, 1], far_away)
+
+    displacement = np.zeros_like(pos)
+
+    # Near: Exact repulsion from the nodes in the 9 surrounding cells
+    offsets = np.array(
+        [dx * height + dy for dx in (-1, 0, 1) for dy in (-1, 0, 1)]
+    )
+    neighbor_ids = cell_ids[:, None] + offsets[None, :]
+    rows = np.minimum(np.searchsorted(occupied, neighbor_ids), n_occupied - 1)
+    rows = np.where(occupied[rows] == neighbor_ids, rows, n_occupied)
+    # Bound the memory of the candidate arrays
+    chunk_size = max(1, 2**22 // (9 * table.shape[1]))
+    for start in range(0, n, chunk_size):
+        nodes = np.arange(start, min(n, start + chunk_size))
+        others = table[rows[nodes]].reshape(len(nodes), -1)
+        dx = x[nodes, None] - x[others]
+        dy = y[nodes, None] - y[others]
+        # The node itself has distance 0 and doesn't contribute. The minimal
+        # distance avoids division by zero for this case and notes on top of
+        # each other.
+        factor = k**2 / np.maximum(dx * dx + dy * dy, 1e-4 * k**2)
+        displacement[nodes, 0] = np.einsum("ij,ij->i", factor, dx)
+        displacement[nodes, 1] = np.einsum("ij,ij->i", factor, dy)
+
+    # Far: Repulsion from the centroids of all other cells
+    centroids = (
+        np.stack(
+            [np.bincount(cell_index, weights=pos[:, dim]) for dim in range(2)],
+            axis=1,
+        )
+        / counts[:, None]
+    )
+    cell_x = occupied // height
+    cell_y = occupied % height
+    cell_force = np.zeros((n_occupied, 2))
+    chunk_size = max(1, 2**22 // n_occupied)
+    for start in range(0, n_occupied, chunk_size):
+        chunk = slice(start, min(n_occupied, start + chunk_size))
+        far = (np.abs(cell_x[chunk, None] - cell_x[None, :]) > 1) | (
+            np.abs(cell_y[chunk, None] - cell_y[None, :]) > 1
+        )
+        delta = centroids[chunk, None, :] - centroids[None, :, :]
+        distance2 = np.maximum(
+            np.einsum("ijk,ijk->ij", delta, delta), 1e-4 * k**2
+        )
+        factor = np.where(far, k**2 * counts[None, :] / distance2, 0.0)
+        cell_force[chunk] = np.einsum("ij,ijk->ik", factor, delta)
+    displacement += cell_force[cell_index]
+    return displacement
+
+
+def _adjacency(
+    n_nodes: int, edges: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Undirected adjacency in compressed sparse row format: The neighbours
+    of node i are ``indices[indptr[i]:indptr[i + 1]]``."""
+    both = np.concatenate([edges, edges[:, ::-1]])
+    both = both[np.argsort(both[:, 0], kind="stable")]
+    indptr = np.concatenate(
+        ([0], np.cumsum(np.bincount(both[:, 0], minlength=n_nodes)))
+    )
+    return indptr, both[:, 1]
+
+
+def _bfs_distances(
+    indptr: np.ndarray, indices: np.ndarray, source: int
+) -> np.ndarray:
+    """Number of links from the source to every node (-1 if unreachable)"""
+    distances = np.full(len(indptr) - 1, -1, dtype=np.int64)
+    distances[source] = 0
+    frontier = np.array([source])
+    distance = 0
+    while len(frontier):
+        distance += 1
+        starts = indptr[frontier]
+        lengths = indptr[frontier + 1] - starts
+        # Positions of all neighbours of the frontier in indices
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+        neighbors = np.unique(indices[offsets + np.arange(lengths.sum())])
+        frontier = neighbors[distances[neighbors] < 0]
+        distances[frontier] = distance
+    return distances
+
+
+def pivot_mds(
+    n_nodes: int, edges: np.ndarray, n_pivots: int = 50
+) -> np.ndarray:
+    """Positions of the nodes from Pivot MDS.
+
+    Args:
+        n_nodes: Number of nodes
+        edges: Integer array of shape (n_edges, 2) with the indices of the
+            linked nodes
+        n_pivots: Number of pivots. They are picked one after another as the
+            node that is furthest from all previous pivots.
+
+    Returns:
+        Array of shape (n_nodes, 2) (arbitrary scale)
+    """
+    n_pivots = min(n_pivots, n_nodes)
+    indptr, indices = _adjacency(n_nodes, edges)
+    distances = np.zeros((n_nodes, n_pivots))
+    min_distance = np.full(n_nodes, np.inf)
+    pivot = 0
+    for i in range(n_pivots):
+        d = _bfs_distances(indptr, indices, pivot).astype(float)
+        # Other components are put just beyond the furthest reachable node
+        d[d < 0] = d.max() + 1
+        distances[:, i] = d
+        min_distance = np.minimum(min_distance, d)
+        pivot = int(np.argmax(min_distance))
+    squared = distances**2
+    centered = -0.5 * (
+        squared
+        - squared.mean(axis=0)[None, :]
+        - squared.mean(axis=1)[:, None]
+        + squared.mean()
+    )
+    u, s, _ = np.linalg.svd(centered, full_matrices=False)
+    pos = np.zeros((n_nodes, 2))
+    n_dims = min(2, len(s))
+    pos[:, :n_dims] = u[:, :n_dims] * s[:n_dims]
+    return pos
+
+
+def force_layout(
+    n_nodes: int,
+    edges: np.ndarray,
+    iterations: int = 100,
+    seed: int = 0,
+) -> np.ndarray:
+    """Positions of the nodes.
+
+    Args:
+        n_nodes: Number of nodes
+        edges: Integer array of shape (n_edges, 2) with the indices of the
+            linked nodes
+        iterations: Number of iterations of the force directed refinement
+        seed: Seed of the small random shifts that separate nodes that have
+            the same initial position
+
+    Returns:
+        Array of shape (n_nodes, 2). The unit is the ideal distance of
+        the Fruchterman-Reingold layout, neighbouring nodes end up about
+        1 to 5 apart.
+    """
+    if n_nodes == 0:
+        return np.zeros((0, 2))
+    k = 1.0
+    edges = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+    edges = edges[edges[:, 0] != edges[:, 1]]
+    pos = pivot_mds(n_nodes, edges)
+    if len(edges):
+        delta = pos[edges[:, 0]] - pos[edges[:, 1]]
+        edge_length = float(
+            np.median(np.sqrt(np.einsum("ij,ij->i", delta, delta)))
+        )
+        if edge_length > 0:
+            pos *= k / edge_length
+    # E.g. leaves with the same parent have the same distance to every pivot
+    rng = np.random.RandomState(seed)
+    pos += rng.uniform(-0.1 * k, 0.1 * k, size=pos.shape)
+    temperature = 2 * k
+    cooling = temperature / (iterations + 1)
+    for _ in range(iterations):
+        displacement = _repulsion(pos, k=k)
+        if len(edges):
+            delta = pos[edges[:, 0]] - pos[edges[:, 1]]
+            distance = np.sqrt(np.einsum("ij,ij->i", delta, delta))
+            attraction = delta * (distance / k)[:, None]
+            for dim in range(2):
+                displacement[:, dim] -= np.bincount(
+                    edges[:, 0], weights=attraction[:, dim], minlength=n_nodes
+                )
+                displacement[:, dim] += np.bincount(
+                    edges[:, 1], weights=attraction[:, dim], minlength=n_nodes
+                )
+        # Weak gravity keeps unconnected notes close
+        displacement -= 0.01 * (pos - pos.mean(axis=0))
+        length = np.sqrt(np.einsum("ij,ij->i", displacement, displacement))
+        scale = np.minimum(length, temperature) / np.maximum(length, 1e-9)
+        pos += displacement * scale[:, None]
+        temperature -= cooling
+    return pos - pos.mean(axis=0)
+
+
+def graph_fingerprint(
+    nids: Sequence[str], edges: Iterable[Tuple[str, str]], **parameters
+) -> str:
+    """Hash of the graph and the layout parameters"""
+    sha = hashlib.sha1()
+    sha.update(f"{layout_version} {sorted(parameters.items())}".encode())
+    for nid in sorted(nids):
+        sha.update(nid.encode("utf-8") + b"\0")
+    sha.update(b"\1")
+    for source, target in sorted(edges):
+        sha.update(f"{source} {target}\0".encode("utf-8"))
+    return sha.hexdigest()
+
+
+def _mtime(path: Path) -> int:
+    try:
+        return path.stat().st_mtime_ns
+    except OSError:
+        return 0
+
+
+def _prune_cache(cache_dir: Path, keep: int) -> None:
+    """Remove all but the most recently used cached layouts"""
+    paths = sorted(cache_dir.glob("*.json"), key=_mtime, reverse=True)
+    for path in paths[keep:]:
+        try:
+            path.unlink()
+        except OSError:
+            pass
+
+
+def layout_notes(
+    nids: Sequence[str],
+    edges: Iterable[Tuple[str, str]],
+    iterations: int = 100,
+    scale: float = 30.0,
+    cache_dir: Optional[Path] = None,
+    max_cached: Optional[int] = None,
+) -> Dict[str, Tuple[float, float]]:
+    """Layout of a graph of notes. Layouts are cached on disk, keyed by a
+    fingerprint of the graph, so that the same graph gets the same layout
+    without recomputing it. Only the most recently used layouts are kept.
+
+    Args:
+        nids: IDs of the notes
+        edges: Links (source, target) between the notes. Links to other
+            notes are ignored.
+        iterations: See :func:`force_layout`
+        scale: Unit of :func:`force_layout` (e.g. in pixels)
+        cache_dir: Directory of cached layouts. Default: ``layout`` in
+            :func:`verzettler.util.paths.get_cache_dir`
+        max_cached: Number of layouts kept in the cache directory.
+            Default: :data:`max_cached_layouts`
+
+    Returns:
+        Mapping of ID to position (x, y)
+    """
+    nids = sorted(set(nids))
+    index = {nid: i for i, nid in enumerate(nids)}
+    edges = sorted(
+        {(s, t) for s, t in edges if s in index and t in index and s != t}
+    )
+    fingerprint = graph_fingerprint(
+        nids, edges, iterations=iterations, scale=scale
+    )
+    if cache_dir is None:
+        cache_dir = get_cache_dir() / "layout"
+    if max_cached is None:
+        max_cached = max_cached_layouts
+    cache_dir = Path(cache_dir)
+    cache_path = cache_dir / f"{fingerprint}.json"
+    try:
+        with cache_path.open() as inf:
+            cached = json.load(inf)
+        logger.debug(f"Using cached layout {cache_path}")
+        # Mark as recently used
+        os.utime(str(cache_path))
+        return {nid: tuple(xy) for nid, xy in cached.items()}
+    except (OSError, ValueError):
+        pass
+    edge_array = np.array(
+        [(index[s], index[t]) for s, t in edges], dtype=np.int64
+    )
+    pos = force_layout(len(nids), edge_array, iterations=iterations) * scale
+    positions = {
+        nid: (round(float(x), 1), round(float(y), 1))
+        for nid, (x, y) in zip(nids, pos)
+    }
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        write_if_changed(cache_path, json.dumps(positions))
+        _prune_cache(cache_dir, max_cached)
+    except OSError as e:
+        logger.warning(f"Could not cache layout in {cache_path}: {e}")
+    return positions
+
+
+def layout_zettelkasten(zk, **kwargs) -> Dict[str, Tuple[float, float]]:
+    """Layout of all notes of a Zettelkasten, see :func:`layout_notes` for
+    the arguments."""
+    nids = [note.nid for note in zk.notes]
+    edges = [(note.nid, link) for note in zk.notes for link in note.links]
+    return layout_notes(nids, edges, **kwargs)
@@ -3,6 +3,7 @@
 # std
 from typing import List, Union
 from pathlib import Path, PurePath
+import io
 import re
 
 
@@ -33,6 +34,12 @@ class MarkdownReader(object):
             lines = inf.readlines()
         return MarkdownReader.from_lines(lines)
 
+    @classmethod
+    def from_text(cls, text: str) -> "MarkdownReader":
+        # Same line splitting and newline translation as reading the file
+        lines = io.StringIO(text, newline=None).readlines()
+        return MarkdownReader.from_lines(lines)
+
     @classmethod
     def from_lines(cls, lines: List[str]) -> "MarkdownReader":
         md_lines = []
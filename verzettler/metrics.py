@@ -0,0 +1,389 @@
+#!/usr/bin/env python3
+
+""" Lightweight instrumentation: Counters, histograms and cache statistics
+that can be rendered in the Prometheus text format or summarized as JSON.
+
+Metrics are registered in the global :data:`registry` by default:
+
+    >>> example_registry = Registry()
+    >>> requests = Counter(
+    ...     "requests_total", "Requests", ["route"], registry=example_registry
+    ... )
+    >>> requests.inc(route="/open")
+    >>> requests.value(route="/open")
+    1.0
+"""
+
+# std
+from abc import ABC, abstractmethod
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+#: Default histogram buckets in seconds
+default_buckets = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+# Labels of a sample, e.g. (("route", "/open"),)
+LabelValues = Tuple[Tuple[str, str], ...]
+
+
+def _format_labels(labels: LabelValues) -> str:
+    """
+    >>> _format_labels((("a", 'x"y'), ("b", "z")))
+    '{a="x\\\\"y",b="z"}'
+    """
+    if not labels:
+        return ""
+    parts = []
+    for key, value in labels:
+        value = (
+            str(value)
+            .replace("\\", "\\\\")
+            .replace('"', '\\"')
+            .replace("\n", "\\n")
+        )
+        parts.append(f'{key}="{value}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+class Registry(object):
+    """Collection of metrics and cache statistics"""
+
+    def __init__(self):
+        self._metrics = {}  # type: Dict[str, Metric]
+        # name -> (help, function returning (hits, misses, size))
+        self._caches = {}  # type: Dict[str, Tuple[str, Callable]]
+        self._lock = threading.Lock()
+
+    def register(self, metric: "Metric") -> None:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} already registered")
+            self._metrics[metric.name] = metric
+
+    def get(self, name: str) -> "Metric":
+        return self._metrics[name]
+
+    def register_cache(
+        self,
+        name: str,
+        stats: Callable[[], Tuple[int, int, int]],
+        help: str = "",
+    ) -> None:
+        """Register a cache. Re-registering a name replaces the cache, e.g.
+        after a reload.
+
+        Args:
+            name: Name of the cache
+            stats: Function returning the number of hits, misses and the
+                current number of entries
+            help: Description
+        """
+        with self._lock:
+            self._caches[name] = (help, stats)
+
+    def register_lru_cache(self, name: str, function, help: str = "") -> None:
+        """Register a function decorated with functools.lru_cache"""
+
+        def stats():
+            info = function.cache_info()
+            return info.hits, info.misses, info.currsize
+
+        self.register_cache(name, stats, help=help)
+
+    def cache_stats(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            caches = dict(self._caches)
+        out = {}
+        for name, (_, stats) in sorted(caches.items()):
+            hits, misses, size = stats()
+            total = hits + misses
+            out[name] = {
+                "hits": hits,
+                "misses": misses,
+                "entries": size,
+                "hit_rate": hits / total if total else 0.0,
+            }
+        return out
+
+    def render_prometheus(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []  # type: List[str]
+        for metric in metrics:
+            lines.extend(metric.render_prometheus())
+        cache_stats = self.cache_stats()
+        if cache_stats:
+            for stat, kind in [
+                ("hits", "counter"),
+                ("misses", "counter"),
+                ("entries", "gauge"),
+            ]:
+                name = f"verzettler_cache_{stat}"
+                if kind == "counter":
+                    name += "_total"
+                lines.append(f"# HELP {name} Cache {stat}")
+                lines.append(f"# TYPE {name} {kind}")
+                for cache, stats in cache_stats.items():
+                    labels = _format_labels((("cache", cache),))
+                    lines.append(f"{name}{labels} {_format_value(stats[stat])}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> Dict[str, object]:
+        """JSON serializable summary of all metrics and caches"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {
+            "metrics": {metric.name: metric.summary() for metric in metrics},
+            "caches": self.cache_stats(),
+        }
+
+    def reset(self) -> None:
+        """Reset the values of all metrics (registrations are kept)"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            metric.reset()
+
+
+#: Global registry
+registry = Registry()
+
+
+class Metric(ABC):
+    """Base class for metrics with optional labels"""
+
+    kind = ""
+
+    def __init__(
+        self,
+        name: str,
+        help: str = "",
+        labels: Iterable[str] = (),
+        registry: Optional[Registry] = registry,
+    ):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+        self.reset()
+        if registry is not None:
+            registry.register(self)
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.label_names):
+            raise ValueError(
+                f"Metric {self.name} needs labels {self.label_names}, "
+                f"got {tuple(labels)}"
+            )
+        return tuple((name, str(labels[name])) for name in self.label_names)
+
+    @abstractmethod
+    def reset(self) -> None:
+        pass
+
+    def render_prometheus(self) -> List[str]:
+        return [
+            f"# HELP {self.name} {self.help}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+
+    @abstractmethod
+    def summary(self) -> Dict[str, object]:
+        pass
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def reset(self) -> None:
+        with self._lock:
+            self._values = {}  # type: Dict[LabelValues, float]
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def render_prometheus(self) -> List[str]:
+        lines = super().render_prometheus()
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            lines.append(
+                f"{self.name}{_format_labels(key)} {_format_value(value)}"
+            )
+        return lines
+
+    def summary(self) -> Dict[str, object]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return {_format_labels(key) or "total": value for key, value in values}
+
+
+class Histogram(Metric):
+    """Distribution of values, e.g. durations in seconds"""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str = "",
+        labels: Iterable[str] = (),
+        buckets: Iterable[float] = default_buckets,
+        registry: Optional[Registry] = registry,
+    ):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, help=help, labels=labels, registry=registry)
+
+    def reset(self) -> None:
+        with self._lock:
+            # label values -> counts per bucket (not cumulative; the last
+            # entry is for values above the largest bucket)
+            self._counts = {}  # type: Dict[LabelValues, List[int]]
+            self._sums = {}  # type: Dict[LabelValues, float]
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._counts.get(key)
+            if counts is None:
+                counts = self._counts[key] = [0] * (len(self.buckets) + 1)
+                self._sums[key] = 0.0
+            counts[index] += 1
+            self._sums[key] += value
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        """Context manager observing the time spent in its body"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels) -> int:
+        return sum(self._counts.get(self._key(labels), []))
+
+    def sum(self, **labels) -> float:
+        return self._sums.get(self._key(labels), 0.0)
+
+    def _quantile(self, counts: List[int], q: float) -> Optional[float]:
+        """Upper bound of the bucket containing the quantile or None if it's
+        above the largest bucket"""
+        total = sum(counts)
+        cumulative = 0
+        for bound, count in zip(self.buckets, counts):
+            cumulative += count
+            if cumulative >= q * total:
+                return bound
+        return None
+
+    def render_prometheus(self) -> List[str]:
+        lines = super().render_prometheus()
+        with self._lock:
+            items = sorted(
+                (key, list(counts), self._sums[key])
+                for key, counts in self._counts.items()
+            )
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                labels = _format_labels(key + (("le", _format_value(bound)),))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+    def summary(self) -> Dict[str, object]:
+        with self._lock:
+            items = sorted(
+                (key, list(counts), self._sums[key])
+                for key, counts in self._counts.items()
+            )
+        out = {}
+        for key, counts, total in items:
+            n = sum(counts)
+            out[_format_labels(key) or "total"] = {
+                "count": n,
+                "sum": total,
+                "mean": total / n if n else 0.0,
+                # Upper bounds of the buckets
+                "p50": self._quantile(counts, 0.5),
+                "p99": self._quantile(counts, 0.99),
+            }
+        return out
+
+
+def timed(histogram: Histogram, **labels):
+    """Decorator observing the duration of every call of a function"""
+
+    def decorator(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            with histogram.time(**labels):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+# Metrics used throughout verzettler
+# =============================================================================
+
+request_seconds = Histogram(
+    "verzettler_request_seconds",
+    "Time to handle HTTP requests of zk_server",
+    labels=["route", "method", "status"],
+)
+render_seconds = Histogram(
+    "verzettler_render_seconds",
+    "Time spent rendering notes to HTML (e.g. in pandoc)",
+    labels=["renderer"],
+)
+dotgraph_seconds = Histogram(
+    "verzettler_dotgraph_seconds",
+    "Time spent building the graph of the environment of a note",
+)
+search_seconds = Histogram(
+    "verzettler_search_seconds",
+    "Time spent searching notes",
+    labels=["kind"],
+)
+load_seconds = Histogram(
+    "verzettler_load_seconds",
+    "Time spent loading notes from a directory",
+    buckets=default_buckets + (30.0, 60.0),
+)
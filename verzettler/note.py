@@ -23,7 +23,13 @@ class Note(object):
     picture_link_regex = re.compile(r"!\[([^\]]*)\]\(([^)]+)*\)")
     section_regex = re.compile(r"(#+)\s+(.+)")
 
-    def __init__(self, path: Path):
+    def __init__(self, path: Path, text: Optional[str] = None):
+        """
+
+        Args:
+            path: Path to the markdown file
+            text: Content of the file. If None, it is read from the file.
+        """
         self.path = path
         self.nid = self.get_nid(path)  # type: str
 
@@ -34,7 +40,7 @@ class Note(object):
         # Gets set by ZK  # todo: remove
         self.depth = None  # type: Optional[int]
 
-        self._analyze_file()
+        self._analyze_file(text)
 
     # Class methods
     # =========================================================================
@@ -62,10 +68,13 @@ class Note(object):
     # Analyze file
     # =========================================================================
 
-    def _analyze_file(self) -> None:
+    def _analyze_file(self, text: Optional[str] = None) -> None:
         """Should be called only once!"""
 
-        md_reader = MarkdownReader.from_file(self.path)
+        if text is None:
+            md_reader = MarkdownReader.from_file(self.path)
+        else:
+            md_reader = MarkdownReader.from_text(text)
         for md_line in md_reader.lines:
             if len(md_line.current_section) == 1:
                 if self.title and self.title != md_line.current_section[0]:
@@ -93,3 +102,10 @@ class Note(object):
 
     def __repr__(self):
         return f"Note({self.nid})"
+
+    def __getstate__(self):
+        # Else pickling a note (e.g. to send it to a worker process) would
+        # copy the whole Zettelkasten it belongs to
+        state = self.__dict__.copy()
+        state.pop("zettelkasten", None)
+        return state
@@ -2,22 +2,46 @@
 
 # std
 from abc import ABC, abstractmethod
-from typing import Optional
+from typing import (
+    Callable,
+    ContextManager,
+    Optional,
+    Tuple,
+    List,
+    Iterable,
+    Iterator,
+)
 from pathlib import PurePath, Path
-import random
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+import asyncio
+import contextlib
+import io
+import os
+import html
+import threading
 import subprocess
-import collections
 import re
 
 # 3rd
-import networkx as nx
+try:
+    import markdown
+except ImportError:
+    markdown = None
 
 # ours
 from verzettler.note import Note
 from verzettler.markdown_reader import MarkdownReader
 from verzettler.log import logger
-from verzettler.dotgraphgenerator import DotGraphGenerator
-from verzettler.util.regex import find_urls
+from verzettler.note_graph import graph_html
+from verzettler.util.regex import url_pattern
+from verzettler.render_cache import RenderCache
+from verzettler.util.write import WriteSummary, write_if_changed
+from verzettler.metrics import dotgraph_seconds, registry, render_seconds, timed
+
+
+class RenderError(Exception):
+    """Rendering a note to HTML failed"""
 
 
 class NoteConverter(ABC):
@@ -25,118 +49,104 @@ class NoteConverter(ABC):
 
     @abstractmethod
     def convert(self, note: Note) -> str:
+        """
+
+        Raises:
+            RenderError if the note could not be converted
+        """
         pass
 
-    def convert_write(self, note: Note, path: Optional[PurePath] = None):
+    def _convert_or_none(self, note: Note) -> Optional[str]:
+        try:
+            return self.convert(note)
+        except RenderError as e:
+            logger.error(str(e))
+            return None
+
+    def convert_many(
+        self, notes: Iterable[Note], max_workers: Optional[int] = None
+    ) -> Iterator[Tuple[Note, Optional[str]]]:
+        """Convert several notes. Results are yielded in the order of the
+        input.
+
+        Args:
+            notes:
+            max_workers: Maximal number of conversions running at the same
+                time. Ignored by converters that work serially.
+
+        Returns:
+            Iterator of tuples (note, converted). Converted is None if the
+            note could not be converted (the error is logged).
+        """
+        for note in notes:
+            yield note, self._convert_or_none(note)
+
+    def write_converted(
+        self,
+        note: Note,
+        converted: str,
+        path: Optional[PurePath] = None,
+        summary: Optional[WriteSummary] = None,
+    ) -> bool:
+        """Write converted note (only if it changed).
+
+        Args:
+            note:
+            converted: Output of :meth:`convert`
+            path: Output path. Default: Path of the note
+            summary: Record the write here
+
+        Returns:
+            True if the file was written
+        """
         if path:
             path = Path(path)
         else:
             path = note.path
-        with path.open("w") as outf:
-            outf.write(self.convert(note))
-
-
-# nodes.widthConstraint: 50,
-
-_dotgraph_html = """
-<div id="mynetwork" style="width: 100%; height: {height};"></div>
-
-<script type="text/javascript">
-  let container = document.getElementById('mynetwork');
-  let dot = `{dotgraph}`;
-  let data = vis.parseDOTNetwork(dot);
-  let options = {
-    clickToUse: true,
-  }
-  let network = new vis.Network(container, data, options);
-  network.on( 'click', function(properties) {
-    let id = properties.nodes[0];
-    let clickedNode = network.body.nodes[id];
-    let url = clickedNode.options.labelURL;
-    window.open(url);
-  });
-</script>
-"""
-
-
-def dotgraph_html(zk, note: Note):
-    # nbd = self.zk.get_notes_by_depth(root=note.nid)
-    # maxdepth = min(2, len(nbd))
-
-    categories = collections.defaultdict(set)
-    selected_nodes = {note.nid}  # self.zk._graph.get_k_neighbors(note.nid)
-    categories["self"].add(note.nid)
-    try:
-        # selected_nodes |= set(nx.dijkstra_path(zk._graph, zk.root, note.nid))
-        paths_from_root = set()
-        for connection in nx.all_simple_paths(zk._graph, zk.root, note.nid):
-            paths_from_root |= set(connection)
-        categories["rootpath"] |= paths_from_root
-        selected_nodes |= paths_from_root
-    except nx.exception.NetworkXNoPath:
-        logger.warning(f"No path from {zk.root} to {note.nid}")
-    predecessors = set(zk._graph.predecessors(note.nid))
-    categories["predecessors"] |= predecessors
-    selected_nodes |= predecessors
-    descendants = set(
-        nx.descendants_at_distance(zk._graph, note.nid, distance=1)
+        return write_if_changed(path, converted, summary=summary)
+
+    def convert_write(
+        self,
+        note: Note,
+        path: Optional[PurePath] = None,
+        summary: Optional[WriteSummary] = None,
+    ) -> bool:
+        """Convert note and write it (only if it changed). Notes that can't
+        be converted are skipped (and counted as failed in the summary).
+
+        Returns:
+            True if the file was written
+        """
+        converted = self._convert_or_none(note)
+        if converted is None:
+            if summary is not None:
+                summary.add_failed()
+            return False
+        return self.write_converted(note, converted, path=path, summary=summary)
+
+
+@timed(dotgraph_seconds)
+def dotgraph_html(
+    zk,
+    note: Note,
+    vis_js_url: str = "/static/js/vis-network.min.js",
+    graph_js_url: str = "/static/js/graph.js",
+    api_url: Optional[str] = None,
+) -> List[str]:
+    """Graph of the environment of the note, see
+    :func:`verzettler.note_graph.graph_html`.
+
+    Returns:
+        List of HTML snippets (empty if the graph is too large to be shown)
+    """
+    out = graph_html(
+        zk,
+        note.nid,
+        vis_js_url=vis_js_url,
+        graph_js_url=graph_js_url,
+        api_url=api_url,
     )
-    categories["descendants"] |= descendants
-    selected_nodes |= descendants
-    optional_nodes = set()
-    for dist in range(2, 3):
-        desc = set(
-            nx.descendants_at_distance(zk._graph, note.nid, distance=dist)
-        )
-        categories["descendants"] |= desc
-        optional_nodes |= desc
-    for predecessor in zk._graph.predecessors(note.nid):
-        sibl = set(zk._graph.successors(predecessor))
-        categories["siblings"] |= sibl
-        optional_nodes |= sibl
-    optional_nodes -= selected_nodes
-    if len(selected_nodes) < 30:
-        selected_nodes |= set(
-            random.choices(
-                list(optional_nodes),
-                k=min(len(optional_nodes), 30 - len(selected_nodes)),
-            )
-        )
-
-    def pick_color(note: Note):
-        nid = note.nid
-        if nid in categories["self"]:
-            # red
-            return "#fb8072"
-        elif nid in categories["predecessors"]:
-            # green
-            return "#ccebc5"
-        elif nid in categories["descendants"]:
-            # yellow
-            return "#ffed6f"
-        elif nid in categories["siblings"]:
-            # pink
-            return "#fccde5"
-        elif nid in categories["rootpath"]:
-            # grayish
-            return "#d9d9d9"
-        else:
-            return "red"
-
-    out_lines = []
-    if len(selected_nodes) < 50:
-        out_lines.append(
-            '<script src="/static/js/vis-network.min.js"></script>\n'
-        )
-        dgg = DotGraphGenerator(zk=zk)
-        dgg.get_color = pick_color
-        dotstr = dgg.graph_from_notes(selected_nodes)
-        out_lines.append(
-            _dotgraph_html.replace("{dotgraph}", dotstr).replace(
-                "{height}", f"{400 + 20*len(selected_nodes)}px"
-            )
-        )
-    return out_lines
+    return [out] if out else []
 
 
 class JekyllConverter(NoteConverter):
@@ -204,83 +214,294 @@ class JekyllConverter(NoteConverter):
         return "".join(out_lines)
 
 
-class PandocConverter(NoteConverter):
-    def __init__(self, zk, self_contained=True):
+@lru_cache(maxsize=4096)
+def _resolve_path(directory: str, link: str) -> str:
+    return str((Path(directory) / link).resolve())
+
+
+registry.register_lru_cache(
+    "resolve_path", _resolve_path, help="Resolved paths of pictures"
+)
+
+
+class HtmlConverter(NoteConverter):
+    """Base class for converters that preprocess the markdown of a note
+    (resolving links etc.) and render it to HTML. Subclasses implement
+    :meth:`render`.
+    """
+
+    def __init__(
+        self,
+        zk,
+        self_contained=True,
+        cache: Optional[RenderCache] = None,
+        edit_links=True,
+    ):
         """
 
         Args:
             zk:
-            self_contained: If true, let pandoc produce a full HTML page with
+            self_contained: If true, produce a full HTML page with
                 CSS already included.
+            cache: Cache for the rendered output
+            edit_links: Add links to edit the note (only useful when served
+                by zk_server)
         """
         self.zk = zk
         self.self_contained = self_contained
+        self.cache = cache
+        self.edit_links = edit_links
+
+    # All links that are rewritten (or deliberately left alone) in
+    # preproc_markdown. Alternatives are tried in this order at every
+    # position, so e.g. URLs that are already part of a markdown link are
+    # never wrapped a second time.
+    _link_regex = re.compile(
+        # Old autogenerated markdown links (removed)
+        r"(?P<autogen> *\[[^\]]*\]\([^)\"]* \"autogen\"\))"
+        # Pictures (target resolved to an absolute path)
+        r"|(?P<picture>!\[[^\]]*\]\()(?P<picture_target>[^)]*)\)"
+        # External links (marked with the 'external' class)
+        r"|(?<!\!)\[(?P<external_text>[^\]]*)\]"
+        r"\((?P<external_href>[^)\s]*(?<!.md)(?:\s.*)?)\)"
+        # Other markdown links (left as they are)
+        r"|(?P<link>\[[^\]]*\]\([^)]*\))"
+        # Links by ID
+        r"|\[\[(?P<nid>[0-9]{14})\]\]"
+        # Bare URLs
+        r"|(?P<url>(?i:" + url_pattern + r"))"
+    )
 
-    @staticmethod
-    def _picture_link_absolute_path(note: Note, line: str) -> str:
-        for result in note.picture_link_regex.findall(line):
+    def _rewrite_link(self, note: Note, match) -> str:
+        kind = match.lastgroup
+        if kind == "autogen":
+            return ""
+        elif kind == "picture_target":
             # Doesn't support spaces in names
-            link = result[1].split(" ")[0]
-            link_resolved = "/assets" + str((note.path.parent / link).resolve())
-            line = line.replace(link, link_resolved)
-        return line
+            link, sep, rest = match.group("picture_target").partition(" ")
+            if link and "://" not in link:
+                link = "/assets" + _resolve_path(str(note.path.parent), link)
+            return f"{match.group('picture')}{link}{sep}{rest})"
+        elif kind == "external_href":
+            return (
+                f'<a href="{match.group("external_href")}" class="external">'
+                f'{match.group("external_text")}</a>'
+            )
+        elif kind == "nid":
+            nid = match.group("nid")
+            if nid not in self.zk:
+                logger.error(f"Couldn't find note {nid}")
+                return match.group(0)
+            return f"[{self.zk[nid].title}](/open/{nid})"
+        elif kind == "url":
+            url = match.group("url")
+            if url.endswith("md"):
+                # Would be taken for a link to a note
+                return f"[{url}]({url})"
+            return f'<a href="{url}" class="external">{url}</a>'
+        return match.group(0)
+
+    def preproc_markdown(self, note: Note, text: Optional[str] = None) -> str:
+        """Rewrite links in the markdown of a note: Links by ID are replaced
+        with links to the note (with its title as link text), external links
+        and bare URLs are marked as external, pictures are linked by their
+        absolute path and old autogenerated links are removed.
+        All of this is done in a single pass over every line.
+
+        Args:
+            note:
+            text: Content of the note. If None, it is read from the file.
 
-    def preproc_markdown(self, note: Note) -> str:
+        Returns:
+            Markdown to be rendered
+        """
         out_lines = []
-        md_reader = MarkdownReader.from_file(note.path)
+        if text is None:
+            md_reader = MarkdownReader.from_file(note.path)
+        else:
+            md_reader = MarkdownReader.from_lines(io.StringIO(text).readlines())
+
+        def rewrite_link(match):
+            return self._rewrite_link(note, match)
+
         for i, md_line in enumerate(md_reader.lines):
-            if i == 1:
+            if i == 1 and self.edit_links:
                 out_lines.append(
                     f"[Edit in browser](/edit/{note.nid}) [Open in typora](/open/typora/{note.nid})\n\n"
                 )
+            if md_line.is_code_block:
+                out_lines.append(md_line.text)
+                continue
+            if md_line.text.startswith("# ") and not self.self_contained:
+                # Already set the title with meta info
+                continue
+            out_lines.append(self._link_regex.sub(rewrite_link, md_line.text))
 
-            remove_line = False
-            if not md_line.is_code_block:
-                if md_line.text.startswith("# ") and not self.self_contained:
-                    # Already set the title with meta info
-                    remove_line = True
+        return "".join(out_lines)
 
-                for url in find_urls(md_line.text):
-                    if not re.findall(rf"\[.*\]\({url}\)", md_line.text):
-                        md_line.text = md_line.text.replace(
-                            url, f"[{url}]({url})"
-                        )
+    def _cache_key(self, note: Note, text: str) -> Tuple[str, List[str]]:
+        """Cache key and the IDs of the notes whose titles are used while
+        rendering.
+        """
+        linked_nids = sorted(set(note.id_link_regex.findall(text)))
+        linked_titles = [
+            self.zk[nid].title if nid in self.zk else "" for nid in linked_nids
+        ]
+        key = RenderCache.make_key(
+            type(self).__name__,
+            str(self.self_contained),
+            str(self.edit_links),
+            note.nid,
+            str(note.path),
+            text,
+            *linked_nids,
+            *linked_titles,
+        )
+        return key, linked_nids
 
-                # Mark external links with a '*'
-                md_line.text = note.external_link_regex.sub(
-                    r'<a href="\2" class="external">\1</a>', md_line.text
-                )
+    def render_key(self, note: Note, text: str) -> str:
+        """Hash of everything that the rendered note depends on (e.g. to be
+        used as an ETag)."""
+        return self._cache_key(note, text)[0]
 
-                md_line.text = self._picture_link_absolute_path(
-                    note, md_line.text
-                )
+    def convert(self, note: Note, text: Optional[str] = None) -> str:
+        """
 
-                # Remove old markdown links
-                md_line.text = note.autogen_link_regex.sub(
-                    "",
-                    md_line.text,
-                )
+        Args:
+            note:
+            text: Content of the note. If None, it is read from the file.
 
-                # Replace raw zids, leave only links
-                nids = note.id_link_regex.findall(md_line.text)
-                for nid in nids:
-                    try:
-                        n = self.zk[nid]
-                        title = n.title
-                        md_line.text = md_line.text.replace(
-                            f"[[{nid}]]", f"[{title}](/open/{nid})"
-                        )
-                    except KeyError:
-                        logger.error(f"Couldn't find note {nid}")
+        Returns:
+            HTML
 
-            if not remove_line:
-                out_lines.append(md_line.text)
+        Raises:
+            RenderError if rendering failed
+        """
+        if text is None:
+            text = note.path.read_text()
+        if self.cache is None:
+            return self._timed_render(note, self.preproc_markdown(note, text))
+        key, linked_nids = self._cache_key(note, text)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        ret = self._timed_render(note, self.preproc_markdown(note, text))
+        self.cache.put(key, ret, nid=note.nid, dependencies=linked_nids)
+        return ret
 
-        # out_lines.extend(["\n\n"] + dotgraph_html(self.zk, note))
+    @abstractmethod
+    def render(self, note: Note, markdown: str) -> str:
+        """Render preprocessed markdown to HTML.
 
-        return "".join(out_lines)
+        Returns:
+            HTML
 
-    def convert(self, note: Note) -> str:
+        Raises:
+            RenderError if rendering failed
+        """
+        pass
+
+    def _timed_render(self, note: Note, markdown: str) -> str:
+        with render_seconds.time(renderer=type(self).__name__):
+            return self.render(note, markdown)
+
+    # Asyncio
+    # =========================================================================
+
+    async def render_async(self, note: Note, markdown: str) -> str:
+        """Like :meth:`render`, but doesn't block the event loop. By default,
+        :meth:`render` runs in the default executor of the loop.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.render, note, markdown)
+
+    async def convert_async(
+        self,
+        note: Note,
+        text: Optional[str] = None,
+        limit: Optional[asyncio.Semaphore] = None,
+        read_lock: Optional[Callable[[], ContextManager]] = None,
+    ) -> str:
+        """Like :meth:`convert`, but doesn't block the event loop.
+
+        Args:
+            note:
+            text: Content of the note. If None, it is read from the file.
+            limit: Semaphore that limits the number of concurrent renders.
+                Cache lookups are not limited.
+            read_lock: Returns a context manager that is held while the
+                Zettelkasten is read (cache key and preprocessing, not
+                rendering), e.g.
+                :meth:`verzettler.util.concurrency.SnapshotHolder.read`
+
+        Returns:
+            HTML
+
+        Raises:
+            RenderError if rendering failed
+        """
+        if read_lock is None:
+            read_lock = contextlib.nullcontext
+        loop = asyncio.get_running_loop()
+        if text is None:
+            text = await loop.run_in_executor(None, note.path.read_text)
+
+        def prepare():
+            # Runs in the thread pool, since waiting for the lock blocks
+            with read_lock():
+                key, linked_nids = None, []
+                if self.cache is not None:
+                    key, linked_nids = self._cache_key(note, text)
+                    cached = self.cache.get(key)
+                    if cached is not None:
+                        return key, linked_nids, cached, None
+                markdown = self.preproc_markdown(note, text)
+            return key, linked_nids, None, markdown
+
+        key, linked_nids, cached, markdown = await loop.run_in_executor(
+            None, prepare
+        )
+        if cached is not None:
+            return cached
+        if limit is None:
+            with render_seconds.time(renderer=type(self).__name__):
+                ret = await self.render_async(note, markdown)
+        else:
+            async with limit:
+                with render_seconds.time(renderer=type(self).__name__):
+                    ret = await self.render_async(note, markdown)
+        if key is not None:
+            self.cache.put(key, ret, nid=note.nid, dependencies=linked_nids)
+        return ret
+
+
+class PandocConverter(HtmlConverter):
+    def convert_many(
+        self, notes: Iterable[Note], max_workers: Optional[int] = None
+    ) -> Iterator[Tuple[Note, Optional[str]]]:
+        """Convert several notes, running up to max_workers pandoc processes
+        concurrently. Results are yielded in the order of the input.
+
+        Args:
+            notes:
+            max_workers: Maximal number of concurrently running pandoc
+                processes. Default: Number of CPUs.
+
+        Returns:
+            Iterator of tuples (note, converted), see
+            :meth:`NoteConverter.convert_many`
+        """
+        if max_workers is None:
+            max_workers = os.cpu_count() or 1
+        notes = list(notes)
+        if max_workers == 1:
+            yield from super().convert_many(notes)
+            return
+        # Threads are enough, since the time is spent waiting for pandoc
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            yield from zip(notes, executor.map(self._convert_or_none, notes))
+
+    def _pandoc_command(self, note: Note) -> List[str]:
         css_path = Path(__file__).resolve().parent / "html_resources" / "1.css"
         cmd_parts = [
             "pandoc",
@@ -298,13 +519,155 @@ class PandocConverter(NoteConverter):
                     f'pagetitle="{note.title}"',
                 ]
             )
+        return cmd_parts
+
+    def render(self, note: Note, markdown: str) -> str:
         try:
             ret = subprocess.run(
-                cmd_parts,
+                self._pandoc_command(note),
                 capture_output=True,
                 universal_newlines=True,
-                input=self.preproc_markdown(note=note),
+                input=markdown,
             )
         except subprocess.CalledProcessError:
             raise
+        if ret.returncode != 0:
+            raise RenderError(f"Pandoc failed for {note.path}: {ret.stderr}")
         return ret.stdout
+
+    async def render_async(self, note: Note, markdown: str) -> str:
+        proc = await asyncio.create_subprocess_exec(
+            *self._pandoc_command(note),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+        stdout, stderr = await proc.communicate(markdown.encode("utf-8"))
+        if proc.returncode != 0:
+            raise RenderError(
+                f"Pandoc failed for {note.path}: "
+                f"{stderr.decode('utf-8', errors='replace')}"
+            )
+        return stdout.decode("utf-8")
+
+
+_math_or_code_regex = re.compile(
+    r"(?P<fence>^```.*?^```[^\n]*$)"
+    r"|(?P<ticks>`+).+?(?P=ticks)"
+    r"|\$\$(?P<display>.+?)\$\$"
+    r"|(?<![\\$])\$(?P<inline>[^\s$](?:[^$\n]*?[^\s$\\])?)\$(?!\d)",
+    re.MULTILINE | re.DOTALL,
+)
+
+_math_placeholder_regex = re.compile(r"verzettlermath(\d+)placeholder")
+
+
+def _protect_math(text: str) -> Tuple[str, List[Tuple[bool, str]]]:
+    """Replace TeX math (outside of code) by placeholders, so that the
+    markdown renderer doesn't touch it.
+
+    >>> _protect_math("a $x_1$ `$y$` $$z$$")
+    ('a verzettlermath0placeholder `$y$` verzettlermath1placeholder', [(False, 'x_1'), (True, 'z')])
+
+    Returns:
+        Text with placeholders, list of (is display math, tex)
+    """
+    formulas = []
+
+    def replace(match):
+        if match.group("display") is not None:
+            formulas.append((True, match.group("display")))
+        elif match.group("inline") is not None:
+            formulas.append((False, match.group("inline")))
+        else:
+            return match.group(0)
+        return f"verzettlermath{len(formulas) - 1}placeholder"
+
+    return _math_or_code_regex.sub(replace, text), formulas
+
+
+def _restore_math(rendered: str, formulas: List[Tuple[bool, str]]) -> str:
+    """Insert math in the same format as ``pandoc --mathjax``"""
+
+    def replace(match):
+        display, tex = formulas[int(match.group(1))]
+        if display:
+            return f'<span class="math display">\\[{html.escape(tex)}\\]</span>'
+        return f'<span class="math inline">\\({html.escape(tex)}\\)</span>'
+
+    return _math_placeholder_regex.sub(replace, rendered)
+
+
+_standalone_html = """<!DOCTYPE html>
+<html>
+<head>
+  <meta charset="utf-8">
+  <title>{title}</title>
+  <style>
+{css}
+  </style>
+  <script type="text/javascript" async
+    src="https://cdnjs.cloudflare.com/ajax/libs/mathjax/2.7.7/MathJax.js?config=TeX-MML-AM_CHTML">
+  </script>
+</head>
+<body>
+{body}
+</body>
+</html>
+"""
+
+
+class PythonMarkdownConverter(HtmlConverter):
+    """Renders notes in-process with the python ``markdown`` package
+    (code highlighting with pygments, math passed through to MathJax)
+    instead of running pandoc.
+    """
+
+    _extensions = ["extra", "codehilite", "sane_lists", "toc"]
+    _extension_configs = {
+        # Inline styles, so that we don't need a pygments style sheet
+        "codehilite": {"noclasses": True, "guess_lang": False},
+    }
+
+    def __init__(self, zk, **kwargs):
+        if markdown is None:
+            raise ImportError(
+                "PythonMarkdownConverter needs the 'markdown' and 'pygments' "
+                "packages, e.g. 'pip3 install markdown pygments'."
+            )
+        super().__init__(zk, **kwargs)
+        # markdown.Markdown objects are not thread safe
+        self._local = threading.local()
+
+    def _get_markdown(self) -> "markdown.Markdown":
+        md = getattr(self._local, "md", None)
+        if md is None:
+            md = markdown.Markdown(
+                extensions=self._extensions,
+                extension_configs=self._extension_configs,
+            )
+            self._local.md = md
+        return md
+
+    def render(self, note: Note, markdown: str) -> str:
+        text, formulas = _protect_math(markdown)
+        md = self._get_markdown()
+        try:
+            body = _restore_math(md.reset().convert(text), formulas)
+        except Exception as e:
+            raise RenderError(f"Failed to render {note.path}: {e}") from e
+        if not self.self_contained:
+            return body
+        css_path = Path(__file__).resolve().parent / "static" / "css" / "1.css"
+        return _standalone_html.format(
+            title=html.escape(note.title),
+            css=css_path.read_text(),
+            body=body,
+        )
+
+
+#: HTML converters by name (e.g. for command line options)
+html_converters = {
+    "pandoc": PandocConverter,
+    "markdown": PythonMarkdownConverter,
+}
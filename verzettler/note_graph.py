@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+
+""" The graph of the environment of a note that is shown below the note
+(self, predecessors, descendants, siblings and the path from the root).
+
+The graph is serialized as compact JSON, which is either served by
+zk_server (``/api/graph/<nid>``) and fetched by the page or embedded into
+static pages. ``static/js/graph.js`` draws it with vis.js.
+"""
+
+# std
+import collections
+import json
+import random
+from functools import lru_cache
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Set,
+    Tuple,
+)
+
+# 3rd
+import networkx as nx
+
+# ours
+from verzettler.log import logger
+from verzettler.metrics import registry
+
+#: Categories of notes in the environment, most important first
+categories = ["self", "predecessors", "descendants", "siblings", "rootpath"]
+
+
+def note_environment(zk, nid: str, max_nodes: int = 30) -> Dict[str, Set[str]]:
+    """Notes around a note. Predecessors, direct descendants and the notes on
+    the shortest paths from the root are always included. Notes further
+    down and siblings are added at random until there are max_nodes notes.
+    The random choice only depends on the ID of the note.
+
+    Args:
+        zk: Zettelkasten
+        nid: ID of the note
+        max_nodes: See above
+
+    Returns:
+        Mapping of category (see :data:`categories`) to IDs and ``selected``
+        to the IDs of all notes to show
+    """
+    g = zk._graph
+    environment = collections.defaultdict(set)
+    environment["self"].add(nid)
+    selected = {nid}
+    try:
+        paths_from_root = zk.get_shortest_path_nodes(nid)
+        environment["rootpath"] |= paths_from_root
+        selected |= paths_from_root
+    except nx.exception.NetworkXNoPath:
+        logger.warning(f"No path from {zk.root} to {nid}")
+    predecessors = set(g.predecessors(nid))
+    environment["predecessors"] |= predecessors
+    selected |= predecessors
+    descendants = set(nx.descendants_at_distance(g, nid, distance=1))
+    environment["descendants"] |= descendants
+    selected |= descendants
+    optional = set()
+    for dist in range(2, 3):
+        desc = set(nx.descendants_at_distance(g, nid, distance=dist))
+        environment["descendants"] |= desc
+        optional |= desc
+    for predecessor in predecessors:
+        siblings = set(g.successors(predecessor))
+        environment["siblings"] |= siblings
+        optional |= siblings
+    optional -= selected
+    if len(selected) < max_nodes:
+        # Sorted, because the order of sets of strings changes between runs
+        rng = random.Random(nid)
+        selected |= set(
+            rng.choices(
+                sorted(optional),
+                k=min(len(optional), max_nodes - len(selected)),
+            )
+        )
+    environment["selected"] = selected
+    return dict(environment)
+
+
+def _category(environment: Dict[str, Set[str]], nid: str) -> str:
+    for category in categories:
+        if nid in environment.get(category, ()):
+            return category
+    return "other"
+
+
+@lru_cache(maxsize=1000)
+def _environment(zk, version: int, nid: str) -> Dict[str, Set[str]]:
+    return note_environment(zk, nid)
+
+
+def graph_data(
+    zk,
+    nids: Iterable[str],
+    groups: Optional[Callable[[str], str]] = None,
+    url: str = "/open/{nid}",
+    positions: Optional[Dict[str, Tuple[float, float]]] = None,
+) -> Dict[str, Any]:
+    """Graph of notes in the format of :func:`environment_json`.
+
+    Args:
+        zk: Zettelkasten
+        nids: IDs of the notes to include. IDs that are not notes of the
+            Zettelkasten are ignored.
+        groups: Function that returns the group of a note. Default: All
+            notes are ``other``.
+        url: Format of the URL of a note
+        positions: Mapping of ID to position (x, y) that is added to the
+            nodes
+
+    Returns:
+        Object with ``nodes`` and ``edges``
+    """
+    selected = sorted(n for n in set(nids) if n in zk)
+    selected_set = set(selected)
+    nodes = []  # type: List[Dict[str, Any]]
+    edges = []  # type: List[List]
+    for source in selected:
+        note = zk[source]
+        node = {
+            "id": source,
+            "label": note.title,
+            "group": groups(source) if groups is not None else "other",
+            "url": url.format(nid=source),
+        }  # type: Dict[str, Any]
+        if positions is not None and source in positions:
+            node["x"], node["y"] = positions[source]
+        nodes.append(node)
+        for target in sorted(set(note.links)):
+            if target not in selected_set or target == source:
+                continue
+            if source in zk[target].links:
+                # Drawn once, in both directions
+                if source < target:
+                    edges.append([source, target, 1])
+            else:
+                edges.append([source, target])
+    return {"nodes": nodes, "edges": edges}
+
+
+def dumps(graph: Dict[str, Any]) -> str:
+    """Compact JSON of a graph"""
+    return json.dumps(graph, separators=(",", ":"), ensure_ascii=False)
+
+
+def embed_json(json_str: str, element_id: str) -> str:
+    """Script element with JSON that can be put into HTML"""
+    # Closing tags inside of the JSON would end the script
+    json_str = json_str.replace("</", "<\\/")
+    return (
+        f'<script type="application/json" id="{element_id}">'
+        f"{json_str}</script>\n"
+    )
+
+
+@lru_cache(maxsize=1000)
+def _environment_json(zk, version: int, nid: str) -> str:
+    environment = _environment(zk, version, nid)
+    graph = graph_data(
+        zk,
+        environment["selected"],
+        groups=lambda n: _category(environment, n),
+    )
+    return dumps({"nid": nid, **graph})
+
+
+registry.register_lru_cache(
+    "note_graph", _environment_json, help="Graphs of the environments of notes"
+)
+
+
+def environment_json(zk, nid: str) -> str:
+    """Graph of the environment of a note as JSON (cached per version of the
+    Zettelkasten):
+
+    * ``nodes``: List of objects with ``id``, ``label`` (title), ``group``
+      (category, see :data:`categories`) and ``url`` (and ``x`` and ``y``
+      for graphs with precomputed positions, see :func:`graph_data`)
+    * ``edges``: List of ``[from, to]`` or ``[from, to, 1]`` for links in
+      both directions
+    """
+    return _environment_json(zk, zk.version, nid)
+
+
+_graph_html = """<script src="{vis_js_url}"></script>
+<script src="{graph_js_url}"></script>
+<div id="note-graph" class="note-graph" style="width: 100%; height: {height}px;"
+  data-nid="{nid}"{data}></div>
+"""
+
+
+def graph_html(
+    zk,
+    nid: str,
+    vis_js_url: str = "/static/js/vis-network.min.js",
+    graph_js_url: str = "/static/js/graph.js",
+    api_url: Optional[str] = None,
+) -> str:
+    """HTML to show the graph of the environment of a note.
+
+    Args:
+        zk: Zettelkasten
+        nid: ID of the note
+        vis_js_url: URL of vis-network.min.js
+        graph_js_url: URL of graph.js
+        api_url: URL of ``/api/graph/`` of zk_server. If given, the graph is
+            fetched from there and notes can be expanded by clicking on
+            them. Else, the graph is embedded into the page.
+
+    Returns:
+        HTML or empty string if the environment is too large to be shown
+    """
+    n_nodes = len(_environment(zk, zk.version, nid)["selected"])
+    if n_nodes >= 50:
+        return ""
+    if api_url is not None:
+        data = f' data-api-url="{api_url}"'
+        embedded = ""
+    else:
+        data = ' data-graph="#note-graph-data"'
+        embedded = embed_json(environment_json(zk, nid), "note-graph-data")
+    return embedded + _graph_html.format(
+        vis_js_url=vis_js_url,
+        graph_js_url=graph_js_url,
+        height=400 + 20 * n_nodes,
+        nid=nid,
+        data=data,
+    )
@@ -2,15 +2,17 @@
 
 # std
 from abc import ABC, abstractmethod
-from typing import Optional, Iterable
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
 from pathlib import PurePath, Path
-import os.path
+import os
 
 # ours
 from verzettler.zettelkasten import Zettelkasten
 from verzettler.note import Note
 from verzettler.markdown_reader import MarkdownReader
 from verzettler.log import logger
+from verzettler.util.write import WriteSummary, write_if_changed
 
 
 class NoteTransformer(ABC):
@@ -20,16 +22,87 @@ class NoteTransformer(ABC):
     def transform(self, note: Note) -> str:
         pass
 
-    def transform_write(self, note: Note, path: Optional[PurePath] = None):
-        # todo: add output about whether changes were made
+    def transform_write(
+        self,
+        note: Note,
+        path: Optional[PurePath] = None,
+        summary: Optional[WriteSummary] = None,
+    ) -> bool:
+        """Transform note and write the result (only if it changed).
+
+        Args:
+            note:
+            path: Output path. Default: Path of the note
+            summary: Record the write here
+
+        Returns:
+            True if the file was written
+        """
         if path:
             path = Path(path)
         else:
             path = note.path
         logger.debug(f"Transforming note {note.path} and writing to {path}")
         transformed = self.transform(note)
-        with path.open("w") as outf:
-            outf.write(transformed)
+        return write_if_changed(path, transformed, summary=summary)
+
+    def transform_write_many(
+        self,
+        notes: Iterable[Note],
+        summary: Optional[WriteSummary] = None,
+        processes: Optional[int] = 1,
+    ) -> None:
+        """Transform notes in place, see :meth:`transform_write`.
+
+        Args:
+            notes: Notes
+            summary: Record the writes here
+            processes: Number of worker processes (None: Number of CPUs).
+                Only used by transformers that support it, others always
+                transform the notes one after the other.
+        """
+        for note in notes:
+            self.transform_write(note, summary=summary)
+
+
+#: What :class:`KastenView` knows about a note
+NoteInfo = NamedTuple(
+    "NoteInfo", [("nid", str), ("title", str), ("path", Path)]
+)
+
+
+class KastenView(object):
+    """Compact, read only view of a Zettelkasten with the titles, paths and
+    backlinks of the notes. This is all that :class:`DefaultTransformer`
+    needs, and it is much cheaper to send to worker processes than the
+    Zettelkasten itself.
+
+    Args:
+        zk: Zettelkasten
+    """
+
+    def __init__(self, zk: Zettelkasten):
+        self._notes = {
+            note.nid: NoteInfo(note.nid, note.title, note.path)
+            for note in zk.notes
+        }  # type: Dict[str, NoteInfo]
+        self._backlinks = {}  # type: Dict[str, List[str]]
+        for note in zk.notes:
+            backlinks = zk.get_backlinks(note.nid)
+            if backlinks:
+                self._backlinks[note.nid] = backlinks
+
+    def get_backlinks(self, nid: str) -> List[str]:
+        return self._backlinks.get(nid, [])
+
+    def __getitem__(self, item: str) -> NoteInfo:
+        return self._notes[item]
+
+    def __contains__(self, item: str) -> bool:
+        return item in self._notes
+
+    def __len__(self):
+        return len(self._notes)
 
 
 def identity(arg):
@@ -38,9 +111,41 @@ def identity(arg):
 
 # todo: split up
 class DefaultTransformer(NoteTransformer):
+    """
+    Args:
+        zk: Zettelkasten (or :class:`KastenView`)
+        tag_transformer: Function that takes and returns the set of tags of
+            a note. Must be picklable for parallel transformations.
+    """
+
     def __init__(self, zk: Zettelkasten, tag_transformer=identity):
         self.zk = zk
         self.tag_transformer = tag_transformer
+        self._link_cache = {}  # type: Dict[Tuple[PurePath, str], str]
+        self._link_cache_version = None  # type: Optional[int]
+
+    def transform_write_many(
+        self,
+        notes: Iterable[Note],
+        summary: Optional[WriteSummary] = None,
+        processes: Optional[int] = 1,
+    ) -> None:
+        notes = list(notes)
+        if processes == 1 or len(notes) <= 1:
+            return super().transform_write_many(notes, summary=summary)
+        chunksize = max(
+            1, min(64, len(notes) // (4 * (processes or os.cpu_count() or 1)))
+        )
+        with ProcessPoolExecutor(
+            max_workers=processes,
+            initializer=_init_worker,
+            initargs=(KastenView(self.zk), self.tag_transformer),
+        ) as executor:
+            for changed, n_bytes in executor.map(
+                _transform_write_worker, notes, chunksize=chunksize
+            ):
+                if summary is not None:
+                    summary.add(changed=changed, n_bytes=n_bytes)
 
     @staticmethod
     def _format_tags(tags: Iterable[str]) -> str:
@@ -54,26 +159,54 @@ class DefaultTransformer(NoteTransformer):
         )
 
     def _format_link(self, note: Note, zid: str) -> str:
+        # The result only depends on the directory of the note, so it is
+        # memoized for all notes of a directory (until the Zettelkasten
+        # changes)
+        version = getattr(self.zk, "version", None)
+        if version != self._link_cache_version:
+            self._link_cache = {}
+            self._link_cache_version = version
+        key = (note.path.parent, zid)
+        try:
+            return self._link_cache[key]
+        except KeyError:
+            pass
         if zid in self.zk:
+            target = self.zk[zid]
             rel_path = Path(
-                os.path.relpath(str(self.zk[zid].path), str(note.path.parent))
+                os.path.relpath(str(target.path), str(note.path.parent))
             )
-            link_title = self.zk[zid].title
-            return f'[[{zid}]] [{link_title}]({rel_path} "autogen")'
+            formatted = f'[[{zid}]] [{target.title}]({rel_path} "autogen")'
         else:
-            return f"[[{zid}]]"
+            formatted = f"[[{zid}]]"
+        self._link_cache[key] = formatted
+        return formatted
+
+    def _replace_links(self, note: Note, text: str) -> str:
+        """Replace the autogenerated parts of the links of a line"""
+        if '"autogen")' in text:
+            text = Note.autogen_link_regex.sub("", text)
+        if "[[" in text:
+            text = Note.id_link_regex.sub(
+                lambda match: self._format_link(note, match.group(1)), text
+            )
+        return text
 
     def transform(self, note: Note) -> str:
-        out_lines = []
+        # Lines are only appended and at most the last one is taken back
+        # (pop), so that the transformation is linear in the length of the
+        # note
+        out_lines = []  # type: List[str]
 
         md_reader = MarkdownReader.from_file(note.path)
-        for i, md_line in enumerate(md_reader.lines):
+        lines = md_reader.lines
+        for i, md_line in enumerate(lines):
             remove_line = False
 
             # Fixing
             if md_line.is_code_block and "tags: " in md_line.text.lower():
-                if i >= 1 and not md_reader.lines[i - 1].text.strip():
-                    out_lines = out_lines[:-1]
+                if i >= 1 and not lines[i - 1].text.strip() and out_lines:
+                    out_lines.pop()
                 continue
 
             # Change style of headers
@@ -81,24 +214,26 @@ class DefaultTransformer(NoteTransformer):
                 i > 1
                 and not md_line.is_code_block
                 and md_line.text.startswith("===")
-                and md_reader.lines[i - 1].text.strip()
+                and lines[i - 1].text.strip()
             ):
-                out_lines = out_lines[:-1]
-                md_line.text = "# " + md_reader.lines[i - 1].text
+                if out_lines:
+                    out_lines.pop()
+                md_line.text = "# " + lines[i - 1].text
             if (
                 i > 1
                 and not md_line.is_code_block
                 and md_line.text.startswith("---")
-                and md_reader.lines[i - 1].text.strip()
+                and lines[i - 1].text.strip()
             ):
-                out_lines = out_lines[:-1]
-                md_line.text = "## " + md_reader.lines[i - 1].text
+                if out_lines:
+                    out_lines.pop()
+                md_line.text = "## " + lines[i - 1].text
 
             # Modifying tags if haven't been given before
             if not note.tags:
                 if (
                     i >= 1
-                    and md_reader.lines[i - 1].text.startswith("# ")
+                    and lines[i - 1].text.startswith("# ")
                     and not md_line.is_code_block
                 ):
                     tags = self.tag_transformer(set())
@@ -118,19 +253,9 @@ class DefaultTransformer(NoteTransformer):
                     continue
                 md_line.text = self._format_tags(tags)
 
-            # Replacing/extending links
-
-            # Remove old autogenerated links
-            md_line.text = Note.autogen_link_regex.sub("", md_line.text)
-
-            # Add new links
-            links = Note.id_link_regex_no_group.findall(md_line.text)
-            for link in links:
-                zid = Note.id_regex.findall(link)
-                assert len(zid) == 1
-                zid = zid[0]
-                new_links = self._format_link(note, zid)
-                md_line.text = md_line.text.replace(link, new_links)
+            # Replacing/extending links: Remove old autogenerated links and
+            # add new ones
+            md_line.text = self._replace_links(note, md_line.text)
 
             # Remove old backlinks section
             if (
@@ -162,3 +287,29 @@ class DefaultTransformer(NoteTransformer):
                         )
 
         return "".join(out_lines)
+
+
+# Worker processes
+# =============================================================================
+
+# Set by _init_worker in each worker process
+_worker_state = {}  # type: Dict[str, DefaultTransformer]
+
+
+def _init_worker(view: KastenView, tag_transformer) -> None:
+    _worker_state["transformer"] = DefaultTransformer(
+        zk=view, tag_transformer=tag_transformer
+    )
+
+
+def _transform_write_worker(note: Note) -> Tuple[bool, int]:
+    """Transform a single note in place (runs in worker process)
+
+    Returns:
+        Whether the file was written, number of bytes written
+    """
+    summary = WriteSummary()
+    changed = _worker_state["transformer"].transform_write(
+        note, summary=summary
+    )
+    return changed, summary.bytes_written
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+
+"""In-process index of the file names below the Zettelkasten directories.
+Used to look up notes by name without walking the directories (or forking
+``find``) on every invocation.
+"""
+
+# std
+import os
+import re
+import json
+import fnmatch
+import hashlib
+from pathlib import Path, PurePath
+from typing import List, Union, Iterable, Dict, Tuple, Optional
+
+# ours
+from verzettler.log import logger
+from verzettler.util.paths import get_cache_dir
+
+
+def search_term_to_glob(search_term: str) -> str:
+    """Convert a search term as given on the command line to a glob pattern
+    for file names.
+
+    >>> search_term_to_glob("asdf")
+    '*asdf*.md'
+    >>> search_term_to_glob("asdf.md")
+    '*asdf.md'
+    >>> search_term_to_glob("as*df")
+    'as*df'
+    >>> search_term_to_glob("asdf*")
+    'asdf*.md'
+    """
+    if "*" not in search_term:
+        if not search_term.endswith(".md"):
+            return f"*{search_term}*.md"
+        else:
+            return f"*{search_term}"
+    elif search_term.endswith("*"):
+        return search_term + ".md"
+    return search_term
+
+
+def _is_excluded(name: str) -> bool:
+    # Equivalent to ``find -not -wholename "*/.git*"``
+    return name.startswith(".git")
+
+
+class PathIndex(object):
+    """Index of all files below a set of directories.
+
+    For every directory we keep its modification time together with the names
+    of the files and sub directories it contains. Adding, removing or renaming
+    an entry changes the modification time of the containing directory, so
+    refreshing the index only needs one ``stat`` call per directory and
+    re-lists only the directories that actually changed.
+
+    Args:
+        directories: Root directories
+    """
+
+    _cache_format_version = 1
+
+    def __init__(self, directories: Iterable[Union[str, PurePath]]):
+        self.directories = [str(Path(d)) for d in directories]
+        # directory -> (mtime in ns, file names, sub directory names)
+        self._dirs = {}  # type: Dict[str, Tuple[int, List[str], List[str]]]
+        #: True if the index changed since it was loaded/saved
+        self.dirty = False
+
+    # Building and refreshing
+    # =========================================================================
+
+    def _scan_directory(self, directory: str, mtime: int) -> None:
+        files = []
+        subdirs = []
+        with os.scandir(directory) as it:
+            for entry in it:
+                if _is_excluded(entry.name):
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.name)
+                elif entry.is_file(follow_symlinks=False):
+                    files.append(entry.name)
+        self._dirs[directory] = (mtime, files, subdirs)
+        self.dirty = True
+
+    def refresh(self) -> None:
+        """Bring the index up to date with the file system."""
+        seen = set()
+        stack = list(self.directories)
+        n_scanned = 0
+        while stack:
+            directory = stack.pop()
+            if directory in seen:
+                continue
+            try:
+                mtime = os.stat(directory).st_mtime_ns
+            except OSError:
+                continue
+            seen.add(directory)
+            cached = self._dirs.get(directory)
+            if cached is None or cached[0] != mtime:
+                # Take mtime before listing, so that changes made while
+                # listing are picked up by the next refresh.
+                self._scan_directory(directory, mtime)
+                n_scanned += 1
+            stack.extend(
+                os.path.join(directory, subdir)
+                for subdir in self._dirs[directory][2]
+            )
+        for directory in set(self._dirs) - seen:
+            del self._dirs[directory]
+            self.dirty = True
+        logger.debug(
+            f"Refreshed path index: Re-listed {n_scanned} of {len(seen)} "
+            f"directories."
+        )
+
+    # Querying
+    # =========================================================================
+
+    def paths(self) -> List[Path]:
+        """All indexed files"""
+        return [
+            Path(directory) / name
+            for directory, (_, files, _) in self._dirs.items()
+            for name in files
+        ]
+
+    def glob(self, pattern: str) -> List[Path]:
+        """All files whose name matches the glob pattern (same semantics as
+        the ``-name`` option of ``find``).
+        """
+        regex = re.compile(fnmatch.translate(pattern))
+        return sorted(
+            Path(directory) / name
+            for directory, (_, files, _) in self._dirs.items()
+            for name in files
+            if regex.match(name)
+        )
+
+    def search(self, search_term: str) -> List[Path]:
+        """Search for files, see :func:`search_term_to_glob`."""
+        pattern = search_term_to_glob(search_term)
+        logger.debug(f"Search term: '{pattern}'.")
+        return self.glob(pattern)
+
+    # Persistence
+    # =========================================================================
+
+    @staticmethod
+    def default_cache_path(directories: Iterable[Union[str, PurePath]]) -> Path:
+        key = "\n".join(sorted(str(Path(d).resolve()) for d in directories))
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+        return get_cache_dir() / f"path_index_{digest}.json"
+
+    def save(self, path: Union[str, PurePath]) -> None:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + f".{os.getpid()}.tmp")
+        with tmp_path.open("w") as outf:
+            json.dump(
+                {
+                    "version": self._cache_format_version,
+                    "directories": self.directories,
+                    "dirs": self._dirs,
+                },
+                outf,
+            )
+        os.replace(str(tmp_path), str(path))
+        self.dirty = False
+
+    @classmethod
+    def load(
+        cls,
+        path: Union[str, PurePath],
+        directories: Iterable[Union[str, PurePath]],
+    ) -> "PathIndex":
+        """Load index from cache file. If the cache file is missing, broken
+        or belongs to different directories, an empty index is returned.
+        The index is not refreshed.
+        """
+        index = cls(directories)
+        try:
+            with Path(path).open() as inf:
+                data = json.load(inf)
+        except (OSError, ValueError) as e:
+            logger.debug(f"Could not load path index from {path}: {e}")
+            return index
+        if (
+            data.get("version") != cls._cache_format_version
+            or data.get("directories") != index.directories
+        ):
+            logger.debug(f"Ignoring outdated path index at {path}.")
+            return index
+        index._dirs = {
+            directory: (mtime, files, subdirs)
+            for directory, (mtime, files, subdirs) in data["dirs"].items()
+        }
+        return index
+
+    @classmethod
+    def cached(
+        cls,
+        directories: Iterable[Union[str, PurePath]],
+        cache_path: Optional[Union[str, PurePath]] = None,
+    ) -> "PathIndex":
+        """Load index from cache file, refresh it and write it back if
+        anything changed.
+
+        Args:
+            directories: Root directories
+            cache_path: Path to cache file. Default: See
+                :meth:`default_cache_path`.
+
+        Returns:
+            Up to date index
+        """
+        directories = list(directories)
+        if cache_path is None:
+            cache_path = cls.default_cache_path(directories)
+        index = cls.load(cache_path, directories)
+        index.refresh()
+        if index.dirty:
+            try:
+                index.save(cache_path)
+            except OSError as e:
+                logger.warning(
+                    f"Could not save path index to {cache_path}: {e}"
+                )
+        return index
+
+    # Magic
+    # =========================================================================
+
+    def __len__(self):
+        return sum(len(files) for _, files, _ in self._dirs.values())
+
+    def __repr__(self):
+        return f"PathIndex({len(self._dirs)} directories, {len(self)} files)"
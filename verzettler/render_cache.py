@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+
+""" Cache for rendered notes. """
+
+# std
+import os
+import json
+import hashlib
+import threading
+import collections
+from pathlib import Path, PurePath
+from typing import Optional, Union, Iterable, Dict, Tuple, List
+
+# ours
+from verzettler.log import logger
+
+
+class RenderCache(object):
+    """Cache of rendered notes (e.g. pandoc output).
+
+    Entries are keyed by a hash of everything that goes into the rendered
+    output (see :meth:`make_key`), so that a changed note or a changed title
+    of a linked note automatically results in a cache miss. Additionally,
+    every entry remembers the note it belongs to and the notes it links to,
+    so that :meth:`invalidate` can drop all entries that are affected by a
+    change right away.
+
+    The in-memory cache is a LRU cache, bounded by the total size of the
+    cached outputs. Optionally, entries are also written to a directory and
+    survive restarts. Since the keys are content hashes, persisted entries
+    never go stale; invalidating them only serves to free space. Entries of
+    old versions of notes are left behind on disk, so the least recently
+    used persisted entries are removed when they take up more than
+    max_disk_bytes (see :meth:`prune_disk`).
+
+    Args:
+        max_bytes: Maximal total size of all entries kept in memory
+        directory: If given, also persist entries in this directory
+        max_disk_bytes: Maximal total size of the persisted entries
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 64 * 2**20,
+        directory: Optional[Union[str, PurePath]] = None,
+        max_disk_bytes: int = 256 * 2**20,
+    ):
+        self.max_bytes = max_bytes
+        self.directory = Path(directory) if directory is not None else None
+        self.max_disk_bytes = max_disk_bytes
+        # key -> rendered output, least recently used first
+        self._entries = collections.OrderedDict()
+        self._sizes = {}  # type: Dict[str, int]
+        self._size = 0
+        # nid -> keys of the entries that were rendered from the note or
+        # that depend on it (i.e. link to it)
+        self._nid2keys = collections.defaultdict(set)
+        # key -> nid of the note that was rendered
+        self._key2nid = {}  # type: Dict[str, str]
+        # key -> nids of the notes the entry depends on
+        self._key2dependencies = {}  # type: Dict[str, List[str]]
+        self._lock = threading.Lock()
+        # Guards the total size of the persisted entries and pruning
+        self._disk_lock = threading.Lock()
+        self._disk_size = 0
+        self.hits = 0
+        self.misses = 0
+        self.prune_disk()
+
+    @staticmethod
+    def make_key(*parts: str) -> str:
+        """Hash of all parts that determine the rendered output"""
+        sha = hashlib.sha1()
+        for part in parts:
+            sha.update(part.encode("utf-8", errors="surrogateescape"))
+            sha.update(b"\0")
+        return sha.hexdigest()
+
+    # Disk
+    # =========================================================================
+
+    def _disk_path(self, key: str) -> Path:
+        return self.directory / key[:2] / (key + ".json")
+
+    def _read_disk(self, key: str) -> Optional[Tuple[str, str, List[str]]]:
+        if self.directory is None:
+            return None
+        try:
+            path = self._disk_path(key)
+            with path.open() as inf:
+                data = json.load(inf)
+            # Recently used entries are kept when pruning
+            os.utime(str(path))
+            return data["value"], data["nid"], data["dependencies"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _write_disk(
+        self, key: str, value: str, nid: str, dependencies: List[str]
+    ) -> None:
+        if self.directory is None:
+            return
+        path = self._disk_path(key)
+        tmp_path = path.with_name(path.name + f".{os.getpid()}.tmp")
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with tmp_path.open("w") as outf:
+                json.dump(
+                    {"nid": nid, "dependencies": dependencies, "value": value},
+                    outf,
+                )
+            size = tmp_path.stat().st_size
+            os.replace(str(tmp_path), str(path))
+        except OSError as e:
+            logger.warning(f"Could not write render cache entry {path}: {e}")
+            return
+        with self._disk_lock:
+            # Overestimated if an entry is overwritten, which only makes
+            # the next pruning come earlier
+            self._disk_size += size
+            over_limit = self._disk_size > self.max_disk_bytes
+        if over_limit:
+            self.prune_disk()
+
+    def _remove_disk(self, key: str) -> None:
+        if self.directory is None:
+            return
+        path = self._disk_path(key)
+        try:
+            size = path.stat().st_size
+            path.unlink()
+        except OSError:
+            return
+        with self._disk_lock:
+            self._disk_size -= size
+
+    def prune_disk(self) -> int:
+        """Remove the least recently used persisted entries, so that all
+        persisted entries take up at most max_disk_bytes.
+
+        Returns:
+            Number of removed entries
+        """
+        if self.directory is None:
+            return 0
+        with self._disk_lock:
+            entries = []
+            for path in self.directory.glob("*/*.json"):
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+            # Most recently used first
+            entries.sort(reverse=True)
+            total = 0
+            removed = 0
+            for _, size, path in entries:
+                if total + size <= self.max_disk_bytes and not removed:
+                    total += size
+                    continue
+                try:
+                    path.unlink()
+                    removed += 1
+                except OSError:
+                    total += size
+            self._disk_size = total
+        if removed:
+            logger.debug(f"Removed {removed} persisted renders.")
+        return removed
+
+    # Memory
+    # =========================================================================
+
+    def _put_memory(
+        self, key: str, value: str, nid: str, dependencies: List[str]
+    ) -> None:
+        size = len(value.encode("utf-8", errors="surrogateescape"))
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._size -= self._sizes[key]
+            self._unregister(key)
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        self._sizes[key] = size
+        self._size += size
+        self._register(key, nid, dependencies)
+        while self._size > self.max_bytes:
+            old_key, _ = self._entries.popitem(last=False)
+            self._size -= self._sizes.pop(old_key)
+            self._unregister(old_key)
+
+    def _remove_memory(self, key: str) -> None:
+        if key in self._entries:
+            del self._entries[key]
+            self._size -= self._sizes.pop(key)
+        self._unregister(key)
+
+    def _register(self, key: str, nid: str, dependencies: List[str]) -> None:
+        self._key2nid[key] = nid
+        self._key2dependencies[key] = dependencies
+        self._nid2keys[nid].add(key)
+        for dependency in dependencies:
+            self._nid2keys[dependency].add(key)
+
+    def _unregister(self, key: str) -> None:
+        """Drop key from the indices (the entry itself is already gone)"""
+        nid = self._key2nid.pop(key, None)
+        if nid is None:
+            return
+        for other in [nid, *self._key2dependencies.pop(key)]:
+            keys = self._nid2keys.get(other)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._nid2keys[other]
+
+    # Public interface
+    # =========================================================================
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+        from_disk = self._read_disk(key)
+        with self._lock:
+            if from_disk is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            value, nid, dependencies = from_disk
+            self._put_memory(key, value, nid, dependencies)
+        return value
+
+    def put(
+        self, key: str, value: str, nid: str, dependencies: Iterable[str] = ()
+    ) -> None:
+        """Add entry
+
+        Args:
+            key: Key from :meth:`make_key`
+            value: Rendered output
+            nid: ID of the rendered note
+            dependencies: IDs of notes the output depends on (e.g. because
+                their titles are used as link texts)
+        """
+        dependencies = list(dependencies)
+        with self._lock:
+            self._put_memory(key, value, nid, dependencies)
+        self._write_disk(key, value, nid, dependencies)
+
+    def invalidate(self, nids: Iterable[str], dependents: bool = True) -> int:
+        """Remove all entries that were rendered from the given notes or that
+        depend on them (from memory and disk).
+
+        Args:
+            nids: Note IDs
+            dependents: Also remove entries of other notes that depend on
+                the given notes. Not needed if e.g. the titles didn't change.
+
+        Returns:
+            Number of removed entries
+        """
+        keys = set()
+        with self._lock:
+            for nid in nids:
+                for key in self._nid2keys.get(nid, set()):
+                    if dependents or self._key2nid[key] == nid:
+                        keys.add(key)
+            for key in keys:
+                self._remove_memory(key)
+        for key in keys:
+            self._remove_disk(key)
+        if keys:
+            logger.debug(f"Invalidated {len(keys)} cached renders.")
+        return len(keys)
+
+    def clear(self) -> None:
+        """Clear in-memory cache. Persisted entries are kept."""
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self._nid2keys.clear()
+            self._key2nid.clear()
+            self._key2dependencies.clear()
+            self._size = 0
+
+    @property
+    def size(self) -> int:
+        """Total size of the entries held in memory in bytes"""
+        return self._size
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key: str):
+        return key in self._entries
+
+    def __repr__(self):
+        return f"RenderCache({len(self)} entries, {self._size} bytes)"
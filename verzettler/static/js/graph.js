@@ -0,0 +1,176 @@
+// Draws the graph of the environment of a note with vis.js. The graph is
+// either embedded into the page (static pages) or fetched from zk_server
+// (/api/graph/<nid>), in which case clicking on a note adds its environment
+// to the graph and double clicking opens it.
+// If all nodes come with positions (x, y), e.g. the graph of the whole
+// Zettelkasten from zk_web, the physics simulation is switched off.
+// Nodes can also be clusters of notes (level of detail view of zk_web), which
+// are expanded into their notes by clicking on them if the container has a
+// data-cluster-url (/api/clusters/<mode>/ of zk_server).
+
+const groupColors = {
+  self: '#fb8072',
+  predecessors: '#ccebc5',
+  descendants: '#ffed6f',
+  siblings: '#fccde5',
+  rootpath: '#d9d9d9',
+  cluster: '#80b1d3',
+  other: '#8dd3c7'
+}
+
+const toVisNode = (node, group) => ({
+  id: node.id,
+  label: node.label,
+  url: node.url,
+  x: node.x,
+  y: node.y,
+  cluster: node.cluster,
+  // Clusters are sized by their number of notes
+  shape: node.size === undefined ? 'box' : 'dot',
+  value: node.size,
+  font: { size: 14 },
+  color: groupColors[group || node.group] || groupColors.other
+})
+
+// Edges are [from, to], [from, to, both] or, for aggregated links between
+// clusters, [from, to, both, number of links]
+const toVisEdge = (edge) => ({
+  id: edge[0] + '-' + edge[1],
+  from: edge[0],
+  to: edge[1],
+  value: edge[3],
+  color: 'black',
+  arrows: edge[2] ? 'to, from' : 'to'
+})
+
+const drawGraph = (container, graph) => {
+  const nodes = new vis.DataSet(graph.nodes.map((node) => toVisNode(node)))
+  const edges = new vis.DataSet(graph.edges.map(toVisEdge))
+  const options = { clickToUse: container.dataset.clickToUse !== 'false' }
+  const positioned =
+    graph.nodes.length > 0 &&
+    graph.nodes.every((node) => node.x !== undefined && node.y !== undefined)
+  if (positioned) {
+    options.physics = false
+    options.layout = { improvedLayout: false }
+    options.edges = { smooth: false }
+  }
+  const network = new vis.Network(
+    container,
+    { nodes: nodes, edges: edges },
+    options
+  )
+  return { network: network, nodes: nodes, edges: edges }
+}
+
+const openNode = (nodes, id) => {
+  const node = nodes.get(id)
+  if (node && node.url) {
+    window.open(node.url)
+  }
+}
+
+const expandClusters = (graph, clusterUrl) => {
+  const expanded = new Set()
+  graph.network.on('click', (properties) => {
+    const node = graph.nodes.get(properties.nodes[0])
+    if (!node || node.cluster === undefined || expanded.has(node.cluster)) {
+      return
+    }
+    expanded.add(node.cluster)
+    // Keeps the query of clusterUrl (e.g. max_clusters)
+    const url = new URL(clusterUrl)
+    url.pathname += encodeURIComponent(node.cluster)
+    expanded.forEach((cluster) => url.searchParams.append('expanded', cluster))
+    fetch(url)
+      .then((response) => {
+        if (!response.ok) {
+          throw new Error(response.statusText)
+        }
+        return response.json()
+      })
+      .then((more) => {
+        // Positions of the notes are relative to the cluster
+        const center = graph.network.getPositions([node.id])[node.id]
+        graph.edges.remove(
+          graph.edges.getIds({
+            filter: (edge) => edge.from === node.id || edge.to === node.id
+          })
+        )
+        graph.nodes.remove(node.id)
+        graph.nodes.add(
+          more.nodes.map((note) =>
+            toVisNode({
+              ...note,
+              url: new URL(note.url, clusterUrl).href,
+              x: note.x + center.x,
+              y: note.y + center.y
+            })
+          )
+        )
+        graph.edges.update(more.edges.map(toVisEdge))
+      })
+      .catch((error) => {
+        expanded.delete(node.cluster)
+        console.error('Failed to expand ' + node.cluster + ': ' + error)
+      })
+  })
+  graph.network.on('doubleClick', (properties) => {
+    openNode(graph.nodes, properties.nodes[0])
+  })
+}
+
+document.addEventListener('DOMContentLoaded', function () {
+  const container = document.getElementById('note-graph')
+  if (!container) {
+    return
+  }
+  const apiUrl = container.dataset.apiUrl
+  if (!apiUrl) {
+    const data = document.querySelector(container.dataset.graph)
+    const graph = drawGraph(container, JSON.parse(data.textContent))
+    if (container.dataset.clusterUrl) {
+      expandClusters(graph, container.dataset.clusterUrl)
+      return
+    }
+    // Embedded graph, no expansion possible
+    graph.network.on('click', (properties) => {
+      openNode(graph.nodes, properties.nodes[0])
+    })
+    return
+  }
+  const fetchGraph = (nid) =>
+    fetch(apiUrl + encodeURIComponent(nid)).then((response) => {
+      if (!response.ok) {
+        throw new Error(response.statusText)
+      }
+      return response.json()
+    })
+  fetchGraph(container.dataset.nid)
+    .then((initial) => {
+      const graph = drawGraph(container, initial)
+      const expanded = new Set([initial.nid])
+      graph.network.on('click', (properties) => {
+        const nid = properties.nodes[0]
+        if (nid === undefined || expanded.has(nid)) {
+          return
+        }
+        expanded.add(nid)
+        fetchGraph(nid).then((more) => {
+          // Notes that are already shown keep their color
+          graph.nodes.add(
+            more.nodes
+              .filter((node) => !graph.nodes.get(node.id))
+              .map((node) => toVisNode(node, 'other'))
+          )
+          graph.edges.update(more.edges.map(toVisEdge))
+        })
+      })
+      graph.network.on('doubleClick', (properties) => {
+        openNode(graph.nodes, properties.nodes[0])
+      })
+    })
+    .catch((error) => {
+      container.textContent = 'Failed to load the graph: ' + error
+    })
+})
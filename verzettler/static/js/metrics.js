@@ -0,0 +1,80 @@
+// Shows the summary of /metrics.json on the dashboard. Loaded separately, so
+// that the dashboard itself can still be cached.
+
+const formatSeconds = (value) => {
+  if (value === null || value === undefined) {
+    return '-'
+  }
+  return (1000 * value).toFixed(1) + ' ms'
+}
+
+const makeTable = (header, rows) => {
+  const table = document.createElement('table')
+  const head = table.insertRow()
+  header.forEach((text) => {
+    const cell = document.createElement('th')
+    cell.textContent = text
+    head.appendChild(cell)
+  })
+  rows.forEach((row) => {
+    const tr = table.insertRow()
+    row.forEach((text) => {
+      tr.insertCell().textContent = text
+    })
+  })
+  return table
+}
+
+const renderMetrics = (container, summary) => {
+  container.innerHTML = ''
+  const histogramRows = []
+  Object.entries(summary.metrics).forEach(([name, values]) => {
+    Object.entries(values).forEach(([labels, stats]) => {
+      if (stats.count === undefined) {
+        return
+      }
+      histogramRows.push([
+        name.replace(/^verzettler_/, ''),
+        labels,
+        stats.count,
+        formatSeconds(stats.mean),
+        formatSeconds(stats.p50),
+        formatSeconds(stats.p99)
+      ])
+    })
+  })
+  const timings = document.createElement('h3')
+  timings.textContent = 'Timings'
+  container.appendChild(timings)
+  container.appendChild(makeTable(
+    ['Metric', 'Labels', 'Count', 'Mean', 'p50 (<=)', 'p99 (<=)'],
+    histogramRows
+  ))
+  const cacheRows = Object.entries(summary.caches).map(([name, stats]) => [
+    name,
+    stats.hits,
+    stats.misses,
+    stats.entries,
+    (100 * stats.hit_rate).toFixed(1) + ' %'
+  ])
+  const caches = document.createElement('h3')
+  caches.textContent = 'Caches'
+  container.appendChild(caches)
+  container.appendChild(makeTable(
+    ['Cache', 'Hits', 'Misses', 'Entries', 'Hit rate'],
+    cacheRows
+  ))
+}
+
+document.addEventListener('DOMContentLoaded', function () {
+  const container = document.getElementById('metrics')
+  if (!container) {
+    return
+  }
+  fetch(container.dataset.url)
+    .then((response) => response.json())
+    .then((summary) => renderMetrics(container, summary))
+    .catch((error) => {
+      container.textContent = 'Failed to load metrics: ' + error
+    })
+})
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+
+"""Boolean queries over tags.
+
+Queries combine tags with ``AND``, ``OR`` and ``NOT`` (or ``&``, ``|``,
+``!``), parentheses group sub expressions and terms that follow each other
+without an operator are combined with ``AND``. A term containing ``*`` matches
+all tags that match it as a glob pattern, e.g. ``c_*`` matches all category
+tags. A leading ``#`` is ignored, so ``#tag1`` is the same as ``tag1``.
+
+The query is evaluated against bitsets (python integers) that have bit ``i``
+set if the note with index ``i`` carries the tag, see
+:meth:`verzettler.zettelkasten.Zettelkasten.query_tags`.
+"""
+
+# std
+import re
+import fnmatch
+from functools import lru_cache
+from typing import List, Tuple, Dict
+
+# ours
+from verzettler.metrics import registry
+
+_token_regex = re.compile(r"\s*([()&|!]|[^\s()&|!]+)")
+
+_operators = {
+    "and": "and",
+    "&": "and",
+    "or": "or",
+    "|": "or",
+    "not": "not",
+    "!": "not",
+}
+
+
+def tokenize(query: str) -> List[str]:
+    """
+    >>> tokenize("(a OR b)&!c_*")
+    ['(', 'a', 'OR', 'b', ')', '&', '!', 'c_*']
+    """
+    tokens = []
+    pos = 0
+    query = query.strip()
+    while pos < len(query):
+        match = _token_regex.match(query, pos)
+        tokens.append(match.group(1))
+        pos = match.end()
+    return tokens
+
+
+class _Parser(object):
+    """Recursive descent parser, operator precedence NOT > AND > OR"""
+
+    def __init__(self, query: str):
+        self.query = query
+        self.tokens = tokenize(query)
+        self.pos = 0
+
+    def _peek_operator(self):
+        if self.pos >= len(self.tokens):
+            return None
+        return _operators.get(self.tokens[self.pos].lower())
+
+    def _error(self, msg: str):
+        return ValueError(f"Invalid tag query '{self.query}': {msg}")
+
+    def parse(self) -> Tuple:
+        if not self.tokens:
+            raise self._error("Empty query")
+        tree = self._parse_or()
+        if self.pos < len(self.tokens):
+            raise self._error(f"Unexpected '{self.tokens[self.pos]}'")
+        return tree
+
+    def _parse_or(self) -> Tuple:
+        tree = self._parse_and()
+        while self._peek_operator() == "or":
+            self.pos += 1
+            tree = ("or", tree, self._parse_and())
+        return tree
+
+    def _parse_and(self) -> Tuple:
+        tree = self._parse_not()
+        while self.pos < len(self.tokens):
+            operator = self._peek_operator()
+            if operator == "and":
+                self.pos += 1
+            elif operator == "or" or self.tokens[self.pos] == ")":
+                break
+            tree = ("and", tree, self._parse_not())
+        return tree
+
+    def _parse_not(self) -> Tuple:
+        if self._peek_operator() == "not":
+            self.pos += 1
+            return ("not", self._parse_not())
+        return self._parse_atom()
+
+    def _parse_atom(self) -> Tuple:
+        if self.pos >= len(self.tokens):
+            raise self._error("Unexpected end of query")
+        token = self.tokens[self.pos]
+        self.pos += 1
+        if token == "(":
+            tree = self._parse_or()
+            if self.pos >= len(self.tokens) or self.tokens[self.pos] != ")":
+                raise self._error("Missing ')'")
+            self.pos += 1
+            return tree
+        if token == ")" or token.lower() in _operators:
+            raise self._error(f"Unexpected '{token}'")
+        tag = token[1:] if token.startswith("#") else token
+        if not tag:
+            raise self._error("Empty tag")
+        if "*" in tag:
+            return ("glob", tag)
+        return ("tag", tag)
+
+
+@lru_cache(maxsize=1000)
+def parse(query: str) -> Tuple:
+    """Parse query into a tree of tuples.
+
+    >>> parse("a b OR NOT c_*")
+    ('or', ('and', ('tag', 'a'), ('tag', 'b')), ('not', ('glob', 'c_*')))
+
+    Raises:
+        ValueError if the query is invalid
+    """
+    return _Parser(query).parse()
+
+
+registry.register_lru_cache("tag_query", parse, help="Parsed tag queries")
+
+
+def evaluate(query: str, tag2bits: Dict[str, int], all_bits: int) -> int:
+    """Evaluate query against tag bitsets.
+
+    >>> bin(evaluate("a AND NOT b", {"a": 0b011, "b": 0b110}, 0b111))
+    '0b1'
+
+    Args:
+        query: Query string
+        tag2bits: Mapping tag to bitset of the notes carrying it
+        all_bits: Bitset of all notes
+
+    Returns:
+        Bitset of all notes matching the query
+    """
+    return _evaluate(parse(query), tag2bits, all_bits)
+
+
+def _evaluate(tree: Tuple, tag2bits: Dict[str, int], all_bits: int) -> int:
+    kind = tree[0]
+    if kind == "tag":
+        return tag2bits.get(tree[1], 0)
+    elif kind == "glob":
+        regex = re.compile(fnmatch.translate(tree[1]))
+        bits = 0
+        for tag, tag_bits in tag2bits.items():
+            if regex.match(tag):
+                bits |= tag_bits
+        return bits
+    elif kind == "not":
+        return all_bits & ~_evaluate(tree[1], tag2bits, all_bits)
+    elif kind == "and":
+        return _evaluate(tree[1], tag2bits, all_bits) & _evaluate(
+            tree[2], tag2bits, all_bits
+        )
+    elif kind == "or":
+        return _evaluate(tree[1], tag2bits, all_bits) | _evaluate(
+            tree[2], tag2bits, all_bits
+        )
+    raise ValueError(f"Unknown node {tree}")
+
+
+def bits_to_indices(bits: int) -> List[int]:
+    """Indices of all set bits in ascending order.
+
+    >>> bits_to_indices(0b10110)
+    [1, 2, 4]
+    """
+    # Linear in the number of bits (unlike repeatedly clearing the lowest bit)
+    return [i for i, c in enumerate(bin(bits)[:1:-1]) if c == "1"]
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+
+# std
+from unittest import TestCase
+from contextlib import contextmanager
+from pathlib import Path
+import asyncio
+
+# ours
+from verzettler.zettelkasten import Zettelkasten
+from verzettler.note import Note
+from verzettler.note_converter import HtmlConverter, RenderError
+from verzettler.render_cache import RenderCache
+from verzettler.util.concurrency import SnapshotHolder
+from verzettler.asgi import AsyncNoteApp
+from verzettler.bin import zk_server
+
+
+class CountingSnapshotHolder(SnapshotHolder):
+    """Counts the readers"""
+
+    def __init__(self, initial):
+        super().__init__(initial)
+        self.readers = 0
+
+    @contextmanager
+    def read(self):
+        with super().read() as current:
+            self.readers += 1
+            try:
+                yield current
+            finally:
+                self.readers -= 1
+
+
+class RecordingConverter(HtmlConverter):
+    """Records whether the Zettelkasten was read under the lock"""
+
+    def __init__(self, zk, state, **kwargs):
+        super().__init__(zk, **kwargs)
+        self.state = state
+        self.unlocked_reads = []
+        self.fail = False
+
+    def _cache_key(self, note, text):
+        if not self.state.readers:
+            self.unlocked_reads.append("cache key")
+        return super()._cache_key(note, text)
+
+    def preproc_markdown(self, note, text=None):
+        if not self.state.readers:
+            self.unlocked_reads.append("preproc")
+        return super().preproc_markdown(note, text)
+
+    def render(self, note: Note, markdown: str) -> str:
+        if self.fail:
+            raise RenderError("Failed")
+        return f"<p>{note.title}</p>"
+
+
+class TestAsyncNoteApp(TestCase):
+    def setUp(self):
+        zk = Zettelkasten()
+        zk.add_notes_from_directory(
+            Path(__file__).resolve().parent / "playground"
+        )
+        current = zk_server.ServerState(zk)
+        self.state = CountingSnapshotHolder(current)
+        self.converter = RecordingConverter(
+            zk, self.state, self_contained=False, cache=RenderCache()
+        )
+        current.html_converter = self.converter
+        self.app = AsyncNoteApp(zk_server.app, self.state)
+
+    def get(self, path: str, headers=()):
+        scope = {
+            "type": "http",
+            "method": "GET",
+            "path": path,
+            "headers": list(headers),
+        }
+        messages = []
+
+        async def receive():
+            return {"type": "http.request"}
+
+        async def send(message):
+            messages.append(message)
+
+        asyncio.run(self.app(scope, receive, send))
+        start, body = messages
+        return (
+            start["status"],
+            dict(start["headers"]),
+            body["body"].decode("utf-8"),
+        )
+
+    def test_open(self):
+        status, headers, body = self.get("/open/00000000000002")
+        self.assertEqual(200, status)
+        self.assertIn("<p>Some links 1</p>", body)
+        self.assertEqual([], self.converter.unlocked_reads)
+        self.assertEqual(0, self.state.readers)
+        etag = headers[b"etag"]
+        status, _, _ = self.get(
+            "/open/00000000000002", [(b"if-none-match", etag)]
+        )
+        self.assertEqual(304, status)
+        # Served from the render cache
+        self.converter.fail = True
+        status, _, body = self.get("/open/00000000000002")
+        self.assertEqual(200, status)
+        self.assertEqual([], self.converter.unlocked_reads)
+
+    def test_not_found(self):
+        status, _, _ = self.get("/open/99999999999999")
+        self.assertEqual(404, status)
+
+    def test_render_failed(self):
+        self.converter.fail = True
+        status, headers, _ = self.get("/open/00000000000002")
+        self.assertEqual(500, status)
+        self.assertNotIn(b"etag", headers)
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+
+# std
+from unittest import TestCase
+from pathlib import Path
+import os
+import tempfile
+import shutil
+
+# ours
+from verzettler.zettelkasten import Zettelkasten
+from verzettler.clusters import (
+    cluster_graph,
+    expand_cluster,
+    get_clusters,
+    other,
+    uncategorized,
+)
+from verzettler.bin import zk_server
+
+
+class TestClusters(TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self._environ = dict(os.environ)
+        os.environ["ZK_CACHE_DIR"] = self.cache_dir
+        self.zk = Zettelkasten()
+        self.zk.add_notes_from_directory(
+            Path(__file__).resolve().parent / "playground"
+        )
+        self.zk.update_note(
+            "00000000000000",
+            "# Root\n\nTags: #c_a\n\n[[00000000000001]] [[00000000000002]]\n",
+        )
+        self.zk.update_note(
+            "00000000000001", "# One\n\nTags: #c_a #c_b\n\n[[00000000000002]]\n"
+        )
+        self.zk.update_note(
+            "00000000000002",
+            "# Two\n\nTags: #c_b\n\n[[00000000000000]] [[00000000000003]]\n",
+        )
+
+    def tearDown(self):
+        os.environ.clear()
+        os.environ.update(self._environ)
+        shutil.rmtree(self.cache_dir)
+
+    def test_categories(self):
+        clusters = get_clusters(self.zk, "categories")
+        self.assertEqual("c_a", clusters["00000000000000"])
+        # Tie between the categories, the first one is taken
+        self.assertEqual("c_a", clusters["00000000000001"])
+        self.assertEqual("c_b", clusters["00000000000002"])
+        self.assertEqual(uncategorized, clusters["00000000000003"])
+        limited = get_clusters(self.zk, "categories", max_clusters=2)
+        self.assertEqual(2, len(set(limited.values())))
+
+    def test_communities(self):
+        clusters = get_clusters(self.zk, "communities")
+        self.assertEqual({note.nid for note in self.zk.notes}, set(clusters))
+        self.assertEqual(clusters, get_clusters(self.zk, "communities"))
+        with self.assertRaises(ValueError):
+            get_clusters(self.zk, "unknown")
+
+    def test_cluster_graph(self):
+        graph = cluster_graph(self.zk, "categories")
+        nodes = {node["id"]: node for node in graph["nodes"]}
+        self.assertEqual(2, nodes["cluster:c_a"]["size"])
+        self.assertIn("x", nodes["cluster:c_a"])
+        # c_a -> c_b twice (0 -> 2, 1 -> 2), c_b -> c_a once (2 -> 0)
+        self.assertIn(["cluster:c_a", "cluster:c_b", 1, 3], graph["edges"])
+        self.assertIn(
+            ["cluster:c_b", "cluster:uncategorized", 0, 1], graph["edges"]
+        )
+        limited = cluster_graph(self.zk, "categories", max_edges=1)
+        self.assertEqual(
+            [["cluster:c_a", "cluster:c_b", 1, 3]], limited["edges"]
+        )
+
+    def test_expand(self):
+        graph = expand_cluster(self.zk, "categories", "c_b")
+        self.assertEqual(["00000000000002"], [n["id"] for n in graph["nodes"]])
+        self.assertEqual(0, graph["truncated"])
+        self.assertIn(["00000000000002", "cluster:c_a", 1, 3], graph["edges"])
+        graph = expand_cluster(self.zk, "categories", "c_b", expanded=["c_a"])
+        self.assertIn(
+            ["00000000000000", "00000000000002", 1, 2], graph["edges"]
+        )
+        self.assertIn(
+            ["00000000000001", "00000000000002", 0, 1], graph["edges"]
+        )
+        graph = expand_cluster(self.zk, "categories", "c_a", max_nodes=1)
+        self.assertEqual(1, graph["truncated"])
+        with self.assertRaises(KeyError):
+            expand_cluster(self.zk, "categories", "c_unknown")
+
+    def test_server_expand_other(self):
+        old = zk_server.state.current
+        zk_server.state.replace(lambda _: zk_server.ServerState(self.zk))
+        try:
+            client = zk_server.app.test_client()
+            overview = client.get("/api/clusters/categories?max_clusters=2")
+            self.assertEqual(
+                {"cluster:other", "cluster:uncategorized"},
+                {node["id"] for node in overview.get_json()["nodes"]},
+            )
+            response = client.get(
+                f"/api/clusters/categories/{other}?max_clusters=2"
+            )
+            self.assertEqual(200, response.status_code)
+            self.assertEqual(
+                {"00000000000000", "00000000000001", "00000000000002"},
+                {node["id"] for node in response.get_json()["nodes"]},
+            )
+            # No such cluster with the default number of clusters
+            response = client.get(f"/api/clusters/categories/{other}")
+            self.assertEqual(404, response.status_code)
+            response = client.get(
+                f"/api/clusters/categories/{other}?max_clusters=0"
+            )
+            self.assertEqual(400, response.status_code)
+        finally:
+            zk_server.state.replace(lambda _: old)
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+
+# std
+from unittest import TestCase
+from pathlib import Path
+import gzip
+import tempfile
+import shutil
+
+# 3rd
+from flask import Flask, make_response, request
+
+# ours
+from verzettler.compression import Compression
+
+
+class TestCompression(TestCase):
+    def setUp(self):
+        self.static = Path(tempfile.mkdtemp())
+        (self.static / "a.js").write_text("var a = 1;\n" * 100)
+        app = Flask(
+            __name__, static_folder=str(self.static), static_url_path="/static"
+        )
+        self.compression = Compression(static_directory=self.static)
+        self.compression.init_app(app)
+
+        @app.route("/page")
+        def page():
+            if "etag" in request.if_none_match:
+                response = make_response("", 304)
+                response.set_etag("etag")
+                return response
+            response = make_response("<p>Hello</p>\n" * 100)
+            response.set_etag("etag")
+            return response
+
+        @app.route("/small")
+        def small():
+            return "<p>Hello</p>"
+
+        self.client = app.test_client()
+
+    def tearDown(self):
+        shutil.rmtree(str(self.static))
+
+    def test_dynamic(self):
+        response = self.client.get("/page", headers={"Accept-Encoding": "gzip"})
+        self.assertEqual("gzip", response.headers["Content-Encoding"])
+        self.assertEqual(
+            "<p>Hello</p>\n" * 100, gzip.decompress(response.data).decode()
+        )
+        self.assertEqual(("etag-gzip", False), response.get_etag())
+        response = self.client.get(
+            "/page",
+            headers={"Accept-Encoding": "gzip", "If-None-Match": '"etag-gzip"'},
+        )
+        self.assertEqual(304, response.status_code)
+        self.assertEqual(("etag-gzip", False), response.get_etag())
+        response = self.client.get("/page")
+        self.assertNotIn("Content-Encoding", response.headers)
+        self.assertEqual("Accept-Encoding", response.headers["Vary"])
+
+    def test_small(self):
+        response = self.client.get(
+            "/small", headers={"Accept-Encoding": "gzip"}
+        )
+        self.assertNotIn("Content-Encoding", response.headers)
+
+    def test_static(self):
+        self.assertEqual(1, self.compression.precompress_static())
+        response = self.client.get(
+            "/static/a.js", headers={"Accept-Encoding": "gzip"}
+        )
+        self.assertEqual("gzip", response.headers["Content-Encoding"])
+        self.assertEqual(
+            "var a = 1;\n" * 100, gzip.decompress(response.data).decode()
+        )
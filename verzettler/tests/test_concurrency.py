@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+
+# std
+from unittest import TestCase
+import threading
+import time
+
+# ours
+from verzettler.util.concurrency import RWLock, SnapshotHolder
+
+
+class TestRWLock(TestCase):
+    def test_readers_share_writer_excludes(self):
+        lock = RWLock()
+        events = []
+
+        def write():
+            with lock.write():
+                events.append("w")
+
+        with lock.read():
+            # A second reader doesn't block
+            with lock.read():
+                pass
+            writer = threading.Thread(target=write)
+            writer.start()
+            time.sleep(0.05)
+            # Writer waits for the reader
+            self.assertEqual([], events)
+        writer.join(timeout=5)
+        self.assertEqual(["w"], events)
+
+
+class TestSnapshotHolder(TestCase):
+    def test_replace(self):
+        holder = SnapshotHolder({"a": 1})
+        with holder.read() as snapshot:
+            # Replacing doesn't wait for readers, which keep their snapshot
+            new = holder.replace(lambda old: dict(old, a=2))
+            self.assertEqual(1, snapshot["a"])
+        self.assertIs(new, holder.current)
+        with holder.read() as snapshot:
+            self.assertEqual(2, snapshot["a"])
+
+    def test_modify(self):
+        holder = SnapshotHolder([])
+
+        def append(i):
+            with holder.modify() as snapshot:
+                n = len(snapshot)
+                time.sleep(0.001)
+                snapshot.append(n)
+
+        threads = [
+            threading.Thread(target=append, args=(i,)) for i in range(20)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(list(range(20)), holder.current)
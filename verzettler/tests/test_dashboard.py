@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+
+# std
+from unittest import TestCase
+from unittest import mock
+from pathlib import Path
+import threading
+import time
+
+# ours
+from verzettler.zettelkasten import Zettelkasten
+from verzettler.dashboard import DashboardCache, compute_dashboard
+from verzettler.util.concurrency import SnapshotHolder
+
+
+class TestDashboardCache(TestCase):
+    def setUp(self):
+        playground = Path(__file__).resolve().parent / "playground"
+        self.zk = Zettelkasten()
+        self.zk.add_notes_from_directory(playground)
+
+    def wait_for(self, cache: DashboardCache):
+        for _ in range(300):
+            cached = cache.get(self.zk)
+            if cached is not None and not cached[1]:
+                return cached
+            time.sleep(0.05)
+        self.fail("Dashboard was not computed")
+
+    def test_background_refresh(self):
+        cache = DashboardCache()
+        version, outdated, dashboard = self.wait_for(cache)
+        self.assertEqual(self.zk.version, version)
+        self.assertEqual(4, len(dashboard["divs"]))
+        self.zk.reload_note("00000000000002")
+        # Old dashboard is still served while recomputing
+        cached = cache.get(self.zk)
+        self.assertEqual(version, cached[0])
+        self.assertTrue(cached[1])
+        self.assertEqual(self.zk.version, self.wait_for(cache)[0])
+
+    def test_lock_not_held_while_computing(self):
+        holder = SnapshotHolder(self.zk)
+        started = threading.Event()
+        release = threading.Event()
+        versions = []
+
+        def slow_compute(zk):
+            versions.append(zk.version)
+            started.set()
+            release.wait(timeout=10)
+            return compute_dashboard(zk)
+
+        cache = DashboardCache(read_lock=holder.read)
+        with mock.patch("verzettler.dashboard.compute_dashboard", slow_compute):
+            cache.refresh(self.zk)
+            self.assertTrue(started.wait(timeout=10))
+            # Modifying doesn't wait for the dashboard
+            with holder.modify() as zk:
+                zk.update_note("00000000000006", "# New title\n")
+            release.set()
+            version, outdated, _ = self.wait_for(cache)
+        self.assertEqual(self.zk.version, version)
+        # The dashboard of the old version was discarded
+        self.assertEqual(2, len(versions))
+        self.assertEqual(self.zk.version, versions[1])
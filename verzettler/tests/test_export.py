@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+
+# std
+from unittest import TestCase
+from pathlib import Path
+import os
+import tempfile
+import shutil
+import time
+
+# ours
+from verzettler.zettelkasten import Zettelkasten
+from verzettler.note_graph import note_environment
+from verzettler.util.write import WriteSummary
+from verzettler.bin.zk_export import export, get_dependencies, output_name
+
+
+class TestExport(TestCase):
+    def setUp(self):
+        self.tmpdir = Path(tempfile.mkdtemp())
+        self.notes_dir = self.tmpdir / "notes"
+        shutil.copytree(
+            str(Path(__file__).resolve().parent / "playground"),
+            str(self.notes_dir),
+        )
+        self.zk = self._load()
+
+    def tearDown(self):
+        shutil.rmtree(str(self.tmpdir))
+
+    def _load(self) -> Zettelkasten:
+        zk = Zettelkasten()
+        zk.add_notes_from_directory(self.notes_dir)
+        return zk
+
+    def _export(self, output_dir: Path, **kwargs) -> int:
+        return export(self.zk, output_dir, renderer="markdown", **kwargs)
+
+    def _pages(self, output_dir: Path):
+        return {
+            path.name: path.read_text()
+            for path in output_dir.iterdir()
+            if path.suffix == ".html"
+        }
+
+    def test_parallel_like_serial(self):
+        serial = self.tmpdir / "serial"
+        parallel = self.tmpdir / "parallel"
+        self.assertEqual(len(self.zk), self._export(serial, processes=1))
+        self.assertEqual(len(self.zk), self._export(parallel, processes=2))
+        pages = self._pages(serial)
+        self.assertEqual(len(self.zk) + 1, len(pages))
+        self.assertEqual(pages, self._pages(parallel))
+        self.assertIn(
+            'href="00000000000003.html"', pages["00000000000002.html"]
+        )
+        self.assertEqual([], list(parallel.glob(".*.tmp")))
+
+    def test_incremental(self):
+        output_dir = self.tmpdir / "site"
+        past = time.time() - 20
+        for note in self.zk.notes:
+            os.utime(str(note.path), (past, past))
+        summary = WriteSummary()
+        self._export(output_dir, processes=2, summary=summary)
+        self.assertEqual(len(self.zk), summary.changed)
+        self.assertEqual(0, self._export(output_dir, processes=2))
+
+        edited = self.zk["00000000000003"]
+        # The pages are older than the edit, however coarse the mtimes are
+        past = time.time() - 10
+        for path in output_dir.iterdir():
+            os.utime(str(path), (past, past))
+        edited.path.write_text(
+            edited.path.read_text().replace(edited.title, "Retitled", 1)
+        )
+        self.zk = self._load()
+        dependents = {
+            note.nid
+            for note in self.zk.notes
+            if edited.path in get_dependencies(self.zk, note, with_graph=True)
+        }
+        self.assertIn("00000000000002", dependents)
+        summary = WriteSummary()
+        self.assertEqual(
+            len(dependents),
+            self._export(output_dir, processes=2, summary=summary),
+        )
+        self.assertEqual(len(dependents), summary.changed + summary.unchanged)
+        self.assertIn(
+            "Retitled",
+            (output_dir / output_name("00000000000002")).read_text(),
+        )
+        self.assertEqual(0, self._export(output_dir, processes=2))
+
+    def test_graph_dependencies(self):
+        note = self.zk["00000000000002"]
+        paths = set(get_dependencies(self.zk, note, with_graph=True))
+        environment = note_environment(self.zk, note.nid)
+        for members in environment.values():
+            for nid in members:
+                self.assertIn(self.zk[nid].path, paths)
+        self.assertLessEqual(
+            set(get_dependencies(self.zk, note)),
+            paths,
+        )
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+
+# std
+from unittest import TestCase
+from pathlib import Path
+import tempfile
+import shutil
+import json
+
+# 3rd
+import networkx as nx
+
+# ours
+from verzettler.zettelkasten import Zettelkasten
+from verzettler.dotgraphgenerator import DotGraphGenerator
+from verzettler.graph_export import export_graph
+
+
+def _read_node_link(path: Path) -> nx.DiGraph:
+    data = json.loads(path.read_text(encoding="utf-8"))
+    g = nx.DiGraph()
+    for node in data["nodes"]:
+        g.add_node(node["id"], **node)
+    g.add_edges_from((link["source"], link["target"]) for link in data["links"])
+    return g
+
+
+class TestGraphExport(TestCase):
+    def setUp(self):
+        self.tmpdir = Path(tempfile.mkdtemp())
+        self.zk = Zettelkasten()
+        self.zk.add_notes_from_directory(
+            Path(__file__).resolve().parent / "playground"
+        )
+        # Links in both directions, a repeated link and special characters
+        self.zk.update_note(
+            "00000000000003",
+            '# Target <for> "links" & more\n\n'
+            "[[00000000000002]] [[00000000000002]]\n",
+        )
+        self.links = {
+            (note.nid, link)
+            for note in self.zk.notes
+            for link in note.links
+            if link in self.zk
+        }
+
+    def tearDown(self):
+        shutil.rmtree(str(self.tmpdir))
+
+    def test_dot(self):
+        dot = DotGraphGenerator(self.zk).graph_from_notes(
+            [note.nid for note in self.zk.notes]
+        )
+        self.assertEqual(
+            1,
+            dot.count(
+                '00000000000002 -> 00000000000003 [color="black" dir="both"]'
+            ),
+        )
+        self.assertNotIn("00000000000003 -> 00000000000002", dot)
+        self.assertIn(r'label="Target <for> \"links\" & more"', dot)
+        # Only links between the given notes
+        dot = DotGraphGenerator(self.zk).graph_from_notes(
+            ["00000000000002", "00000000000004"]
+        )
+        self.assertEqual(1, dot.count("->"))
+
+    def test_dot_writer(self):
+        path = self.tmpdir / "graph.dot"
+        export_graph(self.zk, path, url="http://example.com/{nid}")
+        dot = path.read_text(encoding="utf-8")
+        self.assertIn('labelURL="http://example.com/00000000000003"', dot)
+        self.assertNotIn("127.0.0.1", dot)
+        edges = [line for line in dot.splitlines() if "->" in line]
+        self.assertEqual(len(edges), len(set(edges)))
+        self.assertIn(
+            '\t00000000000002 -> 00000000000003 [color="black" dir="both"];',
+            edges,
+        )
+        self.assertEqual(len(self.links) - 1, len(edges))
+
+    def test_json_header(self):
+        path = self.tmpdir / "graph.json"
+        export_graph(self.zk, path)
+        data = json.loads(path.read_text(encoding="utf-8"))
+        self.assertEqual(
+            {"directed": True, "multigraph": False, "graph": {}},
+            {k: data[k] for k in ("directed", "multigraph", "graph")},
+        )
+
+    def test_formats(self):
+        readers = {
+            ".graphml": nx.read_graphml,
+            ".gexf": nx.read_gexf,
+            ".json": _read_node_link,
+        }
+        for suffix, reader in readers.items():
+            with self.subTest(suffix=suffix):
+                path = self.tmpdir / f"graph{suffix}"
+                export_graph(self.zk, path)
+                g = reader(path)
+                self.assertEqual(
+                    {note.nid for note in self.zk.notes}, set(g.nodes)
+                )
+                self.assertEqual(self.links, set(g.edges))
+                self.assertEqual(len(self.links), g.number_of_edges())
+                self.assertEqual(
+                    'Target <for> "links" & more',
+                    g.nodes["00000000000003"]["label"],
+                )
+
+    def test_unsupported(self):
+        with self.assertRaises(ValueError):
+            export_graph(self.zk, self.tmpdir / "graph.txt")
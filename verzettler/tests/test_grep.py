@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+
+# std
+from unittest import TestCase
+from unittest import mock
+from pathlib import Path
+import contextlib
+import io
+import re
+import sys
+
+# ours
+from verzettler.grep import grep, grep_file
+from verzettler.zettelkasten import Zettelkasten
+from verzettler.bin import zk_grep
+from verzettler.bin import zk_server
+
+
+class TestGrep(TestCase):
+    def setUp(self):
+        self.playground = Path(__file__).resolve().parent / "playground"
+        self.paths = sorted(self.playground.glob("*.md"))
+
+    def test_grep_file(self):
+        path = self.playground / "00000000000002_links_01.md"
+        self.assertEqual(
+            [(13, "[[00000000000004]]")], grep_file(path, r"\[\[0+4\]\]")
+        )
+        self.assertEqual([], grep_file(path, "^nam eget"))
+        self.assertEqual(
+            [3], [m[0] for m in grep_file(path, "^nam eget", re.IGNORECASE)]
+        )
+
+    def _grep(self, **kwargs):
+        return sorted(
+            (m.nid, m.lineno, m.line)
+            for m in grep(self.paths, r"\[\[00000000000003\]\]", **kwargs)
+        )
+
+    def test_grep(self):
+        matches = self._grep(processes=1)
+        self.assertIn(
+            ("00000000000002", 14, "[[00000000000003]]"),
+            matches,
+        )
+        self.assertEqual(
+            {"00000000000000", "00000000000002"}, {m[0] for m in matches}
+        )
+
+    def test_grep_pool(self):
+        self.assertEqual(self._grep(processes=1), self._grep(processes=2))
+        self.assertEqual(
+            self._grep(processes=1),
+            self._grep(processes=2, start_method="spawn"),
+        )
+
+    def test_invalid_pattern(self):
+        with self.assertRaises(re.error):
+            grep(self.paths, "(", processes=2)
+
+    def test_removed_file(self):
+        matches = list(grep([self.playground / "missing.md"], ".", processes=1))
+        self.assertEqual([], matches)
+
+
+class TestZkGrep(TestCase):
+    def _run(self, *args):
+        playground = Path(__file__).resolve().parent / "playground"
+        argv = ["zk_grep", "-i", str(playground), "--no-cache", "-j", "1"]
+        out = io.StringIO()
+        with mock.patch.object(sys, "argv", argv + list(args)):
+            with contextlib.redirect_stdout(out):
+                zk_grep.cli()
+        return out.getvalue()
+
+    def test_cli(self):
+        out = self._run("SOME LINKS 1")
+        self.assertIn("00000000000002_links_01.md", out)
+        self.assertIn("# Some links 1", out)
+        self.assertEqual("", self._run("-s", "SOME LINKS 1"))
+
+    def test_invalid_pattern(self):
+        with self.assertRaises(SystemExit):
+            self._run("(")
+
+
+class TestServerGrep(TestCase):
+    def setUp(self):
+        zk = Zettelkasten()
+        zk.add_notes_from_directory(
+            Path(__file__).resolve().parent / "playground"
+        )
+        self.old = zk_server.state.current
+        zk_server.state.replace(lambda _: zk_server.ServerState(zk))
+        self.client = zk_server.app.test_client()
+
+    def tearDown(self):
+        zk_server.state.replace(lambda _: self.old)
+
+    def test_grep(self):
+        response = self.client.get("/grep/some links")
+        self.assertEqual(200, response.status_code)
+        page = response.get_data(as_text=True)
+        self.assertIn('<a href="/open/00000000000002">Some links 1</a>', page)
+        self.assertIn("<p>1 matches.</p>", page)
+
+    def test_invalid_pattern(self):
+        response = self.client.get("/grep/(")
+        self.assertIn("Invalid regular expression", response.get_data(True))
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+
+# std
+from unittest import TestCase
+from pathlib import Path
+import tempfile
+import shutil
+import time
+
+# 3rd
+import numpy as np
+
+# ours
+from verzettler.layout import (
+    force_layout,
+    graph_fingerprint,
+    layout_notes,
+    layout_zettelkasten,
+    pivot_mds,
+)
+from verzettler.zettelkasten import Zettelkasten
+
+
+def _grid_edges(side: int) -> np.ndarray:
+    edges = []
+    for i in range(side):
+        for j in range(side):
+            if i + 1 < side:
+                edges.append((i * side + j, (i + 1) * side + j))
+            if j + 1 < side:
+                edges.append((i * side + j, i * side + j + 1))
+    return np.array(edges)
+
+
+class TestForceLayout(TestCase):
+    def test_empty(self):
+        self.assertEqual((0, 2), force_layout(0, np.zeros((0, 2))).shape)
+        pos = force_layout(3, np.zeros((0, 2)))
+        self.assertEqual((3, 2), pos.shape)
+        self.assertTrue(np.all(np.isfinite(pos)))
+
+    def test_deterministic(self):
+        edges = _grid_edges(5)
+        np.testing.assert_array_equal(
+            force_layout(25, edges, iterations=20),
+            force_layout(25, edges, iterations=20),
+        )
+
+    def test_grid(self):
+        side = 10
+        pos = force_layout(side**2, _grid_edges(side), iterations=50)
+        edges = _grid_edges(side)
+        linked = np.linalg.norm(pos[edges[:, 0]] - pos[edges[:, 1]], axis=1)
+        # Opposite corners are much further apart than linked nodes
+        corners = np.linalg.norm(pos[0] - pos[-1])
+        self.assertGreater(corners, 5 * np.median(linked))
+        # No nodes on top of each other
+        distances = np.linalg.norm(pos[:, None] - pos[None, :], axis=2)
+        np.fill_diagonal(distances, np.inf)
+        self.assertGreater(distances.min(), 0.1 * np.median(linked))
+
+    def test_pivot_mds_components(self):
+        pos = pivot_mds(4, np.array([[0, 1], [2, 3]]))
+        self.assertTrue(np.all(np.isfinite(pos)))
+
+
+class TestLayoutNotes(TestCase):
+    def setUp(self):
+        self.tmpdir = Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        shutil.rmtree(str(self.tmpdir))
+
+    def test_cache(self):
+        nids = ["a", "b", "c"]
+        edges = [("a", "b"), ("b", "c"), ("c", "unknown")]
+        positions = layout_notes(nids, edges, cache_dir=self.tmpdir)
+        self.assertEqual(set(nids), set(positions))
+        (cache_path,) = self.tmpdir.iterdir()
+        cache_path.write_text('{"a": [1, 2]}')
+        self.assertEqual(
+            {"a": (1, 2)}, layout_notes(nids, edges, cache_dir=self.tmpdir)
+        )
+        # Different graph or parameters: Not cached
+        self.assertEqual(
+            set(nids),
+            set(layout_notes(nids, edges[:1], cache_dir=self.tmpdir)),
+        )
+        layout_notes(nids, edges, iterations=5, cache_dir=self.tmpdir)
+        self.assertEqual(3, len(list(self.tmpdir.iterdir())))
+
+    def test_cache_pruned(self):
+        nids = ["a", "b", "c"]
+        graphs = [[("a", "b")], [("b", "c")], [("a", "c")]]
+
+        def layout(edges):
+            layout_notes(nids, edges, cache_dir=self.tmpdir, max_cached=2)
+            # File times might have a coarse resolution
+            time.sleep(0.02)
+
+        def cached(edges) -> bool:
+            fingerprint = graph_fingerprint(
+                nids, edges, iterations=100, scale=30.0
+            )
+            return (self.tmpdir / f"{fingerprint}.json").is_file()
+
+        layout(graphs[0])
+        layout(graphs[1])
+        # Used again, so it's kept over the second one
+        layout(graphs[0])
+        layout(graphs[2])
+        self.assertEqual(2, len(list(self.tmpdir.iterdir())))
+        self.assertTrue(cached(graphs[0]))
+        self.assertFalse(cached(graphs[1]))
+        self.assertTrue(cached(graphs[2]))
+
+    def test_zettelkasten(self):
+        zk = Zettelkasten()
+        zk.add_notes_from_directory(
+            Path(__file__).resolve().parent / "playground"
+        )
+        positions = layout_zettelkasten(zk, cache_dir=self.tmpdir)
+        self.assertEqual({note.nid for note in zk.notes}, set(positions))
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+
+# std
+from unittest import TestCase
+from functools import lru_cache
+
+# ours
+from verzettler.metrics import Registry, Counter, Histogram
+
+
+class TestMetrics(TestCase):
+    def setUp(self):
+        self.registry = Registry()
+        self.counter = Counter(
+            "requests_total",
+            "Requests",
+            labels=["route"],
+            registry=self.registry,
+        )
+        self.histogram = Histogram(
+            "duration_seconds",
+            "Durations",
+            buckets=[0.1, 1.0],
+            registry=self.registry,
+        )
+
+    def test_counter(self):
+        self.counter.inc(route="/a")
+        self.counter.inc(2, route="/a")
+        self.assertEqual(self.counter.value(route="/a"), 3.0)
+        self.assertEqual(self.counter.value(route="/b"), 0.0)
+        with self.assertRaises(ValueError):
+            self.counter.inc(path="/a")
+
+    def test_histogram(self):
+        for value in [0.05, 0.5, 0.5, 5.0]:
+            self.histogram.observe(value)
+        self.assertEqual(self.histogram.count(), 4)
+        self.assertAlmostEqual(self.histogram.sum(), 6.05)
+        summary = self.histogram.summary()["total"]
+        self.assertEqual(summary["p50"], 1.0)
+        # Above the largest bucket
+        self.assertIsNone(summary["p99"])
+
+    def test_histogram_time(self):
+        with self.histogram.time():
+            pass
+        self.assertEqual(self.histogram.count(), 1)
+
+    def test_prometheus(self):
+        self.counter.inc(route="/a")
+        self.histogram.observe(0.5)
+        self.histogram.observe(0.05)
+        text = self.registry.render_prometheus()
+        self.assertIn("# TYPE requests_total counter", text)
+        self.assertIn('requests_total{route="/a"} 1.0', text)
+        self.assertIn('duration_seconds_bucket{le="0.1"} 1', text)
+        self.assertIn('duration_seconds_bucket{le="1.0"} 2', text)
+        self.assertIn('duration_seconds_bucket{le="+Inf"} 2', text)
+        self.assertIn("duration_seconds_count 2", text)
+
+    def test_duplicate(self):
+        with self.assertRaises(ValueError):
+            Counter("requests_total", registry=self.registry)
+
+    def test_lru_cache(self):
+        @lru_cache(maxsize=10)
+        def square(x):
+            return x * x
+
+        self.registry.register_lru_cache("square", square)
+        square(2)
+        square(2)
+        square(3)
+        stats = self.registry.cache_stats()["square"]
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["misses"], 2)
+        self.assertEqual(stats["entries"], 2)
+        self.assertAlmostEqual(stats["hit_rate"], 1 / 3)
+        self.assertIn(
+            'verzettler_cache_hits_total{cache="square"} 1.0',
+            self.registry.render_prometheus(),
+        )
+
+    def test_reset(self):
+        self.counter.inc(route="/a")
+        self.registry.reset()
+        self.assertEqual(self.counter.value(route="/a"), 0.0)
+        self.assertIn("requests_total", self.registry.summary()["metrics"])
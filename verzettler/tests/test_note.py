@@ -5,6 +5,7 @@ from unittest import TestCase
 from pathlib import Path
 from typing import Dict, List
 import re
+import pickle
 
 # ours
 from verzettler.note import Note
@@ -82,3 +83,23 @@ class TestNote(TestCase):
     def test_get_title(self):
         n = self.get_note_by_fname("00000000000006_title.md")
         self.assertEqual("This is a title", n.title)
+
+    def test_init_from_text(self):
+        path = self.playground / "00000000000006_title.md"
+        n = Note(path, text=path.read_text())
+        self.assertEqual("This is a title", n.title)
+        n = Note(
+            path, text="# Other title\r\n\r\nTags: #a\r\n[[00000000000001]]"
+        )
+        self.assertEqual("Other title", n.title)
+        self.assertEqual({"a"}, n.tags)
+        self.assertEqual(["00000000000001"], n.links)
+
+    def test_pickle(self):
+        n = Note(self.playground / "00000000000001_tags.md")
+        n.zettelkasten = object()
+        copy = pickle.loads(pickle.dumps(n))
+        self.assertEqual(
+            (n.nid, n.title, n.tags), (copy.nid, copy.title, copy.tags)
+        )
+        self.assertFalse(hasattr(copy, "zettelkasten"))
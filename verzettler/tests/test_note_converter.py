@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+
+# std
+from unittest import TestCase, skipIf
+from pathlib import Path
+import importlib.util
+import shutil
+import tempfile
+
+# ours
+from verzettler.zettelkasten import Zettelkasten
+from verzettler.note import Note
+from verzettler.note_converter import (
+    HtmlConverter,
+    PandocConverter,
+    PythonMarkdownConverter,
+    RenderError,
+)
+from verzettler.render_cache import RenderCache
+from verzettler.util.write import WriteSummary
+from verzettler.bin import zk_server
+
+
+class TestHtmlConverter(TestCase):
+    def setUp(self):
+        playground = Path(__file__).resolve().parent / "playground"
+        self.zk = Zettelkasten()
+        self.zk.add_notes_from_directory(playground)
+        self.note = self.zk["00000000000002"]
+        self.converter = PandocConverter(
+            self.zk, self_contained=False, edit_links=False
+        )
+
+    def preproc(self, line: str) -> str:
+        return self.converter.preproc_markdown(
+            self.note, "# Title\n" + line + "\n"
+        ).strip()
+
+    def test_preproc_id_links(self):
+        title = self.zk["00000000000004"].title
+        self.assertEqual(
+            f"* [{title}](/open/00000000000004)",
+            self.preproc(
+                '* [[00000000000004]] [Old](00000000000004_x.md "autogen")'
+            ),
+        )
+        self.assertEqual(
+            "[[99999999999999]]", self.preproc("[[99999999999999]]")
+        )
+
+    def test_preproc_external_links(self):
+        self.assertEqual(
+            'See <a href="https://a.org/x" class="external">https://a.org/x</a> '
+            'and <a href="https://a.org/y" class="external">y</a>',
+            self.preproc("See https://a.org/x and [y](https://a.org/y)"),
+        )
+        # Links to notes are not external
+        self.assertEqual("[z](z.md)", self.preproc("[z](z.md)"))
+
+    def test_preproc_pictures(self):
+        directory = self.note.path.resolve().parent
+        self.assertEqual(
+            f'![a](/assets{directory}/img/a.png "t")',
+            self.preproc('![a](img/a.png "t")'),
+        )
+        self.assertEqual(
+            "![a](https://a.org/a.png)",
+            self.preproc("![a](https://a.org/a.png)"),
+        )
+
+    def test_preproc_code_block(self):
+        self.assertEqual(
+            "```\n[[00000000000004]] https://a.org\n```",
+            self.preproc("```\n[[00000000000004]] https://a.org\n```"),
+        )
+
+
+@skipIf(shutil.which("pandoc") is None, "pandoc not installed")
+class TestPandocConvertMany(TestCase):
+    def setUp(self):
+        playground = Path(__file__).resolve().parent / "playground"
+        self.zk = Zettelkasten()
+        self.zk.add_notes_from_directory(playground)
+        self.converter = PandocConverter(
+            self.zk, self_contained=False, edit_links=False
+        )
+
+    def test_convert_many(self):
+        # Not in the order of the Zettelkasten
+        notes = sorted(self.zk.notes, key=lambda note: note.title)
+        expected = [self.converter.convert(note) for note in notes]
+        for max_workers in (1, 4):
+            with self.subTest(max_workers=max_workers):
+                results = list(
+                    self.converter.convert_many(notes, max_workers=max_workers)
+                )
+                self.assertEqual(notes, [note for note, _ in results])
+                self.assertEqual(expected, [out for _, out in results])
+
+
+@skipIf(importlib.util.find_spec("markdown") is None, "markdown not installed")
+class TestPythonMarkdownConverter(TestCase):
+    def setUp(self):
+        playground = Path(__file__).resolve().parent / "playground"
+        self.zk = Zettelkasten()
+        self.zk.add_notes_from_directory(playground)
+        self.note = self.zk["00000000000002"]
+        self.converter = PythonMarkdownConverter(
+            self.zk, self_contained=False, edit_links=False
+        )
+
+    def convert(self, text: str) -> str:
+        return self.converter.convert(self.note, text="# Title\n\n" + text)
+
+    def test_math(self):
+        converted = self.convert("Inline $a_1 * b_2 < c$ and\n\n$$x^*_i$$\n")
+        self.assertIn(
+            r'<span class="math inline">\(a_1 * b_2 &lt; c\)</span>', converted
+        )
+        self.assertIn(r'<span class="math display">\[x^*_i\]</span>', converted)
+        self.assertNotIn("<em>", converted)
+        self.assertNotIn("placeholder", converted)
+
+    def test_math_in_code(self):
+        converted = self.convert("`$a_1$`\n\n```\n$$x$$\n```\n")
+        self.assertIn("<code>$a_1$</code>", converted)
+        self.assertIn("$$x$$", converted)
+        self.assertNotIn("math", converted)
+
+    def test_code_highlighting(self):
+        converted = self.convert("```python\ndef f():\n    pass\n```\n")
+        self.assertIn('class="codehilite"', converted)
+        # Inline styles of pygments
+        self.assertIn('<span style="', converted)
+        self.assertIn("def", converted)
+
+    def test_links(self):
+        title = self.zk["00000000000004"].title
+        converted = self.convert(
+            '* [[00000000000004]] [Old](00000000000004_x.md "autogen")\n'
+            "* https://a.org/x\n"
+        )
+        self.assertIn(f'<a href="/open/00000000000004">{title}</a>', converted)
+        self.assertIn(
+            '<a href="https://a.org/x" class="external">https://a.org/x</a>',
+            converted,
+        )
+        self.assertNotIn("autogen", converted)
+
+
+class FailingConverter(HtmlConverter):
+    def render(self, note: Note, markdown: str) -> str:
+        raise RenderError(f"Failed to render {note.path}")
+
+
+class TestRenderError(TestCase):
+    def setUp(self):
+        playground = Path(__file__).resolve().parent / "playground"
+        self.zk = Zettelkasten()
+        self.zk.add_notes_from_directory(playground)
+        self.note = self.zk["00000000000002"]
+        self.cache = RenderCache()
+        self.converter = FailingConverter(self.zk, cache=self.cache)
+        self.tmpdir = Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        shutil.rmtree(str(self.tmpdir))
+
+    def test_convert(self):
+        with self.assertRaises(RenderError):
+            self.converter.convert(self.note)
+        self.assertEqual(0, len(self.cache))
+
+    def test_convert_write(self):
+        summary = WriteSummary()
+        path = self.tmpdir / "out.html"
+        self.assertFalse(
+            self.converter.convert_write(self.note, path, summary=summary)
+        )
+        self.assertFalse(path.exists())
+        self.assertEqual(1, summary.failed)
+
+    def test_apply_converter(self):
+        summary = self.zk.apply_converter(self.converter, self.tmpdir)
+        self.assertEqual(len(self.zk), summary.failed)
+        self.assertEqual([], list(self.tmpdir.iterdir()))
+
+    def test_server(self):
+        current = zk_server.ServerState(self.zk)
+        current.html_converter = self.converter
+        old = zk_server.state.current
+        zk_server.state.replace(lambda _: current)
+        try:
+            response = zk_server.app.test_client().get("/open/00000000000002")
+        finally:
+            zk_server.state.replace(lambda _: old)
+        self.assertEqual(500, response.status_code)
+        self.assertIsNone(response.headers.get("ETag"))
+        self.assertIn("no-store", response.headers["Cache-Control"])
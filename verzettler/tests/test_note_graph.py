@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+
+# std
+from unittest import TestCase
+from pathlib import Path
+import json
+
+# ours
+from verzettler.zettelkasten import Zettelkasten
+from verzettler.note_graph import (
+    environment_json,
+    graph_data,
+    graph_html,
+    note_environment,
+)
+from verzettler.bin import zk_server
+
+
+class TestNoteGraph(TestCase):
+    def setUp(self):
+        self.playground = Path(__file__).resolve().parent / "playground"
+        self.zk = Zettelkasten()
+        self.zk.add_notes_from_directory(self.playground)
+
+    def test_environment(self):
+        environment = note_environment(self.zk, "00000000000003")
+        self.assertEqual({"00000000000003"}, environment["self"])
+        self.assertEqual(
+            {"00000000000000", "00000000000002"}, environment["predecessors"]
+        )
+        self.assertTrue(environment["predecessors"] <= environment["selected"])
+        self.assertEqual(
+            environment, note_environment(self.zk, "00000000000003")
+        )
+
+    def test_json(self):
+        graph = json.loads(environment_json(self.zk, "00000000000003"))
+        self.assertEqual("00000000000003", graph["nid"])
+        nodes = {node["id"]: node for node in graph["nodes"]}
+        self.assertEqual("self", nodes["00000000000003"]["group"])
+        self.assertEqual("/open/00000000000003", nodes["00000000000003"]["url"])
+        self.assertIn(["00000000000002", "00000000000003"], graph["edges"])
+        for edge in graph["edges"]:
+            self.assertIn(edge[0], nodes)
+            self.assertIn(edge[1], nodes)
+
+    def test_cached_per_version(self):
+        before = environment_json(self.zk, "00000000000003")
+        self.assertIs(before, environment_json(self.zk, "00000000000003"))
+        self.zk.update_note(
+            "00000000000002", "# Changed title\n\n[[00000000000003]]\n"
+        )
+        after = environment_json(self.zk, "00000000000003")
+        self.assertNotIn("Changed title", before)
+        self.assertIn("Changed title", after)
+
+    def test_html(self):
+        embedded = graph_html(self.zk, "00000000000003")
+        self.assertIn('id="note-graph-data"', embedded)
+        fetched = graph_html(self.zk, "00000000000003", api_url="/api/graph/")
+        self.assertIn('data-api-url="/api/graph/"', fetched)
+        self.assertNotIn("note-graph-data", fetched)
+
+    def test_html_api_url_under_prefix(self):
+        current = zk_server.ServerState(self.zk)
+        note = self.zk["00000000000003"]
+        with zk_server.app.test_request_context(
+            "/open/00000000000003", base_url="http://localhost/zk/"
+        ):
+            page = zk_server.render_note_page(current, note, "")
+        self.assertIn('data-api-url="/zk/api/graph/"', page)
+
+    def test_graph_data(self):
+        graph = graph_data(
+            self.zk,
+            ["00000000000002", "00000000000003", "unknown"],
+            url="http://example.com/{nid}",
+            positions={"00000000000003": (1.0, 2.0)},
+        )
+        nodes = {node["id"]: node for node in graph["nodes"]}
+        self.assertEqual({"00000000000002", "00000000000003"}, set(nodes))
+        self.assertEqual(1.0, nodes["00000000000003"]["x"])
+        self.assertNotIn("x", nodes["00000000000002"])
+        self.assertEqual("other", nodes["00000000000002"]["group"])
+        self.assertEqual(
+            "http://example.com/00000000000002", nodes["00000000000002"]["url"]
+        )
+        self.assertIn(["00000000000002", "00000000000003"], graph["edges"])
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+
+# std
+from unittest import TestCase
+from pathlib import Path
+import tempfile
+import shutil
+import pickle
+
+# ours
+from verzettler.zettelkasten import Zettelkasten
+from verzettler.note_transformer import DefaultTransformer, KastenView
+from verzettler.util.write import WriteSummary
+
+
+def _big_note(n_lines: int) -> str:
+    """Note with many lines, links and (underlined) headers"""
+    lines = ["# Big note\n", "\n", "Tags: #a\n", "\n"]
+    for i in range(n_lines):
+        if i % 4 == 0:
+            lines.extend([f"Header {i}\n", "======\n" if i % 8 else "---\n"])
+        lines.append(
+            f"Line {i} [[0000000000000{i % 7}]] and [[0000000000000{i % 5}]]\n"
+        )
+    return "".join(lines)
+
+
+class TestDefaultTransformer(TestCase):
+    def setUp(self):
+        self.tmpdir = Path(tempfile.mkdtemp())
+        self.playground = Path(__file__).resolve().parent / "playground"
+
+    def tearDown(self):
+        shutil.rmtree(str(self.tmpdir))
+
+    def _transform_copy(self, name: str, processes: int):
+        notes_dir = self.tmpdir / name
+        shutil.copytree(str(self.playground), str(notes_dir))
+        zk = Zettelkasten()
+        zk.add_notes_from_directory(notes_dir)
+        summary = WriteSummary()
+        DefaultTransformer(zk).transform_write_many(
+            zk.notes, summary=summary, processes=processes
+        )
+        contents = {path.name: path.read_text() for path in notes_dir.iterdir()}
+        return contents, summary
+
+    def test_parallel_same_as_serial(self):
+        serial, serial_summary = self._transform_copy("serial", 1)
+        parallel, parallel_summary = self._transform_copy("parallel", 2)
+        self.assertEqual(serial, parallel)
+        self.assertEqual(serial_summary.changed, parallel_summary.changed)
+        self.assertEqual(
+            serial_summary.bytes_written, parallel_summary.bytes_written
+        )
+
+    def test_kasten_view(self):
+        zk = Zettelkasten()
+        zk.add_notes_from_directory(self.playground)
+        view = pickle.loads(pickle.dumps(KastenView(zk)))
+        self.assertEqual(len(zk), len(view))
+        for note in zk.notes:
+            self.assertEqual(note.title, view[note.nid].title)
+            self.assertEqual(note.path, view[note.nid].path)
+            self.assertEqual(
+                sorted(zk.get_backlinks(note.nid)),
+                sorted(view.get_backlinks(note.nid)),
+            )
+            self.assertEqual(
+                DefaultTransformer(zk).transform(note),
+                DefaultTransformer(view).transform(note),
+            )
+
+    def _zk_with_note(self, text: str) -> Zettelkasten:
+        notes_dir = self.tmpdir / "notes"
+        shutil.copytree(str(self.playground), str(notes_dir))
+        (notes_dir / "00000000000099_big.md").write_text(text)
+        zk = Zettelkasten()
+        zk.add_notes_from_directory(notes_dir)
+        return zk
+
+    def test_repeated_links(self):
+        zk = self._zk_with_note(
+            "# Note\n\n[[00000000000003]] and [[00000000000003]]\n"
+        )
+        transformer = DefaultTransformer(zk)
+        note = zk["00000000000099"]
+        link = (
+            "[[00000000000003]] [Target for links]"
+            '(00000000000003_links_02.md "autogen")'
+        )
+        transformed = transformer.transform(note)
+        self.assertIn(f"{link} and {link}\n", transformed)
+        note.path.write_text(transformed)
+        self.assertEqual(transformed, transformer.transform(note))
+        # Formatted links are cached, but not across changes
+        zk.update_note("00000000000003", "# New title\n\n[[00000000000002]]\n")
+        self.assertIn(
+            "[New title](00000000000003_links_02.md",
+            transformer.transform(note),
+        )
+
+    def test_big_note(self):
+        n_lines = 4000
+        zk = self._zk_with_note(_big_note(n_lines))
+        transformed = DefaultTransformer(zk).transform(zk["00000000000099"])
+        self.assertEqual(n_lines // 4, transformed.count("# Header"))
+        self.assertEqual(2 * n_lines, transformed.count('"autogen")'))
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+
+# std
+from unittest import TestCase
+from pathlib import Path
+import tempfile
+import shutil
+import os
+
+# ours
+from verzettler.path_index import PathIndex
+
+
+class TestPathIndex(TestCase):
+    def setUp(self):
+        playground = Path(__file__).resolve().parent / "playground"
+        self.tmpdir = Path(tempfile.mkdtemp())
+        self.zk_dir = self.tmpdir / "zk"
+        shutil.copytree(str(playground), str(self.zk_dir))
+        (self.zk_dir / ".git").mkdir()
+        (self.zk_dir / ".git" / "ignored_00000000000010.md").touch()
+        (self.zk_dir / "sub").mkdir()
+        (self.zk_dir / "sub" / "nested_00000000000011.md").touch()
+        self.cache_path = self.tmpdir / "cache" / "index.json"
+
+    def tearDown(self):
+        shutil.rmtree(str(self.tmpdir))
+
+    def _index(self) -> PathIndex:
+        return PathIndex.cached([self.zk_dir], cache_path=self.cache_path)
+
+    def test_search(self):
+        index = self._index()
+        self.assertEqual(
+            [self.zk_dir / "00000000000002_links_01.md"],
+            index.search("links_01"),
+        )
+        self.assertEqual(
+            [self.zk_dir / "sub" / "nested_00000000000011.md"],
+            index.search("nested"),
+        )
+        self.assertEqual([], index.search("ignored"))
+        self.assertEqual(4, len(index.search("*links*")))
+
+    def test_len(self):
+        self.assertEqual(
+            len([f for f in os.listdir(str(self.zk_dir)) if f.endswith(".md")])
+            + 1,
+            len(self._index()),
+        )
+
+    def test_refresh_from_cache(self):
+        self._index()
+        self.assertTrue(self.cache_path.is_file())
+        (self.zk_dir / "sub" / "new_00000000000012.md").touch()
+        os.remove(str(self.zk_dir / "00000000000006_title.md"))
+        index = self._index()
+        self.assertEqual(
+            [self.zk_dir / "sub" / "new_00000000000012.md"],
+            index.search("new"),
+        )
+        self.assertEqual([], index.search("title"))
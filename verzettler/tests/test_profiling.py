@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+
+# std
+from unittest import TestCase
+from pathlib import Path
+import tempfile
+import pstats
+import shutil
+
+# ours
+from verzettler.util.profiling import SpanTimer, Profiler
+
+
+class TestSpanTimer(TestCase):
+    def test_nested(self):
+        timer = SpanTimer()
+        for _ in range(2):
+            with timer.span("load"):
+                with timer.span("parse"):
+                    pass
+                with timer.span("graph"):
+                    pass
+        totals = timer.totals()
+        self.assertEqual(
+            list(totals), [("load",), ("load", "parse"), ("load", "graph")]
+        )
+        self.assertEqual(totals[("load", "parse")][1], 2)
+        self.assertGreaterEqual(
+            totals[("load",)][0],
+            totals[("load", "parse")][0] + totals[("load", "graph")][0],
+        )
+
+    def test_report(self):
+        timer = SpanTimer()
+        with timer.span("load"):
+            with timer.span("parse"):
+                pass
+        report = timer.report(total=10.0)
+        self.assertIn("\n  parse", report)
+        self.assertIn("command (rest)", report)
+        timer.reset()
+        self.assertEqual(timer.totals(), {})
+
+
+class TestProfiler(TestCase):
+    def setUp(self):
+        self.tmpdir = Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        shutil.rmtree(str(self.tmpdir))
+
+    def test_output(self):
+        output = self.tmpdir / "profile"
+        profiler = Profiler(output=str(output))
+        profiler.start()
+        sum(range(1000))
+        report = profiler.report()
+        self.assertIn("Time spent", report)
+        self.assertIn(str(output), report)
+        pstats.Stats(str(output))
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+
+# std
+from unittest import TestCase
+from pathlib import Path
+import tempfile
+import shutil
+import os
+
+# ours
+from verzettler.render_cache import RenderCache
+from verzettler.zettelkasten import Zettelkasten
+from verzettler.note_converter import PandocConverter
+
+
+class TestRenderCache(TestCase):
+    def test_lru_eviction(self):
+        cache = RenderCache(max_bytes=10)
+        cache.put("a", "1234", nid="1")
+        cache.put("b", "1234", nid="2")
+        self.assertEqual("1234", cache.get("a"))
+        cache.put("c", "1234", nid="3")
+        self.assertIn("a", cache)
+        self.assertNotIn("b", cache)
+        self.assertIn("c", cache)
+        self.assertEqual(8, cache.size)
+        cache.put("d", "x" * 11, nid="4")
+        self.assertNotIn("d", cache)
+
+    def test_eviction_drops_index(self):
+        cache = RenderCache(max_bytes=10)
+        for i in range(100):
+            cache.put(str(i), "1234", nid=str(i), dependencies=["x"])
+        self.assertEqual(2, len(cache))
+        self.assertEqual({"98", "99"}, set(cache._key2nid))
+        self.assertEqual({"98", "99", "x"}, set(cache._nid2keys))
+        self.assertEqual({"98", "99"}, cache._nid2keys["x"])
+        cache.put("big", "x" * 11, nid="big")
+        self.assertNotIn("big", cache._nid2keys)
+        self.assertEqual(2, cache.invalidate(["x"]))
+        self.assertEqual({}, dict(cache._nid2keys))
+        self.assertEqual({}, cache._key2nid)
+
+    def test_invalidate(self):
+        cache = RenderCache()
+        cache.put("a", "A", nid="1", dependencies=["2"])
+        cache.put("b", "B", nid="2")
+        cache.put("c", "C", nid="3")
+        self.assertEqual(2, cache.invalidate(["2"]))
+        self.assertEqual(["c"], list(cache._entries))
+
+    def test_invalidate_without_dependents(self):
+        cache = RenderCache()
+        cache.put("a", "A", nid="1", dependencies=["2"])
+        cache.put("b", "B", nid="2")
+        self.assertEqual(1, cache.invalidate(["2"], dependents=False))
+        self.assertEqual(["a"], list(cache._entries))
+        self.assertEqual(1, cache.invalidate(["2"]))
+        self.assertEqual([], list(cache._entries))
+
+    def test_persistence(self):
+        directory = Path(tempfile.mkdtemp())
+        try:
+            RenderCache(directory=directory).put(
+                "abc", "A", nid="1", dependencies=["2"]
+            )
+            cache = RenderCache(directory=directory)
+            self.assertEqual("A", cache.get("abc"))
+            self.assertEqual(None, cache.get("abd"))
+            self.assertEqual((1, 1), (cache.hits, cache.misses))
+            self.assertEqual(1, cache.invalidate(["2"]))
+            self.assertEqual(None, RenderCache(directory=directory).get("abc"))
+        finally:
+            shutil.rmtree(str(directory))
+
+    def test_disk_pruned(self):
+        directory = Path(tempfile.mkdtemp())
+        try:
+            cache = RenderCache(directory=directory)
+            for i, key in enumerate(["aa", "bb", "cc", "dd"]):
+                cache.put(key, "x" * 100, nid=str(i))
+                # Explicit times, however coarse the mtimes are
+                os.utime(str(cache._disk_path(key)), (i, i))
+            size = cache._disk_path("aa").stat().st_size
+            # Reading an entry marks it as recently used
+            self.assertIsNotNone(RenderCache(directory=directory).get("aa"))
+            self.assertEqual(0, RenderCache(directory=directory).prune_disk())
+            cache = RenderCache(directory=directory, max_disk_bytes=2 * size)
+            self.assertEqual(2, len(list(directory.glob("*/*.json"))))
+            self.assertIsNotNone(cache._read_disk("aa"))
+            self.assertIsNotNone(cache._read_disk("dd"))
+            # Pruned when writing, too
+            cache.put("ee", "x" * 100, nid="5")
+            self.assertEqual(2, len(list(directory.glob("*/*.json"))))
+            self.assertIsNotNone(cache._read_disk("ee"))
+            self.assertEqual(2 * size, cache._disk_size)
+        finally:
+            shutil.rmtree(str(directory))
+
+    def test_pandoc_cache_key(self):
+        playground = Path(__file__).resolve().parent / "playground"
+        zk = Zettelkasten()
+        zk.add_notes_from_directory(playground)
+        converter = PandocConverter(zk, cache=RenderCache())
+        note = zk["00000000000002"]
+        text = note.path.read_text()
+        key, dependencies = converter._cache_key(note, text)
+        self.assertEqual(
+            ["00000000000003", "00000000000004", "00000000000005"],
+            dependencies,
+        )
+        self.assertEqual(key, converter._cache_key(note, text)[0])
+        self.assertNotEqual(key, converter._cache_key(note, text + "\n")[0])
+        zk["00000000000004"].title = "Changed title"
+        self.assertNotEqual(key, converter._cache_key(note, text)[0])
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+
+# std
+from unittest import TestCase
+from pathlib import Path
+import tempfile
+import shutil
+import json
+
+# ours
+from verzettler.zettelkasten import Zettelkasten
+from verzettler.note_transformer import DefaultTransformer
+from verzettler.transform_manifest import (
+    TransformManifest,
+    manifest_version,
+    transform_incremental,
+)
+from verzettler.util.write import WriteSummary
+
+
+class TestTransformIncremental(TestCase):
+    def setUp(self):
+        self.tmpdir = Path(tempfile.mkdtemp())
+        self.notes_dir = self.tmpdir / "notes"
+        shutil.copytree(
+            str(Path(__file__).resolve().parent / "playground"),
+            str(self.notes_dir),
+        )
+        self.manifest_path = self.tmpdir / "manifest.json"
+
+    def tearDown(self):
+        shutil.rmtree(str(self.tmpdir))
+
+    def _run(self):
+        """Returns the IDs of the notes that were transformed"""
+        zk = Zettelkasten()
+        zk.add_notes_from_directory(self.notes_dir)
+        manifest = TransformManifest(self.manifest_path, "DefaultTransformer")
+        transformed = []
+
+        class RecordingTransformer(DefaultTransformer):
+            def transform(self, note):
+                transformed.append(note.nid)
+                return super().transform(note)
+
+        summary = WriteSummary()
+        skipped = transform_incremental(
+            zk, RecordingTransformer(zk=zk), manifest, summary=summary
+        )
+        manifest.save()
+        self.assertEqual(len(zk), skipped + len(transformed))
+        return set(transformed)
+
+    def test_incremental(self):
+        self.assertEqual(7, len(self._run()))
+        self.assertEqual(set(), self._run())
+        # Title of a note changed: The notes that link to it change, too
+        path = next(self.notes_dir.glob("00000000000003*"))
+        text = path.read_text()
+        path.write_text(text.replace("# Target for links", "# New title"))
+        self.assertEqual(
+            {"00000000000000", "00000000000002", "00000000000003"},
+            self._run(),
+        )
+        self.assertEqual(set(), self._run())
+        # Touched, but not changed
+        path.write_text(path.read_text())
+        self.assertEqual(set(), self._run())
+        # New backlink
+        path = next(self.notes_dir.glob("00000000000006*"))
+        path.write_text(path.read_text() + "\n[[00000000000004]]\n")
+        self.assertEqual({"00000000000004", "00000000000006"}, self._run())
+        # Same result as transforming everything
+        zk = Zettelkasten()
+        zk.add_notes_from_directory(self.notes_dir)
+        transformer = DefaultTransformer(zk=zk)
+        for note in zk.notes:
+            self.assertEqual(note.path.read_text(), transformer.transform(note))
+
+    def test_other_transformer(self):
+        self._run()
+        manifest = TransformManifest(self.manifest_path, "OtherTransformer")
+        self.assertEqual({}, manifest.entries)
+
+    def test_outdated_version(self):
+        self._run()
+        data = json.loads(self.manifest_path.read_text())
+        data["version"] = manifest_version - 1
+        self.manifest_path.write_text(json.dumps(data))
+        self.assertEqual(7, len(self._run()))
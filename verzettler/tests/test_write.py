@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+
+# std
+from unittest import TestCase
+from pathlib import Path
+import os
+import tempfile
+import shutil
+
+# ours
+from verzettler.util.write import WriteSummary, write_if_changed
+
+
+class TestWriteIfChanged(TestCase):
+    def setUp(self):
+        self.tmpdir = Path(tempfile.mkdtemp())
+        self.path = self.tmpdir / "note.md"
+
+    def tearDown(self):
+        shutil.rmtree(str(self.tmpdir))
+
+    def test_write(self):
+        summary = WriteSummary()
+        self.assertTrue(write_if_changed(self.path, "abc\n", summary=summary))
+        self.assertEqual("abc\n", self.path.read_text())
+        os.utime(str(self.path), ns=(0, 0))
+        self.assertFalse(write_if_changed(self.path, "abc\n", summary=summary))
+        self.assertEqual(0, self.path.stat().st_mtime_ns)
+        self.assertTrue(write_if_changed(self.path, "abd\n", summary=summary))
+        self.assertEqual("abd\n", self.path.read_text())
+        self.assertEqual(
+            (2, 1, 8),
+            (summary.changed, summary.unchanged, summary.bytes_written),
+        )
+        # No temporary files left
+        self.assertEqual(["note.md"], os.listdir(str(self.tmpdir)))
+
+    def test_keeps_mode(self):
+        self.path.write_text("abc")
+        os.chmod(str(self.path), 0o600)
+        write_if_changed(self.path, "def")
+        self.assertEqual(0o600, self.path.stat().st_mode & 0o777)
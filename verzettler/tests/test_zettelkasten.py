@@ -41,3 +41,102 @@ class TestZettelkasten(TestCase):
         self.assertEqual(
             [self.zk["00000000000000"]], self.zk.search("00000000000000")
         )
+
+    def test_query_tags(self):
+        tagged = self.zk["00000000000001"]
+        self.assertEqual([tagged], self.zk.query_tags("tag1"))
+        self.assertEqual([tagged], self.zk.query_tags("#tag1 AND tag2"))
+        self.assertEqual([tagged], self.zk.query_tags("tag*"))
+        self.assertEqual([], self.zk.query_tags("tag1 AND NOT tag2"))
+        self.assertEqual([], self.zk.query_tags("nonexistent"))
+        self.assertEqual(
+            len(self.zk) - 1, len(self.zk.query_tags("!(tag1 | other)"))
+        )
+        with self.assertRaises(ValueError):
+            self.zk.query_tags("tag1 AND (tag2")
+
+    def test_get_by_path(self):
+        note = self.zk["00000000000002"]
+        self.assertIs(note, self.zk.get_by_path("00000000000002_links_01.md"))
+        self.assertIs(note, self.zk.get_by_path(note.path))
+        self.assertIs(
+            note, self.zk.get_by_path(Path("/other/00000000000002_links_01.md"))
+        )
+        with self.assertRaises(KeyError):
+            self.zk.get_by_path("nonexistent.md")
+
+    def test_reload_note(self):
+        self.zk.reload_note("00000000000002")
+        self.assertEqual(
+            set(self.zk.get_backlinks("00000000000003")),
+            {"00000000000000", "00000000000002"},
+        )
+        self.zk.reload_note("00000000000003")
+        self.assertEqual(
+            set(self.zk.get_backlinks("00000000000003")),
+            {"00000000000000", "00000000000002"},
+        )
+        self.assertEqual(
+            self.zk["00000000000003"],
+            self.zk.get_by_path("00000000000003_links_02.md"),
+        )
+
+    def test_version(self):
+        version = self.zk.version
+        orphans = {note.nid for note in self.zk.get_orphans()}
+        self.zk.reload_note("00000000000002")
+        self.assertNotEqual(version, self.zk.version)
+        self.assertNotEqual(Zettelkasten().version, Zettelkasten().version)
+        self.assertEqual(orphans, {note.nid for note in self.zk.get_orphans()})
+        self.zk._remove_note("00000000000002")
+        self.assertNotEqual(
+            orphans, {note.nid for note in self.zk.get_orphans()}
+        )
+
+    def test_update_note(self):
+        version = self.zk.version
+        text = (
+            "# New title\n\nTags: #tag2 #tag3\n\n[[00000000000003]]\n"
+            "[[00000000000099]]\n"
+        )
+        old = self.zk.update_note("00000000000002", text)
+        self.assertEqual(old.title, "Some links 1")
+        self.assertNotEqual(version, self.zk.version)
+        note = self.zk["00000000000002"]
+        self.assertEqual(note.title, "New title")
+        self.assertIs(note, self.zk.get_by_path(note.path))
+        self.assertEqual(
+            set(self.zk.get_backlinks("00000000000003")),
+            {"00000000000000", "00000000000002"},
+        )
+        self.assertNotIn(
+            "00000000000002", self.zk.get_backlinks("00000000000004")
+        )
+        self.assertEqual(
+            {n.nid for n in self.zk.query_tags("tag3")}, {"00000000000002"}
+        )
+        self.assertEqual(
+            {n.nid for n in self.zk.query_tags("tag2")},
+            {"00000000000001", "00000000000002"},
+        )
+        self.zk.update_note("00000000000001", "# No tags\n")
+        self.assertEqual({"tag2", "tag3"}, set(self.zk.tags))
+        self.zk.update_note("00000000000002", "# Links removed\n")
+        self.assertNotIn("00000000000099", self.zk._graph)
+        self.assertEqual(
+            set(self.zk.get_backlinks("00000000000003")), {"00000000000000"}
+        )
+
+    def test_copy(self):
+        copy = self.zk.copy()
+        self.assertEqual(self.zk.version, copy.version)
+        self.zk.update_note(
+            "00000000000002",
+            "# New title\n\nTags: #tag3\n\n[[00000000000003]]\n",
+        )
+        self.assertEqual("Some links 1", copy["00000000000002"].title)
+        self.assertIn("00000000000002", copy.get_backlinks("00000000000004"))
+        self.assertEqual([], copy.query_tags("tag3"))
+        self.assertEqual(
+            ["00000000000002"], [n.nid for n in self.zk.query_tags("tag3")]
+        )
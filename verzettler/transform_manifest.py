@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+
+""" Incremental transformation of notes (``zk_transform --incremental``).
+
+The output of :class:`verzettler.note_transformer.DefaultTransformer` for a
+note only depends on
+
+* the content and path of the note itself,
+* the titles and paths of the notes it links to and
+* its backlinks (and their titles and paths).
+
+A manifest records these inputs for every note after it was transformed,
+so that later runs only transform the notes whose inputs changed.
+"""
+
+# std
+import hashlib
+import json
+from pathlib import Path, PurePath
+from typing import Any, Dict, Iterable, Optional, Union
+
+# ours
+from verzettler.log import logger
+from verzettler.note import Note
+from verzettler.note_transformer import NoteTransformer
+from verzettler.util.paths import get_cache_dir
+from verzettler.util.write import WriteSummary, write_if_changed
+
+#: Bump when the format of the manifest, the recorded inputs or the output
+#: of DefaultTransformer change, so that all notes are transformed again
+manifest_version = 2
+
+
+def default_manifest_path(directories: Iterable[Union[str, PurePath]]) -> Path:
+    """Manifest of a Zettelkasten in the cache dir, one per set of input
+    directories"""
+    key = "\0".join(sorted(str(Path(d).resolve()) for d in directories))
+    name = hashlib.sha1(key.encode("utf-8")).hexdigest()
+    return get_cache_dir() / "transform" / f"{name}.json"
+
+
+def _file_hash(data: bytes) -> str:
+    return hashlib.sha1(data).hexdigest()
+
+
+def dependency_hash(zk, note: Note) -> str:
+    """Hash of the inputs of the transformation of a note besides its own
+    content: Its path, the titles and paths of the notes it links to and its
+    backlinks."""
+    sha = hashlib.sha1()
+
+    def add(nid: str) -> None:
+        if nid in zk:
+            other = zk[nid]
+            sha.update(f"{nid}\0{other.title}\0{other.path}\0".encode("utf-8"))
+        else:
+            sha.update(f"{nid}\0\1\0".encode("utf-8"))
+
+    sha.update(f"{note.path}\0".encode("utf-8"))
+    for nid in sorted(set(note.links)):
+        add(nid)
+    sha.update(b"\2")
+    for nid in sorted(set(zk.get_backlinks(note.nid))):
+        add(nid)
+    return sha.hexdigest()
+
+
+class TransformManifest(object):
+    """Inputs of the last transformation of every note.
+
+    Args:
+        path: JSON file of the manifest. Doesn't have to exist yet.
+        transformer: Name of the transformer. A manifest that was written
+            for another transformer is discarded.
+    """
+
+    def __init__(self, path: Union[str, PurePath], transformer: str):
+        self.path = Path(path)
+        self.transformer = transformer
+        self.entries = {}  # type: Dict[str, Dict[str, Any]]
+        self._load()
+
+    def _load(self) -> None:
+        try:
+            with self.path.open(encoding="utf-8") as inf:
+                data = json.load(inf)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable manifest {self.path}: {e}")
+            return
+        if (
+            data.get("version") != manifest_version
+            or data.get("transformer") != self.transformer
+        ):
+            logger.info(f"Manifest {self.path} is outdated, ignoring it.")
+            return
+        self.entries = data.get("notes", {})
+
+    def save(self) -> None:
+        data = {
+            "version": manifest_version,
+            "transformer": self.transformer,
+            "notes": self.entries,
+        }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        write_if_changed(
+            self.path,
+            json.dumps(data, indent=1, sort_keys=True),
+            encoding="utf-8",
+        )
+
+    def is_current(self, note: Note, dependencies: str) -> bool:
+        """True if the note and its dependencies are unchanged since it was
+        last recorded."""
+        entry = self.entries.get(note.nid)
+        if entry is None or entry["dependencies"] != dependencies:
+            return False
+        if entry["path"] != str(note.path):
+            return False
+        try:
+            stat = note.path.stat()
+        except OSError:
+            return False
+        if (
+            stat.st_mtime_ns == entry["mtime_ns"]
+            and stat.st_size == entry["size"]
+        ):
+            return True
+        # Touched, but maybe not changed
+        if _file_hash(note.path.read_bytes()) != entry["hash"]:
+            return False
+        entry["mtime_ns"] = stat.st_mtime_ns
+        entry["size"] = stat.st_size
+        return True
+
+    def record(self, note: Note, dependencies: str) -> None:
+        """Record the current state of the (transformed) file of a note"""
+        data = note.path.read_bytes()
+        stat = note.path.stat()
+        self.entries[note.nid] = {
+            "path": str(note.path),
+            "hash": _file_hash(data),
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "dependencies": dependencies,
+        }
+
+    def prune(self, nids: Iterable[str]) -> None:
+        """Forget all notes but these"""
+        keep = set(nids)
+        for nid in list(self.entries):
+            if nid not in keep:
+                del self.entries[nid]
+
+
+def transform_incremental(
+    zk,
+    transformer: NoteTransformer,
+    manifest: TransformManifest,
+    summary: Optional[WriteSummary] = None,
+    processes: Optional[int] = 1,
+) -> int:
+    """Transform (in place) all notes whose inputs changed since the manifest
+    was written and update the manifest (without saving it).
+
+    Args:
+        zk: Zettelkasten
+        transformer: Transformer whose output only depends on the inputs of
+            :func:`dependency_hash` and the content of the note
+        manifest: Manifest
+        summary: Record writes here
+        processes: See :meth:`NoteTransformer.transform_write_many`
+
+    Returns:
+        Number of notes that were skipped
+    """
+    todo = []
+    for note in zk.notes:
+        dependencies = dependency_hash(zk, note)
+        if not manifest.is_current(note, dependencies):
+            todo.append((note, dependencies))
+    transformer.transform_write_many(
+        (note for note, _ in todo), summary=summary, processes=processes
+    )
+    for note, dependencies in todo:
+        manifest.record(note, dependencies)
+    manifest.prune(note.nid for note in zk.notes)
+    return len(zk) - len(todo)
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+
+""" Sharing state between threads, e.g. in zk_server. """
+
+# std
+import threading
+from contextlib import contextmanager
+from typing import Callable, Generic, Iterator, TypeVar
+
+T = TypeVar("T")
+
+
+class RWLock(object):
+    """Readers-writer lock: Any number of readers or a single writer.
+    Waiting writers take precedence over new readers, so that writers are not
+    starved. Not reentrant.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = False
+        self._waiting_writers = 0
+
+    @contextmanager
+    def read(self) -> Iterator[None]:
+        with self._cond:
+            while self._writer or self._waiting_writers:
+                self._cond.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                if not self._readers:
+                    self._cond.notify_all()
+
+    @contextmanager
+    def write(self) -> Iterator[None]:
+        with self._cond:
+            self._waiting_writers += 1
+            while self._writer or self._readers:
+                self._cond.wait()
+            self._waiting_writers -= 1
+            self._writer = True
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writer = False
+                self._cond.notify_all()
+
+
+class SnapshotHolder(Generic[T]):
+    """Holds the current snapshot of some state (e.g. a Zettelkasten).
+
+    * Readers use :meth:`read` and keep working with the snapshot they got,
+      even if it is replaced in the meantime.
+    * :meth:`replace` builds a new snapshot off to the side (readers are not
+      blocked while doing so) and then publishes it atomically.
+    * :meth:`modify` allows small changes to the current snapshot in place,
+      while no one is reading it.
+
+    Writers (:meth:`replace` and :meth:`modify`) are serialized, so that no
+    change gets lost.
+
+    Args:
+        initial: First snapshot
+    """
+
+    def __init__(self, initial: T):
+        self._current = initial
+        self._rwlock = RWLock()
+        self._writer_lock = threading.Lock()
+
+    @property
+    def current(self) -> T:
+        """Current snapshot without taking any lock. Only use this if you
+        don't need a consistent view of it.
+        """
+        return self._current
+
+    @contextmanager
+    def read(self) -> Iterator[T]:
+        """Context manager yielding the current snapshot. Do not call
+        :meth:`modify` or :meth:`read` from within (not reentrant)."""
+        with self._rwlock.read():
+            yield self._current
+
+    def replace(self, build: Callable[[T], T]) -> T:
+        """Build a new snapshot and publish it.
+
+        Args:
+            build: Function that takes the current snapshot and returns the
+                new one. Must not modify the current snapshot.
+
+        Returns:
+            New snapshot
+        """
+        with self._writer_lock:
+            new = build(self._current)
+            # A plain assignment is atomic, readers that already hold the
+            # old snapshot keep using it.
+            self._current = new
+        return new
+
+    @contextmanager
+    def modify(self) -> Iterator[T]:
+        """Context manager yielding the current snapshot for modifications
+        in place. Waits for all current readers to finish."""
+        with self._writer_lock:
+            with self._rwlock.write():
+                yield self._current
@@ -30,6 +30,19 @@ def get_jekyll_home_from_env() -> Optional[Path]:
         return path
 
 
+def get_cache_dir() -> Path:
+    """Directory for persistent caches. Taken from the ZK_CACHE_DIR
+    environment variable if set, else $XDG_CACHE_HOME/verzettler (which
+    defaults to ~/.cache/verzettler). The directory is not created here.
+    """
+    if "ZK_CACHE_DIR" in os.environ:
+        return Path(os.environ["ZK_CACHE_DIR"])
+    xdg_cache_home = os.environ.get("XDG_CACHE_HOME", "")
+    if xdg_cache_home:
+        return Path(xdg_cache_home) / "verzettler"
+    return Path.home() / ".cache" / "verzettler"
+
+
 def pass_fct(*args, **kwargs):
     pass
 
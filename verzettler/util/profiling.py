@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+
+""" Profiling of the command line tools (``--profile``, see
+:func:`verzettler.cli_util.add_debug_args`).
+
+Besides cProfile, the time spent in a few coarse sections (e.g. loading
+every directory of notes) is recorded with :data:`spans`, which is cheap
+enough to be always on:
+
+    >>> timer = SpanTimer()
+    >>> with timer.span("load"):
+    ...     with timer.span("parse"):
+    ...         pass
+    >>> [(path, count) for path, (_, count) in timer.totals().items()]
+    [(('load',), 1), (('load', 'parse'), 1)]
+"""
+
+# std
+import cProfile
+import io
+import pstats
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, TextIO, Tuple
+
+# Names of the span and its parents
+SpanPath = Tuple[str, ...]
+
+
+class SpanTimer(object):
+    """Accumulates the wall time spent in (nested) named sections of the
+    code. Nesting is tracked per thread.
+    """
+
+    def __init__(self):
+        self._totals = {}  # type: Dict[SpanPath, List[float]]
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _stack(self) -> List[str]:
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    @contextmanager
+    def span(self, name: str) -> Iterator[None]:
+        stack = self._stack()
+        stack.append(name)
+        # Inserted on start, so that parents come before their children
+        with self._lock:
+            total = self._totals.setdefault(tuple(stack), [0.0, 0])
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - start
+            stack.pop()
+            with self._lock:
+                total[0] += duration
+                total[1] += 1
+
+    def totals(self) -> Dict[SpanPath, Tuple[float, int]]:
+        """Total time and number of calls of all spans (parents come before
+        their children)"""
+        with self._lock:
+            return {
+                path: (total[0], int(total[1]))
+                for path, total in self._totals.items()
+            }
+
+    def report(self, total: Optional[float] = None) -> str:
+        """Table of all spans.
+
+        Args:
+            total: Total wall time. If given, the time outside of all top
+                level spans is reported as the command's own work.
+        """
+        totals = self.totals()
+        lines = []
+        for path, (duration, count) in totals.items():
+            name = "  " * (len(path) - 1) + path[-1]
+            lines.append(f"{name:<50} {duration:9.3f} s {count:7} calls")
+        if total is not None:
+            in_spans = sum(
+                duration
+                for path, (duration, _) in totals.items()
+                if len(path) == 1
+            )
+            lines.append(f"{'command (rest)':<50} {total - in_spans:9.3f} s")
+            lines.append(f"{'total':<50} {total:9.3f} s")
+        return "\n".join(lines)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._totals.clear()
+
+
+#: Global span timer
+spans = SpanTimer()
+
+
+class Profiler(object):
+    """Runs cProfile from :meth:`start` to :meth:`stop` and reports the
+    spans of :data:`spans` together with the most expensive functions.
+    cProfile only sees the thread that started it.
+
+    Args:
+        output: Write the raw profile to this file (can be inspected with
+            e.g. snakeviz or ``python3 -m pstats``)
+        n_functions: Number of functions in the report
+    """
+
+    def __init__(self, output: Optional[str] = None, n_functions: int = 25):
+        self.output = output
+        self.n_functions = n_functions
+        self._profile = cProfile.Profile()
+        self._start = None  # type: Optional[float]
+        self._duration = None  # type: Optional[float]
+
+    def start(self) -> None:
+        self._start = time.perf_counter()
+        self._profile.enable()
+
+    def stop(self) -> None:
+        if self._start is None or self._duration is not None:
+            return
+        self._profile.disable()
+        self._duration = time.perf_counter() - self._start
+        if self.output is not None:
+            self._profile.dump_stats(self.output)
+
+    def report(self) -> str:
+        self.stop()
+        stream = io.StringIO()
+        stats = pstats.Stats(self._profile, stream=stream)
+        stats.sort_stats("cumulative").print_stats(self.n_functions)
+        parts = [
+            "Time spent (wall time)",
+            spans.report(total=self._duration),
+            "",
+            stream.getvalue().strip(),
+        ]
+        if self.output is not None:
+            parts.append(f"Raw profile written to {self.output}")
+        return "\n".join(parts)
+
+    def print_report(self, file: Optional[TextIO] = None) -> None:
+        print(self.report(), file=file or sys.stderr)
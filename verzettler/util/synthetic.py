@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+
+""" Synthetic Zettelkasten for benchmarks and tests """
+
+# std
+import random
+from pathlib import Path, PurePath
+from typing import List, Union
+
+_words = (
+    "lorem ipsum dolor sit amet consectetuer adipiscing elit aenean commodo "
+    "ligula eget massa cum sociis natoque penatibus et magnis dis parturient "
+    "montes nascetur ridiculus mus donec quam felis ultricies nec"
+).split()
+
+
+def synthetic_nid(i: int) -> str:
+    """
+    >>> synthetic_nid(12)
+    '20200101000012'
+    """
+    return str(20200101000000 + i)
+
+
+def generate_kasten(
+    directory: Union[str, PurePath],
+    n_notes: int = 1000,
+    n_links: int = 5,
+    n_paragraphs: int = 5,
+    n_categories: int = 10,
+    seed: int = 0,
+) -> List[Path]:
+    """Write a synthetic Zettelkasten of random notes.
+
+    Every note has a title, one category tag (``c_0``, ``c_1``, ...), a few
+    paragraphs of filler text and links to random other notes. Note 0 is
+    linked from every tenth note, so the graph has a root.
+
+    Args:
+        directory: Output directory (created if missing)
+        n_notes: Number of notes
+        n_links: Number of links per note
+        n_paragraphs: Number of paragraphs per note
+        n_categories: Number of category tags
+        seed: Random seed
+
+    Returns:
+        Paths of the written notes
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    rng = random.Random(seed)
+    paths = []
+    for i in range(n_notes):
+        nid = synthetic_nid(i)
+        lines = [
+            f"# Note number {i}\n",
+            "\n",
+            f"Tags: #c_{i % n_categories} #synthetic\n",
+            "\n",
+        ]
+        targets = [rng.randrange(n_notes) for _ in range(n_links)]
+        if i and i % 10 == 0:
+            targets.append(0)
+        for j in range(n_paragraphs):
+            words = rng.choices(_words, k=40)
+            if j < len(targets):
+                words.append(f"[[{synthetic_nid(targets[j])}]]")
+            lines.append(" ".join(words) + ".\n\n")
+        for target in targets[n_paragraphs:]:
+            lines.append(f"* [[{synthetic_nid(target)}]]\n")
+        path = directory / f"note_{i}_{nid}.md"
+        with path.open("w") as outf:
+            outf.write("".join(lines))
+        paths.append(path)
+    return paths
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+
+""" Writing output files atomically and only if their content changed. """
+
+# std
+import locale
+import os
+import threading
+from pathlib import Path, PurePath
+from typing import Optional, Union
+
+
+class WriteSummary(object):
+    """Counts written and skipped files (thread safe).
+
+    >>> summary = WriteSummary()
+    >>> summary.add(changed=True, n_bytes=120)
+    >>> summary.add(changed=False)
+    >>> str(summary)
+    '1 file changed (120 bytes written), 1 unchanged'
+    >>> summary.add_failed()
+    >>> str(summary)
+    '1 file changed (120 bytes written), 1 unchanged, 1 failed'
+    """
+
+    def __init__(self):
+        self.changed = 0
+        self.unchanged = 0
+        self.bytes_written = 0
+        #: Files that weren't written, because their content couldn't be
+        #: produced
+        self.failed = 0
+        self._lock = threading.Lock()
+
+    def add(self, changed: bool, n_bytes: int = 0) -> None:
+        with self._lock:
+            if changed:
+                self.changed += 1
+                self.bytes_written += n_bytes
+            else:
+                self.unchanged += 1
+
+    def add_failed(self) -> None:
+        with self._lock:
+            self.failed += 1
+
+    def __str__(self):
+        files = "file" if self.changed == 1 else "files"
+        out = (
+            f"{self.changed} {files} changed "
+            f"({self.bytes_written} bytes written), {self.unchanged} unchanged"
+        )
+        if self.failed:
+            out += f", {self.failed} failed"
+        return out
+
+    def __repr__(self):
+        return (
+            f"WriteSummary(changed={self.changed}, "
+            f"unchanged={self.unchanged}, bytes_written={self.bytes_written}, "
+            f"failed={self.failed})"
+        )
+
+
+def _has_content(path: Path, data: bytes) -> bool:
+    try:
+        if path.stat().st_size != len(data):
+            return False
+        return path.read_bytes() == data
+    except OSError:
+        return False
+
+
+def write_if_changed(
+    path: Union[str, PurePath],
+    content: str,
+    summary: Optional[WriteSummary] = None,
+    encoding: Optional[str] = None,
+) -> bool:
+    """Write text to a file unless it already has exactly this content, so
+    that unchanged files keep their modification time. The file is written
+    to a temporary file next to it first and then moved into place, so
+    that it is never left half written.
+
+    Args:
+        path: Target file
+        content: Text to write
+        summary: Record the write (or the skip) here
+        encoding: Encoding of the file. Default: Same as for ``open``.
+
+    Returns:
+        True if the file was written
+    """
+    path = Path(path)
+    if encoding is None:
+        encoding = locale.getpreferredencoding(False)
+    data = content.encode(encoding)
+    if _has_content(path, data):
+        if summary is not None:
+            summary.add(changed=False)
+        return False
+    tmp_path = path.with_name(
+        f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp"
+    )
+    try:
+        # Keep the permissions of an existing file, else use the default
+        # ones (i.e. the umask applies)
+        try:
+            mode = path.stat().st_mode & 0o7777
+        except OSError:
+            mode = None
+        fd = os.open(
+            str(tmp_path),
+            os.O_WRONLY | os.O_CREAT | os.O_TRUNC,
+            0o666 if mode is None else mode,
+        )
+        with os.fdopen(fd, "wb") as outf:
+            outf.write(data)
+        if mode is not None:
+            os.chmod(str(tmp_path), mode)
+        os.replace(str(tmp_path), str(path))
+    except BaseException:
+        try:
+            tmp_path.unlink()
+        except OSError:
+            pass
+        raise
+    if summary is not None:
+        summary.add(changed=True, n_bytes=len(data))
+    return True
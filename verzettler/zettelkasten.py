@@ -7,6 +7,7 @@ from typing import List, Union, Optional, Iterable, Set, Dict, Any
 from pathlib import Path, PurePath
 from functools import lru_cache
 import collections
+import itertools
 
 # 3rd
 import networkx as nx
@@ -16,18 +17,28 @@ from verzettler.note import Note
 from verzettler.log import logger
 from verzettler.note_converter import NoteConverter
 from verzettler.util.paths import remove_duplicates
+from verzettler.tag_query import evaluate as evaluate_tag_query
+from verzettler.tag_query import bits_to_indices
+from verzettler.metrics import load_seconds, registry, search_seconds, timed
+from verzettler.util.profiling import spans
+from verzettler.util.write import WriteSummary
 
-# Methods as functions defined here for better caching
+# Methods as functions defined here for better caching. Functions taking a
+# graph also take its version (see Zettelkasten.version), which is only used
+# as part of the cache key, so that changes of the graph invalidate results.
 
 _sentinel = object()
 
+# Versions are unique among all Zettelkasten objects of this process
+_versions = itertools.count(1)
+
 
 def _iterator_empty(iterator):
     return next(iterator, _sentinel) is _sentinel
 
 
 @lru_cache(maxsize=100)
-def _get_orphans(g: nx.DiGraph):
+def _get_orphans(g: nx.DiGraph, version: int):
     return [node for node in g.nodes if _iterator_empty(g.predecessors(node))]
 
 
@@ -56,15 +67,24 @@ def _get_depth(g: nx.DiGraph, root, node: Any, errvalue=0):
 
 
 @lru_cache(maxsize=100)
-def _get_notes_by_depth(g: nx.DiGraph, root) -> Dict[int, Set[Any]]:
+def _get_notes_by_depth(
+    g: nx.DiGraph, version: int, root
+) -> Dict[int, Set[Any]]:
     nbd = collections.defaultdict(set)
     for node in g.nodes:
         nbd[_get_depth(g=g, root=root, node=node)].add(node)
     return nbd
 
 
+@lru_cache(maxsize=100)
+def _get_shortest_path_lengths(
+    g: nx.DiGraph, version: int, root
+) -> Dict[Any, int]:
+    return nx.single_source_shortest_path_length(g, root)
+
+
 @lru_cache(maxsize=1000)
-def _get_k_neighbors(g: nx.DiGraph, root, k=1):
+def _get_k_neighbors(g: nx.DiGraph, version: int, root, k=1):
     return [
         node
         for node in g.nodes
@@ -73,23 +93,55 @@ def _get_k_neighbors(g: nx.DiGraph, root, k=1):
 
 
 @lru_cache(maxsize=100)
-def _get_root(g: nx.DiGraph) -> str:
+def _get_root(g: nx.DiGraph, version: int) -> str:
     return min(g.nodes)
 
 
+for _function in [
+    _get_orphans,
+    _get_tags,
+    _count_tags,
+    _get_notes_by_depth,
+    _get_shortest_path_lengths,
+    _get_k_neighbors,
+    _get_root,
+]:
+    registry.register_lru_cache(
+        _function.__name__.lstrip("_"),
+        _function,
+        help="Graph queries of the Zettelkasten",
+    )
+
+
 class Zettelkasten(object):
     def __init__(self, zettels: Optional[List[Note]] = None):
         self._nid2note = {}  # type: Dict[str, Note]
         self._graph = nx.DiGraph()
+        # Tag index: Every note has an integer index, bit i of
+        # _tag2bits[tag] is set if the i-th note has the tag.
+        self._idx2nid = []  # type: List[str]
+        self._nid2idx = {}  # type: Dict[str, int]
+        self._tag2bits = {}  # type: Dict[str, int]
+        self._all_bits = 0
+        # Path indices for get_by_path
+        self._name2nids = {}  # type: Dict[str, Set[str]]
+        self._path2nid = {}  # type: Dict[str, str]
+        self._version = next(_versions)
         if zettels is not None:
             self.add_notes(zettels)
 
     # Properties
     # =========================================================================
 
+    @property
+    def version(self) -> int:
+        """Changes whenever notes are added or removed. Versions are unique
+        among all Zettelkasten objects of the current process."""
+        return self._version
+
     @property
     def root(self):
-        return _get_root(self._graph)
+        return _get_root(self._graph, self._version)
 
     @property
     def notes(self):
@@ -133,7 +185,7 @@ class Zettelkasten(object):
     def get_orphans(self) -> Set[Note]:
         return set(
             self[nid]
-            for nid in _get_orphans(self._graph)
+            for nid in _get_orphans(self._graph, self._version)
             if not nid == self.root
         )
 
@@ -151,7 +203,7 @@ class Zettelkasten(object):
         return {
             depth: self._nids2notes(nids)
             for depth, nids in _get_notes_by_depth(
-                g=self._graph, root=root
+                g=self._graph, version=self._version, root=root
             ).items()
         }
 
@@ -161,26 +213,107 @@ class Zettelkasten(object):
         return {
             depth: len(nids)
             for depth, nids in _get_notes_by_depth(
-                g=self._graph, root=root
+                g=self._graph, version=self._version, root=root
             ).items()
         }
 
     def get_neighbors(self, nid, k=1):
-        return self._nids2notes(_get_k_neighbors(g=self._graph, k=k, root=nid))
+        return self._nids2notes(
+            _get_k_neighbors(
+                g=self._graph, version=self._version, k=k, root=nid
+            )
+        )
 
     def get_ndescendants(self, nid):
         return len(nx.descendants(self._graph, nid))
 
+    def get_shortest_path_nodes(self, nid, root=None) -> Set[str]:
+        """IDs of all notes that lie on a shortest path from the root to the
+        note. Linear in the size of the graph (unlike enumerating all
+        simple paths).
+
+        Args:
+            nid: Target note
+            root: If None: Master document
+
+        Returns:
+            Set of IDs, including root and nid
+
+        Raises:
+            networkx.NetworkXNoPath if nid can't be reached from root
+        """
+        if root is None:
+            root = self.root
+        from_root = _get_shortest_path_lengths(self._graph, self._version, root)
+        if nid not in from_root:
+            raise nx.NetworkXNoPath(f"No path from {root} to {nid}")
+        distance = from_root[nid]
+        to_nid = nx.single_source_shortest_path_length(
+            self._graph.reverse(copy=False), nid, cutoff=distance
+        )
+        return {
+            node
+            for node, d in to_nid.items()
+            if from_root.get(node, distance + 1) + d == distance
+        }
+
     # Getting things
     # =========================================================================
 
     def get_by_path(self, path: Union[str, PurePath]) -> Note:
+        """Get note by its path or by its file name.
+
+        If the path has a directory component, it is first looked up as an
+        absolute path, then by its file name only.
+
+        Args:
+            path: Path or file name
+
+        Returns:
+            Note
+
+        Raises:
+            KeyError if no note was found
+            ValueError if the file name is ambiguous
+        """
         path = Path(path)
-        # fixme
-        res = [z for z in self.notes if z.path.name == path.name]
-        assert len(res) == 1, (path.name, res)
-        return res[0]
+        if len(path.parts) > 1:
+            for key in (
+                os.path.abspath(str(path)),
+                os.path.realpath(str(path)),
+            ):
+                if key in self._path2nid:
+                    return self._nid2note[self._path2nid[key]]
+        nids = self._name2nids.get(path.name, set())
+        if len(nids) == 1:
+            return self._nid2note[next(iter(nids))]
+        elif not nids:
+            raise KeyError(f"No note with file name {path.name}")
+        paths = ", ".join(sorted(str(self[nid].path) for nid in nids))
+        raise ValueError(
+            f"File name {path.name} is ambiguous. Candidates: {paths}"
+        )
+
+    @timed(search_seconds, kind="tags")
+    def query_tags(self, query: str) -> List[Note]:
+        """Notes matching a boolean tag query like ``a AND (b OR NOT c_*)``,
+        see :mod:`verzettler.tag_query` for the syntax.
+
+        Args:
+            query: Query string
+
+        Returns:
+            List of notes in the order they were added
+
+        Raises:
+            ValueError if the query is invalid
+        """
+        bits = evaluate_tag_query(query, self._tag2bits, self._all_bits)
+        return [
+            self._nid2note[self._idx2nid[idx]] for idx in bits_to_indices(bits)
+        ]
 
+    @timed(search_seconds, kind="name")
     def search(self, search: str) -> List[Note]:
         """Search. By default we will search in titles and in names.
 
@@ -246,34 +379,151 @@ class Zettelkasten(object):
     # Extending collection
     # =========================================================================
 
+    def _index_tags(self, note: Note) -> None:
+        idx = self._nid2idx.get(note.nid)
+        if idx is None:
+            idx = len(self._idx2nid)
+            self._idx2nid.append(note.nid)
+            self._nid2idx[note.nid] = idx
+        bit = 1 << idx
+        self._all_bits |= bit
+        for tag in note.tags:
+            self._tag2bits[tag] = self._tag2bits.get(tag, 0) | bit
+
+    def _unindex_tags(self, note: Note) -> None:
+        # The index of the nid is kept and reused if the note is added again
+        mask = ~(1 << self._nid2idx[note.nid])
+        self._all_bits &= mask
+        for tag in note.tags:
+            bits = self._tag2bits[tag] & mask
+            if bits:
+                self._tag2bits[tag] = bits
+            else:
+                del self._tag2bits[tag]
+
+    def _index_path(self, note: Note) -> None:
+        self._name2nids.setdefault(note.path.name, set()).add(note.nid)
+        self._path2nid[os.path.abspath(str(note.path))] = note.nid
+
+    def _unindex_path(self, note: Note) -> None:
+        nids = self._name2nids[note.path.name]
+        nids.discard(note.nid)
+        if not nids:
+            del self._name2nids[note.path.name]
+        path = os.path.abspath(str(note.path))
+        if self._path2nid.get(path) == note.nid:
+            del self._path2nid[path]
+
+    def _remove_note(self, nid: str) -> None:
+        """Remove note and its outgoing links, but keep links pointing to
+        it."""
+        note = self._nid2note.pop(nid)
+        self._unindex_tags(note)
+        self._unindex_path(note)
+        self._graph.remove_edges_from(list(self._graph.out_edges(nid)))
+        if _iterator_empty(self._graph.predecessors(nid)):
+            self._graph.remove_node(nid)
+        self._version = next(_versions)
+
     def add_notes(self, notes: Iterable[Note]) -> None:
         for note in notes:
             note.zettelkasten = self
+            if note.nid in self._nid2note:
+                self._remove_note(note.nid)
             self._nid2note[note.nid] = note
+            self._index_tags(note)
+            self._index_path(note)
             self._graph.add_node(note.nid)
             for link in note.links:
                 self._graph.add_edge(note.nid, link)
+        self._version = next(_versions)
 
+    @timed(load_seconds)
     def add_notes_from_directory(self, directory: Union[PurePath, str]) -> None:
         directory = Path(directory)
-        for root, dirs, files in os.walk(str(directory), topdown=True):
-            dirs[:] = [d for d in dirs if d not in [".git"]]
-            notes = [
-                Note(Path(root) / file)
-                for file in files
-                if file.endswith(".md")
-            ]
-            if notes:
-                self.add_notes(notes)
-                logger.info(f"Added {len(notes)} notes from {root}")
+        with spans.span(f"load {directory}"):
+            for root, dirs, files in os.walk(str(directory), topdown=True):
+                dirs[:] = [d for d in dirs if d not in [".git"]]
+                with spans.span("parse notes"):
+                    notes = [
+                        Note(Path(root) / file)
+                        for file in files
+                        if file.endswith(".md")
+                    ]
+                if notes:
+                    with spans.span("build graph and indices"):
+                        self.add_notes(notes)
+                    logger.info(f"Added {len(notes)} notes from {root}")
 
     # MISC
     # =========================================================================
 
     def reload_note(self, nid: str):
-        del self._nid2note[nid]
-        self._graph.remove_node(nid)
-        self.add_notes([Note(self[nid].path)])
+        path = self[nid].path
+        self._remove_note(nid)
+        self.add_notes([Note(path)])
+
+    def update_note(self, nid: str, text: str) -> Note:
+        """Replace a note after its content changed, e.g. after saving it in
+        an editor. Only the links and tags that changed are updated in the
+        graph and the indices.
+
+        Args:
+            nid: ID of the note
+            text: New content of the note (not read from the file)
+
+        Returns:
+            The old note
+        """
+        old = self._nid2note[nid]
+        new = Note(old.path, text=text)
+        new.zettelkasten = self
+        self._nid2note[nid] = new
+
+        old_tags, new_tags = set(old.tags), set(new.tags)
+        bit = 1 << self._nid2idx[nid]
+        for tag in old_tags - new_tags:
+            bits = self._tag2bits[tag] & ~bit
+            if bits:
+                self._tag2bits[tag] = bits
+            else:
+                del self._tag2bits[tag]
+        for tag in new_tags - old_tags:
+            self._tag2bits[tag] = self._tag2bits.get(tag, 0) | bit
+
+        old_links, new_links = set(old.links), set(new.links)
+        for link in old_links - new_links:
+            self._graph.remove_edge(nid, link)
+            # Remove dangling link targets like _remove_note does
+            if link not in self._nid2note and _iterator_empty(
+                self._graph.predecessors(link)
+            ):
+                self._graph.remove_node(link)
+        for link in new_links - old_links:
+            self._graph.add_edge(nid, link)
+
+        self._version = next(_versions)
+        return old
+
+    def copy(self) -> "Zettelkasten":
+        """Copy with the same version, e.g. to work with a consistent state
+        without holding a lock. The graph and the indices are copied, the
+        notes are shared (they are replaced, not modified, when they
+        change).
+        """
+        new = Zettelkasten()
+        new._nid2note = dict(self._nid2note)
+        new._graph = self._graph.copy()
+        new._idx2nid = list(self._idx2nid)
+        new._nid2idx = dict(self._nid2idx)
+        new._tag2bits = dict(self._tag2bits)
+        new._all_bits = self._all_bits
+        new._name2nids = {
+            name: set(nids) for name, nids in self._name2nids.items()
+        }
+        new._path2nid = dict(self._path2nid)
+        new._version = self._version
+        return new
 
     def stats_string(self) -> str:
         lines = [
@@ -285,23 +535,39 @@ class Zettelkasten(object):
         return "\n".join(lines)
 
     def apply_converter(
-        self, converter: NoteConverter, output_basedir: Union[str, PurePath]
-    ):
+        self,
+        converter: NoteConverter,
+        output_basedir: Union[str, PurePath],
+        max_workers: Optional[int] = None,
+    ) -> WriteSummary:
         """Apply converter to all notes in Zettelkasten. The target path for
-        each note will be output_basedir/filename.
+        each note will be output_basedir/filename. Files whose content
+        doesn't change are not written, notes that can't be converted are
+        skipped.
 
         Args:
             converter:
             output_basedir:
+            max_workers: Maximal number of concurrent conversions, see
+                :meth:`NoteConverter.convert_many`
 
         Returns:
-
+            Summary of the written files
         """
         output_basedir = Path(output_basedir)
-        output_basedir.parent.mkdir(exist_ok=True, parents=True)
-        for note in self.notes:
+        output_basedir.mkdir(exist_ok=True, parents=True)
+        summary = WriteSummary()
+        for note, converted in converter.convert_many(
+            self.notes, max_workers=max_workers
+        ):
+            if converted is None:
+                summary.add_failed()
+                continue
             new_path = output_basedir / note.path.name
-            converter.convert_write(note, path=new_path)
+            converter.write_converted(
+                note, converted, path=new_path, summary=summary
+            )
+        return summary
 
     # Magic
     # =========================================================================